@@ -0,0 +1,142 @@
+"""
+Page of inspections to JSON, ORM models and response_model vs plain rows.
+
+Both paths read the same rows from in-memory SQLite through SQLAlchemy, so
+the numbers show only the cost of loading and serialization, query in
+ClickHouse and network are the same for both and are not measured.
+"""
+import asyncio
+import statistics
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from fastapi.responses import JSONResponse
+from fastapi.routing import serialize_response
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, text
+from sqlalchemy.future import select
+from sqlalchemy.orm import Session
+
+from src.common.models import Pagination
+from src.inspections.dal.inspections_repository import (
+    INSPECTION_COLUMNS,
+    InspectionModel,
+)
+from src.inspections.domain.inspections.models import (
+    Inspection,
+    InspectionsPaginatedDto,
+)
+from src.inspections.domain.inspections.serialization import inspections_page_json
+
+ITERATIONS = 2000
+WARMUP = 200
+PAGE = 100
+
+response_field = create_response_field("response", InspectionsPaginatedDto)
+pagination = Pagination(page=1, limit=PAGE, count=PAGE, has_more=False)
+
+
+def database() -> Session:
+    engine = create_engine("sqlite://", future=True)
+
+    with engine.begin() as connection:
+        connection.execute(
+            text(
+                "CREATE TABLE inspections_distributed (inspection_id TEXT,"
+                " worker_id TEXT, worker_path TEXT, device_id TEXT,"
+                " device_path TEXT, start_time TIMESTAMP, end_time TIMESTAMP,"
+                " data TEXT)"
+            )
+        )
+
+        start = datetime(2023, 1, 1, 8, 0, 0, 123456)
+        connection.execute(
+            text(
+                "INSERT INTO inspections_distributed VALUES (:inspection_id,"
+                " :worker_id, '[]', :device_id, '[]', :start_time, :end_time,"
+                " :data)"
+            ),
+            [
+                {
+                    "inspection_id": str(uuid.uuid4()),
+                    "worker_id": str(uuid.uuid4()),
+                    "device_id": str(uuid.uuid4()),
+                    "start_time": start + timedelta(minutes=i),
+                    "end_time": start + timedelta(minutes=i, seconds=70),
+                    "data": "{'result': 'PASS', 'data': {}}",
+                }
+                for i in range(PAGE)
+            ],
+        )
+
+    return Session(engine)
+
+
+# Path as it was before, every row is a model, then Inspection, then the
+# page is validated and encoded again by response_model
+def model_to_inspection(model: InspectionModel) -> Inspection:
+    return Inspection(
+        id=str(model.inspection_id),
+        worker_id=str(model.worker_id),
+        device_id=str(model.device_id),
+        inspection_start=model.start_time,
+        inspection_end=model.end_time,
+        inspection_data=model.data,
+    )
+
+
+async def orm_page(session: Session) -> bytes:
+    models = session.execute(select(InspectionModel).limit(PAGE)).scalars().all()
+    dto = InspectionsPaginatedDto(
+        data=[model_to_inspection(model) for model in models],
+        pagination=pagination,
+    )
+    content = await serialize_response(field=response_field, response_content=dto)
+
+    # identity map keeps models between iterations otherwise
+    session.expunge_all()
+    return JSONResponse(content).body
+
+
+async def rows_page(session: Session) -> bytes:
+    rows = session.execute(select(*INSPECTION_COLUMNS).limit(PAGE)).all()
+    return inspections_page_json(rows, pagination)
+
+
+async def measure(session: Session, page) -> list[float]:
+    for _ in range(WARMUP):
+        await page(session)
+
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        await page(session)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings.sort()
+    print(
+        f"{name:<20} mean: {statistics.mean(timings):8.1f}us "
+        f"p50: {timings[len(timings) // 2]:8.1f}us "
+        f"p99: {timings[int(len(timings) * 0.99)]:8.1f}us"
+    )
+
+
+async def main():
+    session = database()
+    assert await orm_page(session) == await rows_page(session)
+
+    before = await measure(session, orm_page)
+    after = await measure(session, rows_page)
+
+    print(f"Page of {PAGE} inspections to JSON, {ITERATIONS} pages")
+    report("ORM + response_model", before)
+    report("rows", after)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,185 @@
+"""
+Latency of the request middleware chain, BaseHTTPMiddleware vs pure ASGI.
+
+Requests are sent straight to the ASGI application, without network, so the
+numbers show only the overhead of the middleware stack. Neo4j driver does not
+connect until the first query, so no database is needed.
+"""
+
+import asyncio
+import os
+import statistics
+import time
+from contextvars import ContextVar
+
+from fastapi import FastAPI
+from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
+from starlette.requests import Request
+from starlette.responses import Response
+
+import src.common.context.context as context_module
+from src.common.context import get_request_context, initialize_context_middleware
+from src.common.kafka.middleware import KafkaMiddleware
+from src.common.neo4j.configuration import Neo4JConfiguration
+from src.common.neo4j.middleware import Neo4JSessionMiddleware
+
+ITERATIONS = 5000
+WARMUP = 500
+
+# driver does not connect, credentials are read from env only to be passed on
+neo4j_config = Neo4JConfiguration(
+    uri="neo4j://localhost:7687",
+    user="neo4j",
+    password=os.environ.get("NEO4J_PASSWORD", ""),
+)
+
+
+# Chain as it was before, every layer is BaseHTTPMiddleware
+class LegacyContextMiddleware(BaseHTTPMiddleware):
+    async def dispatch(
+        self,
+        request: Request,
+        call_next: RequestResponseEndpoint,
+    ) -> Response:
+        token = context_module._context.set({context_module.REQ: request})
+        try:
+            return await call_next(request)
+        finally:
+            context_module._context.reset(token)
+
+
+class LegacyNeo4JSessionMiddleware(BaseHTTPMiddleware):
+    def __init__(self, config: Neo4JConfiguration, *args, **kwargs) -> None:
+        super().__init__(*args, **kwargs)
+        self._middleware = Neo4JSessionMiddleware(None, config)
+
+    async def dispatch(
+        self,
+        request: Request,
+        call_next: RequestResponseEndpoint,
+    ) -> Response:
+        session = self._middleware._driver.session()
+        context = get_request_context()
+        context[Neo4JSessionMiddleware.KEY] = session
+
+        try:
+            return await call_next(request)
+        finally:
+            del context[Neo4JSessionMiddleware.KEY]
+            await session.close()
+
+
+class LegacyKafkaMiddleware(BaseHTTPMiddleware):
+    async def dispatch(
+        self,
+        request: Request,
+        call_next: RequestResponseEndpoint,
+    ) -> Response:
+        context = get_request_context()
+        context[KafkaMiddleware.KEY] = None
+
+        try:
+            return await call_next(request)
+        finally:
+            del context[KafkaMiddleware.KEY]
+
+
+def add_endpoint(application: FastAPI) -> FastAPI:
+    @application.get("/ping")
+    async def ping():
+        get_request_context()
+        return {"status": "ok"}
+
+    return application
+
+
+def legacy_application() -> FastAPI:
+    application = add_endpoint(FastAPI())
+    application.add_middleware(LegacyKafkaMiddleware)
+    application.add_middleware(LegacyNeo4JSessionMiddleware, config=neo4j_config)
+    application.add_middleware(LegacyContextMiddleware)
+
+    return application
+
+
+def asgi_application() -> FastAPI:
+    application = add_endpoint(FastAPI())
+    application.add_middleware(KafkaMiddleware, producer=None)
+    application.add_middleware(Neo4JSessionMiddleware, config=neo4j_config)
+    initialize_context_middleware(application)
+
+    return application
+
+
+async def call(application: FastAPI) -> None:
+    scope = {
+        "type": "http",
+        "asgi": {"version": "3.0"},
+        "http_version": "1.1",
+        "method": "GET",
+        "scheme": "http",
+        "path": "/ping",
+        "raw_path": b"/ping",
+        "root_path": "",
+        "query_string": b"",
+        "headers": [(b"host", b"localhost")],
+        "client": ("127.0.0.1", 5555),
+        "server": ("127.0.0.1", 80),
+        "app": application,
+    }
+
+    request_sent = False
+    disconnected = asyncio.Event()
+
+    async def receive():
+        nonlocal request_sent
+        if not request_sent:
+            request_sent = True
+            return {"type": "http.request", "body": b"", "more_body": False}
+
+        # like a real server, wait until client goes away
+        await disconnected.wait()
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        if message["type"] == "http.response.start":
+            assert message["status"] == 200
+
+    await application(scope, receive, send)
+
+
+async def measure(application: FastAPI) -> list[float]:
+    for _ in range(WARMUP):
+        await call(application)
+
+    timings = []
+    for _ in range(ITERATIONS):
+        start = time.perf_counter()
+        await call(application)
+        timings.append((time.perf_counter() - start) * 1_000_000)
+
+    return timings
+
+
+def report(name: str, timings: list[float]) -> None:
+    timings.sort()
+    print(
+        f"{name:<20} mean: {statistics.mean(timings):8.1f}us "
+        f"p50: {timings[len(timings) // 2]:8.1f}us "
+        f"p99: {timings[int(len(timings) * 0.99)]:8.1f}us",
+    )
+
+
+async def main():
+    context_module._context = ContextVar("request_context")
+
+    before = await measure(legacy_application())
+    after = await measure(asgi_application())
+
+    print(f"Middleware chain latency, {ITERATIONS} requests")
+    report("BaseHTTPMiddleware", before)
+    report("pure ASGI", after)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
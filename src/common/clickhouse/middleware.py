@@ -8,9 +8,7 @@ from sqlalchemy.ext.asyncio import (
     async_scoped_session,
     create_async_engine,
 )
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
 
 from src.common.context import get_request_context
 
@@ -21,11 +19,11 @@ logger = logging.getLogger(__name__)
 
 # Why middleware?
 # If we use "Depend" yield will return after response is sent
-class DatabaseSessionMiddleware(BaseHTTPMiddleware):
+class DatabaseSessionMiddleware:
     KEY = "session"
 
-    def __init__(self, config: ClickhouseConfiguration, *args, **kwargs) -> None:
-        super().__init__(*args, **kwargs)
+    def __init__(self, app: ASGIApp, config: ClickhouseConfiguration) -> None:
+        self.app = app
         self._engine = create_async_engine(
             config.url,
             echo=config.echo,
@@ -44,16 +42,25 @@ class DatabaseSessionMiddleware(BaseHTTPMiddleware):
             scopefunc=current_task,
         )
 
-    async def dispatch(
-        self, request: Request, next: RequestResponseEndpoint
-    ) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         session = self._session_factory()
         context = get_request_context()
         context[self.KEY] = session
 
+        code = None
+
+        async def send_wrapper(message: Message) -> None:
+            nonlocal code
+            if message["type"] == "http.response.start":
+                code = message["status"]
+            await send(message)
+
         try:
-            response = await next(request)
-            code = response.status_code
+            await self.app(scope, receive, send_wrapper)
 
             if code and code < status.HTTP_400_BAD_REQUEST:
                 # await session.commit()
@@ -68,8 +75,6 @@ class DatabaseSessionMiddleware(BaseHTTPMiddleware):
             del context[self.KEY]
             await session.close()
 
-        return response
-
 
 def get_session() -> AsyncSession:
     context = get_request_context()
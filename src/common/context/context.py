@@ -5,9 +5,8 @@ from contextvars import ContextVar
 from typing import ContextManager, Optional
 
 from fastapi import FastAPI
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
 from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 _context: ContextVar[dict]
 logger = logging.getLogger(__name__)
@@ -15,9 +14,12 @@ logger = logging.getLogger(__name__)
 REQ = "request"
 
 
-class AsyncContextMiddleware(BaseHTTPMiddleware):
-    def __init__(self, *args, **kwargs) -> None:
-        super().__init__(*args, **kwargs)
+# Why pure ASGI?
+# BaseHTTPMiddleware runs every layer in a separate task with memory streams
+# between them, here we just call next application in the same task
+class AsyncContextMiddleware:
+    def __init__(self, app: ASGIApp) -> None:
+        self.app = app
 
     @contextmanager
     def context_manager(self, initial: Optional[dict] = None) -> ContextManager:
@@ -38,13 +40,14 @@ class AsyncContextMiddleware(BaseHTTPMiddleware):
             )
             _context.reset(token)
 
-    async def dispatch(
-        self,
-        request: Request,
-        next: RequestResponseEndpoint,
-    ) -> Response:
-        with self.context_manager({REQ: request}):
-            return await next(request)
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # all other middlewares share this dict, so there is one context per request
+        with self.context_manager({REQ: Request(scope, receive)}):
+            await self.app(scope, receive, send)
 
 
 def get_request_context() -> dict:
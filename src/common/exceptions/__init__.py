@@ -5,3 +5,8 @@ from starlette import status
 class NotImplementedException(HTTPException):
     def __init__(self) -> None:
         super().__init__(status.HTTP_418_IM_A_TEAPOT, "Operation not implemented")
+
+
+class InvalidCursorException(HTTPException):
+    def __init__(self, cursor: str) -> None:
+        super().__init__(status.HTTP_400_BAD_REQUEST, f"Invalid cursor: {cursor}")
@@ -31,6 +31,9 @@ def initialize_kafka_middleware(
             bootstrap_servers=config.instance,
             # acks=0,  # durability doesn't matter now
             request_timeout_ms=300,
+            linger_ms=config.linger_ms,
+            max_batch_size=config.max_batch_size,
+            compression_type=config.compression_type,
             security_protocol="SASL_SSL",
             sasl_mechanism="SCRAM-SHA-512",
             sasl_plain_username=config.username,
@@ -46,4 +49,6 @@ def initialize_kafka_middleware(
         async def stop_producer():
             await _producer.stop()
 
+    # for background senders, they have no request context
+    application.state.KAFKA_PRODUCER = _producer
     application.add_middleware(KafkaMiddleware, producer=_producer)
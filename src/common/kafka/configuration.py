@@ -7,6 +7,16 @@ class KafkaConfiguration(BaseSettings):
     username: str
     password: str
     cafile: str | None
+    # producer waits linger_ms to fill batches of max_batch_size per partition
+    linger_ms: int = 10
+    max_batch_size: int = 256 * 1024
+    # "lz4", "snappy" and "zstd" need the same extra of aiokafka installed
+    compression_type: str | None = None
+    # events waiting to be sent, requests wait for space up to enqueue_timeout
+    queue_size: int = 10_000
+    enqueue_timeout: float = 1.0  # seconds
+    # queued events are sent on shutdown up to drain_timeout, others are lost
+    drain_timeout: float = 10.0  # seconds
 
     class Config:
         env_prefix = "kafka_"
@@ -1,32 +1,32 @@
 import logging
 
 from aiokafka import AIOKafkaProducer
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.requests import Request
-from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from ..context import get_request_context
 
 logger = logging.getLogger(__name__)
 
 
-class KafkaMiddleware(BaseHTTPMiddleware):
+class KafkaMiddleware:
     KEY = "producer"
 
-    def __init__(self, producer: AIOKafkaProducer, *args, **kwargs) -> None:
-        super().__init__(*args, **kwargs)
+    def __init__(self, app: ASGIApp, producer: AIOKafkaProducer) -> None:
+        self.app = app
 
         self._producer = producer
 
-    async def dispatch(
-        self, request: Request, call_next: RequestResponseEndpoint
-    ) -> Response:
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
         context = get_request_context()
         context[self.KEY] = self._producer
 
         try:
             logger.info("Inserting kafka producer to context")
-            return await call_next(request)
+            await self.app(scope, receive, send)
         finally:
             del context[self.KEY]
 
@@ -0,0 +1 @@
+from .metrics import Counters, register_metrics, register_metrics_source  # noqa
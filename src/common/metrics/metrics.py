@@ -0,0 +1,38 @@
+import logging
+from collections import Counter, defaultdict
+from typing import Callable
+
+from fastapi import FastAPI
+
+logger = logging.getLogger(__name__)
+
+# Metrics are collected per process, every gunicorn worker has it's own numbers
+_sources: dict[str, Callable[[], dict]] = {}
+
+
+class Counters:
+    def __init__(self) -> None:
+        self._values: dict[str, Counter[str]] = defaultdict(Counter)
+
+    def inc(self, key: str, counter: str, value: int = 1) -> None:
+        self._values[key][counter] += value
+
+    def snapshot(self) -> dict[str, dict[str, int]]:
+        return {key: dict(counters) for key, counters in self._values.items()}
+
+
+def register_metrics_source(name: str, source: Callable[[], dict]) -> None:
+    _sources[name] = source
+
+
+async def collect_metrics() -> dict[str, dict]:
+    return {name: source() for name, source in _sources.items()}
+
+
+def register_metrics(application: FastAPI) -> None:
+    logger.debug(f"Registering {len(_sources)} metrics sources")
+    application.add_api_route(
+        "/_metrics",
+        collect_metrics,
+        tags=["__system__"],
+    )
@@ -1,15 +1,37 @@
+from enum import Enum
+
 from pydantic import BaseModel
 
 
+class CountMode(str, Enum):
+    exact = "exact"
+    # sum of cached counters, filters are taken into account, inspections are
+    # counted by daily stats of whole days
+    estimate = "estimate"
+    none = "none"
+
+
 class PaginationQueryParams:
-    __slots__ = ("page", "limit")
+    __slots__ = ("page", "limit", "cursor", "count_mode")
 
-    def __init__(self, page: int = 1, limit: int = 100):
+    def __init__(
+        self,
+        page: int = 1,
+        limit: int = 100,
+        cursor: str | None = None,
+        count_mode: CountMode = CountMode.exact,
+    ):
+        # cursor switches to keyset pagination, empty cursor is the first page,
+        # next one is in Pagination.next_cursor and page is ignored
         self.page = page
         self.limit = limit
+        self.cursor = cursor
+        self.count_mode = count_mode
 
 
 class Pagination(BaseModel):
     page: int
     limit: int
-    count: int
+    count: int | None
+    has_more: bool = False
+    next_cursor: str | None = None
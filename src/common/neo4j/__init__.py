@@ -1,13 +1,18 @@
 from fastapi import FastAPI
 
+from .concurrent import run_concurrently  # noqa
 from .configuration import Neo4JConfiguration
 from .decorator import Transactional  # noqa
 from .middleware import (  # noqa
     Neo4JSessionMiddleware,
     check_database_connection,
+    close_session,
+    get_driver,
     get_session,
+    set_access_mode,
 )
-from .router import TransactionalRouter, get_transaction  # noqa
+from .router import TransactionalRouter, after_commit, get_transaction  # noqa
+from .startup import register_periodic_read, register_startup_transaction  # noqa
 
 
 def initialize_database_middleware(
@@ -0,0 +1,35 @@
+import asyncio
+
+from neo4j import READ_ACCESS, AsyncManagedTransaction, Record
+
+from .middleware import get_driver
+
+
+async def _fetch(query: str, params: dict) -> list[Record]:
+    async def unit_of_work(transaction: AsyncManagedTransaction) -> list[Record]:
+        result = await transaction.run(query, params)
+        return [record async for record in result]
+
+    # every query gets own session and connection, so they run in parallel
+    async with get_driver().session(default_access_mode=READ_ACCESS) as session:
+        return await session.execute_read(unit_of_work)
+
+
+async def run_concurrently(
+    transaction: AsyncManagedTransaction | None,
+    *queries: tuple[str, dict],
+) -> list[list[Record]]:
+    """
+    Runs read queries in parallel on separate READ sessions. Inside transaction
+    queries run one by one, they should see changes made by the transaction
+    and transaction can not run queries concurrently
+    """
+    if transaction is not None:
+        retval = []
+        for query, params in queries:
+            result = await transaction.run(query, params)
+            retval.append([record async for record in result])
+
+        return retval
+
+    return await asyncio.gather(*(_fetch(query, params) for query, params in queries))
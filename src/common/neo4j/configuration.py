@@ -5,6 +5,9 @@ class Neo4JConfiguration(BaseSettings):
     uri: str
     user: str
     password: str
+    # write transactions are retried by driver with exponential backoff
+    # and jitter on transient errors until this time (seconds) is spent
+    max_transaction_retry_time: float = 30.0
 
     class Config:
         env_prefix = "neo4j_"
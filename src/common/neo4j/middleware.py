@@ -1,10 +1,8 @@
 import logging
 
 from fastapi import Depends
-from neo4j import AsyncGraphDatabase, AsyncSession
-from starlette.middleware.base import BaseHTTPMiddleware, RequestResponseEndpoint
-from starlette.requests import Request
-from starlette.responses import Response
+from neo4j import WRITE_ACCESS, AsyncDriver, AsyncGraphDatabase, AsyncSession
+from starlette.types import ASGIApp, Receive, Scope, Send
 
 from src.common.context import get_request_context
 
@@ -15,42 +13,79 @@ logger = logging.getLogger(__name__)
 
 # Why middleware?
 # If we use Depends yield will return after response is send
-class Neo4JSessionMiddleware(BaseHTTPMiddleware):
+class Neo4JSessionMiddleware:
     KEY = "neo4j_session"
+    DRIVER_KEY = "neo4j_driver"
+    ACCESS_MODE_KEY = "neo4j_access_mode"
 
-    def __init__(self, config: Neo4JConfiguration, *args, **kwargs) -> None:
-        super().__init__(*args, **kwargs)
+    def __init__(self, app: ASGIApp, config: Neo4JConfiguration) -> None:
+        self.app = app
 
         self._driver = AsyncGraphDatabase.driver(
             config.uri,
             auth=(config.user, config.password),
+            max_transaction_retry_time=config.max_transaction_retry_time,
         )
 
-    async def dispatch(
-        self,
-        request: Request,
-        call_next: RequestResponseEndpoint,
-    ) -> Response:
-        # unfortunately we can not decide here should we use READ or WRITE connection
-        # to do that we should put in context driver and decide it inside
-        # transactional router, will see how it goes
-        session = self._driver.session()
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        # we can not decide here should we use READ or WRITE connection,
+        # so we put driver in context and session is opened on first get_session,
+        # requests which never touch database (404, validation errors) don't open it
         context = get_request_context()
-        context[self.KEY] = session
+        context[self.DRIVER_KEY] = self._driver
 
         try:
-            response = await call_next(request)
+            await self.app(scope, receive, send)
         finally:
-            del context[self.KEY]
-            await session.close()
+            # usually session is already closed by transactional router
+            await close_session()
+            del context[self.DRIVER_KEY]
+            context.pop(self.ACCESS_MODE_KEY, None)
+
+
+def get_driver() -> AsyncDriver:
+    context = get_request_context()
+    # we want to raise error if KEY not in context
+    return context[Neo4JSessionMiddleware.DRIVER_KEY]
+
 
-        return response
+def set_access_mode(access_mode: str) -> None:
+    """
+    Access mode for session of current request, READ_ACCESS sessions could be
+    routed by cluster to followers and read replicas
+    """
+    context = get_request_context()
+    context[Neo4JSessionMiddleware.ACCESS_MODE_KEY] = access_mode
 
 
 def get_session() -> AsyncSession:
     context = get_request_context()
-    # we want to raise error if KEY not in context
-    return context[Neo4JSessionMiddleware.KEY]
+    session = context.get(Neo4JSessionMiddleware.KEY)
+
+    if session is None:
+        # we want to raise error if driver not in context
+        driver = context[Neo4JSessionMiddleware.DRIVER_KEY]
+        session = driver.session(
+            default_access_mode=context.get(
+                Neo4JSessionMiddleware.ACCESS_MODE_KEY,
+                WRITE_ACCESS,
+            ),
+        )
+        context[Neo4JSessionMiddleware.KEY] = session
+
+    return session
+
+
+async def close_session() -> None:
+    context = get_request_context()
+    session = context.pop(Neo4JSessionMiddleware.KEY, None)
+
+    if session is not None:
+        await session.close()
 
 
 async def check_database_connection(
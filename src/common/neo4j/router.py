@@ -3,29 +3,33 @@ from typing import Callable
 
 from fastapi import Request, Response, status
 from fastapi.routing import APIRoute
-from neo4j import AsyncTransaction
+from neo4j import READ_ACCESS, WRITE_ACCESS, AsyncManagedTransaction
 
 from src.common.context import get_request_context
+from src.common.metrics import Counters, register_metrics_source
 
-from .middleware import get_session
+from .middleware import close_session, get_session, set_access_mode
 
 logger = logging.getLogger(__name__)
 
+transaction_counters = Counters()
+register_metrics_source("neo4j_transactions", transaction_counters.snapshot)
+
+
+class RollbackResponse(Exception):
+    """
+    Raised inside unit of work to rollback transaction, when handler
+    returned error response instead of raising exception
+    """
+
+    def __init__(self, response: Response) -> None:
+        super().__init__(response)
+        self.response = response
+
 
 class TransactionalRouter(APIRoute):
     KEY = "neo4j_transaction"
-
-    async def _commit_or_rollback_transaction(
-        self,
-        transactional: bool,
-        code: int,
-        transaction: AsyncTransaction,
-    ):
-        if transactional and code < status.HTTP_400_BAD_REQUEST:
-            await transaction.commit()
-        elif transactional:
-            logger.info(f"Bad response status({code}), rollback")
-            await transaction.rollback()
+    AFTER_COMMIT_KEY = "neo4j_after_commit"
 
     def _is_transactional(self, request: Request) -> bool:
         if "endpoint" in request.scope and hasattr(
@@ -36,46 +40,120 @@ class TransactionalRouter(APIRoute):
 
         return False
 
+    def _metrics_key(self) -> str:
+        return f"{','.join(sorted(self.methods))} {self.path}"
+
     def get_route_handler(self) -> Callable:
         # We can get handler function only in APIRoute
         # So, if function has __transactional__ we should open transaction
         # Session could only have one transaction, so we do not need to save it anyware
+        # Non transactional methods only read, so they get READ session which
+        # cluster can send to followers, transactional ones get WRITE session
+        # Session is opened lazily by get_session
         original_route_handler = super().get_route_handler()
 
         async def custom_route_handler(request: Request) -> Response:
             transactional = self._is_transactional(request)
 
-            transaction: AsyncTransaction = None
-            if transactional:
-                logger.debug("Transactional method, starting transaction...")
-                session = get_session()
-                transaction = await session.begin_transaction()
-
-                context = get_request_context()
-                context[self.KEY] = transaction
+            set_access_mode(WRITE_ACCESS if transactional else READ_ACCESS)
 
             try:
-                response = await original_route_handler(request)
-                code = response.status_code
-
-                await self._commit_or_rollback_transaction(
-                    transactional,
-                    code,
-                    transaction,
-                )
-            except Exception as exc:
                 if transactional:
-                    await transaction.rollback()
-                raise exc
+                    return await self._handle_in_transaction(
+                        original_route_handler,
+                        request,
+                    )
+
+                return await original_route_handler(request)
             finally:
-                if transactional:
-                    del context[self.KEY]
+                # response is ready, we do not need connection anymore
+                await close_session()
 
+        return custom_route_handler
+
+    async def _handle_in_transaction(
+        self,
+        route_handler: Callable,
+        request: Request,
+    ) -> Response:
+        logger.debug("Transactional method, starting transaction...")
+        metrics_key = self._metrics_key()
+        transaction_counters.inc(metrics_key, "transactions")
+
+        context = get_request_context()
+        unit_of_work = self._unit_of_work(route_handler, request, metrics_key)
+
+        try:
+            response = await get_session().execute_write(unit_of_work)
+        except RollbackResponse as exc:
+            logger.info(f"Bad response status({exc.response.status_code}), rollback")
+            transaction_counters.inc(metrics_key, "rollbacks")
+            return exc.response
+        except Exception as exc:
+            transaction_counters.inc(metrics_key, "rollbacks")
+            raise exc
+        finally:
+            callbacks = context.pop(self.AFTER_COMMIT_KEY, [])
+
+        for callback in callbacks:
+            callback()
+
+        return response
+
+    def _unit_of_work(
+        self,
+        route_handler: Callable,
+        request: Request,
+        metrics_key: str,
+    ) -> Callable:
+        attempts = 0
+
+        async def unit_of_work(transaction: AsyncManagedTransaction) -> Response:
+            # driver calls it again on transient errors (leader switch, deadlock)
+            # with backoff and jitter, so the whole handler runs inside
+            # transaction, dependencies included
+            nonlocal attempts
+            attempts += 1
+            if attempts > 1:
+                logger.warning(f"Retrying transaction {metrics_key}, {attempts}")
+                transaction_counters.inc(metrics_key, "retries")
+
+            context = get_request_context()
+            context[self.KEY] = transaction
+            # callbacks of failed attempt are dropped
+            context[self.AFTER_COMMIT_KEY] = []
+
+            try:
+                response = await route_handler(request)
+            finally:
+                del context[self.KEY]
+
+            _raise_on_error(response)
             return response
 
-        return custom_route_handler
+        return unit_of_work
 
 
-def get_transaction() -> AsyncTransaction | None:
+def _raise_on_error(response: Response) -> None:
+    # error response is returned by handler, transaction is rolled back
+    if response.status_code >= status.HTTP_400_BAD_REQUEST:
+        raise RollbackResponse(response)
+
+
+async def get_transaction() -> AsyncManagedTransaction | None:
     context = get_request_context()
     return context.get(TransactionalRouter.KEY, None)
+
+
+def after_commit(callback: Callable[[], None]) -> None:
+    """
+    Calls callback when transaction of current request is committed,
+    without transaction it is called at once
+    """
+    context = get_request_context()
+    callbacks = context.get(TransactionalRouter.AFTER_COMMIT_KEY)
+
+    if callbacks is None:
+        callback()
+    else:
+        callbacks.append(callback)
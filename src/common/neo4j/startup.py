@@ -0,0 +1,84 @@
+import asyncio
+import logging
+from typing import Awaitable, Callable
+
+from fastapi import FastAPI
+from neo4j import READ_ACCESS, AsyncGraphDatabase, AsyncManagedTransaction
+
+from .configuration import Neo4JConfiguration
+
+logger = logging.getLogger(__name__)
+
+
+def register_startup_transaction(
+    application: FastAPI,
+    config: Neo4JConfiguration,
+    work: Callable[[AsyncManagedTransaction], Awaitable],
+) -> None:
+    """
+    Runs work in write transaction when application starts, there is no
+    request yet, so it uses its own driver. Work returning True is run again
+    in next transaction, so big backfill is committed by parts
+    """
+
+    async def run_work() -> None:
+        driver = AsyncGraphDatabase.driver(
+            config.uri,
+            auth=(config.user, config.password),
+        )
+
+        try:
+            async with driver.session() as session:
+                while await session.execute_write(work):
+                    pass
+        except Exception:
+            # database could be not ready yet, readiness check will show it
+            logger.exception(f"Startup transaction {work.__name__} failed")
+        finally:
+            await driver.close()
+
+    application.add_event_handler(event_type="startup", func=run_work)
+
+
+def register_periodic_read(
+    application: FastAPI,
+    config: Neo4JConfiguration,
+    work: Callable[[AsyncManagedTransaction], Awaitable],
+    interval: float,
+) -> None:
+    """
+    Runs work in read transaction in background, first time right after
+    start and then every interval seconds until application stops
+    """
+    state = {}
+
+    async def run_periodically() -> None:
+        driver = state["driver"]
+
+        while True:
+            try:
+                async with driver.session(default_access_mode=READ_ACCESS) as session:
+                    await session.execute_read(work)
+            except Exception:
+                logger.exception(f"Periodic transaction {work.__name__} failed")
+
+            await asyncio.sleep(interval)
+
+    async def start() -> None:
+        state["driver"] = AsyncGraphDatabase.driver(
+            config.uri,
+            auth=(config.user, config.password),
+        )
+        state["task"] = asyncio.create_task(run_periodically())
+
+    async def stop() -> None:
+        state["task"].cancel()
+        try:
+            await state["task"]
+        except asyncio.CancelledError:
+            pass
+
+        await state["driver"].close()
+
+    application.add_event_handler(event_type="startup", func=start)
+    application.add_event_handler(event_type="shutdown", func=stop)
@@ -1 +1,2 @@
+from .cursor import decode_cursor, encode_cursor  # noqa
 from .update_model import update_model_by_dto  # noqa
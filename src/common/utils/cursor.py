@@ -0,0 +1,24 @@
+import base64
+import json
+
+from src.common.exceptions import InvalidCursorException
+
+
+def encode_cursor(values: list) -> str:
+    """
+    Opaque cursor from sort key values of the last returned row
+    """
+    raw = json.dumps(values, separators=(",", ":"), default=str)
+    return base64.urlsafe_b64encode(raw.encode()).decode()
+
+
+def decode_cursor(cursor: str) -> list:
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except ValueError:
+        raise InvalidCursorException(cursor)
+
+    if not isinstance(values, list):
+        raise InvalidCursorException(cursor)
+
+    return values
@@ -1,59 +1,268 @@
+from functools import wraps
+from typing import Any, Callable
+
+from neo4j import Record
+
+from src.common.exceptions import InvalidCursorException
+from src.common.metrics import register_metrics_source
+from src.common.models import PaginationQueryParams
+
+from .cursor import decode_cursor, encode_cursor
+
+# every query is built from template with parameters only, so Neo4j plan cache
+# has one plan per template and not per page or value
+COUNT_RETURN = " RETURN count(o) as count"
+COUNT_BY_PARENT_RETURN = " RETURN p.id as parent_id, count(o) as count"
+PAGE_RETURN = " RETURN o SKIP $skip LIMIT $limit"
+# keyset pagination, resumes after id of the last returned node
+CURSOR_RETURN = " RETURN o ORDER BY o.id LIMIT $limit"
+# organization units are numbered by nested intervals [lft, rgt) inside of it
+INTERVAL_MAX = 2**62
+# node is effectively active when it and all nodes above it are active and not
+# deleted, p is the parent, nodes below are updated by background propagation
+SET_EFFECTIVE_ACTIVE = (
+    " SET o.effective_active = coalesce(toBoolean(o.active), false)"
+    " AND o.deleted IS NULL"
+    " AND (p:RootOrganizationUnit OR coalesce(p.effective_active, false))"
+)
+
+
+def own_active(node: str) -> str:
+    """
+    Node itself is active and not deleted, nodes above it are not checked
+    """
+    return f"coalesce(toBoolean({node}.active), false) AND {node}.deleted IS NULL"
+
+
+class QueryTemplates:
+    def __init__(self) -> None:
+        self._templates: dict[tuple, str] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: tuple, build: Callable[[], str]) -> str:
+        query = self._templates.get(key)
+
+        if query is None:
+            self._misses += 1
+            query = build()
+            self._templates[key] = query
+        else:
+            self._hits += 1
+
+        return query
+
+    def snapshot(self) -> dict:
+        # hits of memoized query text in this process, not of Neo4j plan cache,
+        # server reports those in cypher.cache.execution_plan metrics. Number of
+        # texts is the upper bound of plans these queries take in the cache
+        total = self._hits + self._misses
+        return {
+            "texts": len(self._templates),
+            "text_hits": self._hits,
+            "text_misses": self._misses,
+            "text_hit_rate": self._hits / total if total else None,
+        }
+
+
+templates = QueryTemplates()
+register_metrics_source("cypher_query_texts", templates.snapshot)
+
+
+def _shape(value: Any) -> Any:
+    # query text depends only on names of parameters, not on values
+    if isinstance(value, dict | set):
+        return tuple(sorted(value))
+    if isinstance(value, list):
+        return tuple(value)
+
+    return value
+
+
+def query_template(builder: Callable[..., str]) -> Callable[..., str]:
+    """
+    Memoizes query text by shape of arguments: labels, relations and
+    names of parameters. Builder should use sorted parameter names.
+    """
+
+    @wraps(builder)
+    def wrapper(*args, **kwargs) -> str:
+        key = (
+            builder.__name__,
+            *(_shape(arg) for arg in args),
+            *((name, _shape(arg)) for name, arg in sorted(kwargs.items())),
+        )
+        return templates.get(key, lambda: builder(*args, **kwargs))
+
+    return wrapper
+
+
+def page_return(pagination: PaginationQueryParams) -> str:
+    return PAGE_RETURN if pagination.cursor is None else CURSOR_RETURN
+
+
+def pagination_params(pagination: PaginationQueryParams) -> dict[str, Any]:
+    # one extra row tells if there is next page
+    if pagination.cursor is None:
+        return {
+            "skip": (pagination.page - 1) * pagination.limit,
+            "limit": pagination.limit + 1,
+        }
+
+    values = decode_cursor(pagination.cursor) if pagination.cursor else [""]
+    if len(values) != 1 or not isinstance(values[0], str):
+        raise InvalidCursorException(pagination.cursor)
+
+    return {"after": values[0], "limit": pagination.limit + 1}
+
+
+def next_cursor(
+    pagination: PaginationQueryParams,
+    records: list[Record],
+    has_more: bool,
+) -> str | None:
+    if pagination.cursor is None or not has_more:
+        return None
+
+    return encode_cursor([records[-1]["o"]["id"]])
+
+
+@query_template
 def prepare_create_query(
     parent_labels: list[str],
     parent_param: str,
     node_labels: list[str],
     params: dict,
     relation: str,
+    returns: str = "",
 ) -> str:
     query = f"MATCH (p:{'|'.join(parent_labels)} {{id: ${parent_param} }})"
     query += " CREATE (o:" + "|".join(node_labels) + " { "
 
     lines = ["id: randomUUID()"]
-    for key in params:
+    for key in sorted(params):
         lines.append(f"{key}: ${key}")
 
     query += ", ".join(lines)
     query += "})-[r:" + relation + "]->(p)"
+    query += SET_EFFECTIVE_ACTIVE
+    query += returns
 
     return query
 
 
+@query_template
 def prepare_delete_query(node_labels: list[str]) -> str:
-    return f"MATCH (o:{'|'.join(node_labels)} {{ id: $id }}) SET o.deleted = true"
+    return (
+        f"MATCH (o:{'|'.join(node_labels)} {{ id: $id }})"
+        " SET o.deleted = true, o.effective_active = false"
+    )
 
 
-def prepare_save_query(node_labels: list[str], relation: str, params: dict) -> str:
+@query_template
+def prepare_save_query(
+    node_labels: list[str],
+    relation: str,
+    params: dict,
+    returns: str = "",
+) -> str:
     query = f"MATCH (o:{'|'.join(node_labels)} {{ id: $id }})-[r:{relation}]->(p) SET "
 
     lines = []
-    for key in params:
+    for key in sorted(params):
         lines.append(f"o.{key} = ${key}")
 
     query += ", ".join(lines)
+    query += SET_EFFECTIVE_ACTIVE
+    query += returns
 
     return query
 
 
-def prepare_get_by_id_query(node_labels: list[str], relation: str) -> str:
+@query_template
+def prepare_get_by_id_query(
+    node_labels: list[str],
+    relation: str,
+    returns: str = "",
+) -> str:
     query = (
         f"MATCH (o:{'|'.join(node_labels)} {{id: $id}})-[r:{relation}]->(p)"
         + " WHERE o.deleted IS NULL"
     )
+    query += returns
 
     return query
 
 
+def subtree_condition(ou: str) -> str:
+    """
+    Organization unit ou is p or below it by nested intervals, range on
+    indexed lft. Root organization unit has no interval and covers all
+    """
+    return (
+        f"{ou}.lft >= coalesce(p.lft, 0)"
+        f" AND {ou}.lft < coalesce(p.rgt, {INTERVAL_MAX})"
+    )
+
+
+def subtree_match(ou: str) -> str:
+    return f"MATCH ({ou}:OrganizationUnit) WHERE {subtree_condition(ou)} "
+
+
+@query_template
 def prepare_find_query(
     parent_labels: list[str],
     node_labels: list[str],
-    relation: str,
-    lines: list[str],
+    relation: str | None,
+    filters: dict,
+    returns: str,
+    after: bool = False,
 ) -> str:
+    """
+    Nodes from subtrees of $available_ou, relation is None when nodes
+    are organization units themselves, after adds keyset condition on id
+    """
     query = f"MATCH (p:{'|'.join(parent_labels)}) WHERE p.id IN $available_ou "
-    query += f"MATCH (o:{'|'.join(node_labels)})-[:{relation}]->()-[:CHILD_OF*0..10]->(p)"  # 1 to 10 hops
+    if relation:
+        query += subtree_match("ou")
+        query += f"MATCH (o:{'|'.join(node_labels)})-[:{relation}]->(ou)"
+        lines = ["o.deleted IS NULL"]
+    else:
+        query += f"MATCH (o:{'|'.join(node_labels)})"
+        lines = [subtree_condition("o"), "o.deleted IS NULL"]
+
+    for key in sorted(filters):
+        lines.append(f"o.{key} = ${key}")
+    if after:
+        lines.append("o.id > $after")
+
+    query += " WHERE " + " AND ".join(lines)
+    query += returns
+
+    return query
+
 
-    query += " WHERE o.deleted IS NULL "
-    if lines:
-        query += " ".join(lines)
+@query_template
+def prepare_hydrate_query(
+    node_labels: list[str],
+    relation: str,
+    organization_unit: str,
+    returns: str,
+) -> str:
+    """
+    Node by id with materialized_path of its organization unit and its
+    in_active_tree in one query, organization_unit part should bind "ou"
+    from o and p
+    """
+    query = (
+        f"MATCH (o:{'|'.join(node_labels)} {{id: $id}})-[r:{relation}]->(p)"
+        + " WHERE o.deleted IS NULL"
+    )
+    query += organization_unit
+    query += " WITH o, p,"
+    query += " coalesce(o.effective_active, false) as in_active_tree,"
+    query += " [ou.id] + reverse(coalesce(ou.ancestors, [])) + [$root_ou]"
+    query += " as materialized_path"
+    query += returns
 
     return query
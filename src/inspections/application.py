@@ -5,11 +5,17 @@ from fastapi import FastAPI
 from src.common.clickhouse.middleware import initialize_database_middleware
 from src.common.context import initialize_context_middleware
 from src.common.health_checks import register_health_checks
-# from src.common.kafka import initialize_kafka_middleware
+from src.common.kafka import initialize_kafka_middleware
 from src.common.logger import initialize_logger
+from src.common.metrics import register_metrics
 from src.inspections.configuration import Configuration
-# from src.inspections.controllers.generator import register_generator_router
+from src.inspections.controllers.exports import register_exports_router
+from src.inspections.controllers.generator import register_generator_router
 from src.inspections.controllers.inspections import register_inspections_router
+from src.inspections.infra.event_producer_kafka import initialize_events_sender
+from src.inspections.infra.exports import initialize_exports
+from src.inspections.infra.ingestion import initialize_ingestion
+from src.inspections.infra.structures_client import initialize_structures_client
 
 
 def initialize_application(config: Configuration) -> FastAPI:
@@ -27,14 +33,28 @@ def initialize_application(config: Configuration) -> FastAPI:
     health_checks = []
 
     application.state.STRUCTURES_URL = config.structures_url
+    initialize_structures_client(
+        application,
+        config.structures_url,
+        config.structures_client,
+    )
+
+    initialize_exports(application, config.exports, config.clickhouse)
+    initialize_ingestion(application, config.ingestion, config.clickhouse)
 
-    # initialize_kafka_middleware(application, config.kafka)
+    if config.events_enabled:
+        # sender is closed before producer is stopped, see initialize_events_sender
+        initialize_events_sender(application, config.kafka)
+        initialize_kafka_middleware(application, config.kafka)
     initialize_database_middleware(application, config.clickhouse, health_checks)
     initialize_context_middleware(application)
 
-    # register_generator_router(application, "")
+    if config.events_enabled:
+        register_generator_router(application, "")
     register_inspections_router(application, "")
+    register_exports_router(application, "")
 
     register_health_checks(application, health_checks)
+    register_metrics(application)
 
     return application
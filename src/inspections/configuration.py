@@ -5,8 +5,54 @@ from src.common.kafka import KafkaConfiguration
 from src.common.logger.configuration import LoggerConfiguration
 
 
+class StructuresClientConfiguration(BaseSettings):
+    max_connections: int = 100
+    max_keepalive_connections: int = 20
+    keepalive_expiry: float = 30.0  # seconds
+    connect_timeout: float = 2.0
+    read_timeout: float = 5.0
+    pool_timeout: float = 2.0
+    # GET requests are idempotent and retried on connection errors and 5xx
+    retries: int = 2
+    retry_backoff: float = 0.1
+
+    class Config:
+        env_prefix = "structures_client_"
+
+
+class ExportsConfiguration(BaseSettings):
+    # should be shared by all workers, job state and files are kept there
+    directory: str = "/tmp/inspections-exports"  # noqa: S108
+    # months exported at the same time by all jobs of the process, memory is
+    # bounded by parallel_parts * batch_size rows
+    parallel_parts: int = 4
+    batch_size: int = 50_000
+    keep_for: float = 86_400.0  # seconds, finished jobs and files are removed after
+
+    class Config:
+        env_prefix = "exports_"
+
+
+class IngestionConfiguration(BaseSettings):
+    # buffer is inserted when it has flush_rows or every flush_interval
+    flush_rows: int = 100_000
+    flush_interval: float = 1.0  # seconds
+    # buffered and inserting rows, requests wait for space up to wait_timeout
+    max_rows: int = 500_000
+    wait_timeout: float = 2.0  # seconds
+    retry_backoff: float = 1.0  # seconds
+
+    class Config:
+        env_prefix = "ingestion_"
+
+
 class Configuration(BaseSettings):
     logging: LoggerConfiguration = LoggerConfiguration()
     clickhouse: ClickhouseConfiguration = ClickhouseConfiguration()
     kafka: KafkaConfiguration = KafkaConfiguration()
     structures_url: str
+    structures_client: StructuresClientConfiguration = StructuresClientConfiguration()
+    exports: ExportsConfiguration = ExportsConfiguration()
+    ingestion: IngestionConfiguration = IngestionConfiguration()
+    # inspections generator sending events to Kafka
+    events_enabled: bool = False
@@ -0,0 +1,47 @@
+import logging
+from typing import Optional
+
+from fastapi import APIRouter, Depends, FastAPI, status
+from fastapi.responses import FileResponse
+from fastapi_restful.cbv import cbv
+
+from src.common.auth import get_user_id
+from src.inspections.domain.exports.models import ExportCreateDto, ExportJob
+from src.inspections.domain.exports.service import ExportService
+from src.inspections.infra.export_files import MEDIA_TYPES
+
+logger = logging.getLogger(__name__)
+router = APIRouter(tags=["Exports"])
+
+
+@cbv(router)
+class ExportsController:
+    user_id: Optional[str] = Depends(get_user_id)
+    exports_service: ExportService = Depends(ExportService)
+
+    @router.post(
+        "/exports",
+        response_model=ExportJob,
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+    async def create_export(self, dto: ExportCreateDto):
+        return await self.exports_service.create_export(dto, self.user_id)
+
+    @router.get("/exports/{export_id}", response_model=ExportJob)
+    async def get_export(self, export_id: str):
+        return await self.exports_service.get_export(export_id, self.user_id)
+
+    @router.get("/exports/{export_id}/download")
+    async def download_export(self, export_id: str):
+        job, path = await self.exports_service.get_export_file(export_id, self.user_id)
+        return FileResponse(
+            path,
+            media_type=MEDIA_TYPES[job.format],
+            filename=f"inspections-{job.id}.{job.format.value}",
+        )
+
+
+def register_exports_router(applications: FastAPI, version: str) -> None:
+    logger.debug("Registering exports controller")
+    router.tags.append(version)
+    applications.include_router(router, prefix=version)
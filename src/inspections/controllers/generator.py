@@ -3,7 +3,7 @@ import logging
 from fastapi import APIRouter, Depends, FastAPI
 from fastapi_restful.cbv import cbv
 
-from src.inspections.domain.inspections.service import InspectionService
+from src.inspections.domain.inspections.generator import GeneratorService
 
 logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Generator"])
@@ -11,11 +11,11 @@ router = APIRouter(tags=["Generator"])
 
 @cbv(router)
 class GeneratorController:
-    inspections_service: InspectionService = Depends(InspectionService)
+    generator_service: GeneratorService = Depends(GeneratorService)
 
     @router.get("/devices/{device_id}/exam/{worker_id}")
     async def generate_inspection(self, device_id: str, worker_id: str):
-        return await self.inspections_service.generate_inspection(device_id, worker_id)
+        return await self.generator_service.generate_inspection(device_id, worker_id)
 
 
 def register_generator_router(application: FastAPI, version: str) -> None:
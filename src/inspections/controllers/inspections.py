@@ -1,9 +1,10 @@
 # flake8: noqa: S311
 import logging
 import random
-from datetime import datetime, timedelta
+from datetime import date, datetime, timedelta
 
-from fastapi import APIRouter, Depends, FastAPI
+from fastapi import APIRouter, Depends, FastAPI, status
+from fastapi.responses import Response
 from fastapi_restful.cbv import cbv
 
 from src.common.auth import get_user_id
@@ -13,7 +14,11 @@ from src.inspections.domain.inspections.models import (
     Inspection,
     InspectionsFindBByWorkerDto,
     InspectionsFindDto,
+    InspectionsIngestDto,
+    InspectionsIngestResult,
     InspectionsPaginatedDto,
+    InspectionsStats,
+    InspectionsStatsDto,
 )
 from src.inspections.domain.inspections.service import InspectionService
 
@@ -21,6 +26,15 @@ logger = logging.getLogger(__name__)
 router = APIRouter(tags=["Inspections"])
 
 
+class JSONBytesResponse(Response):
+    """
+    Body serialized by service, response_model of the route is kept for
+    documentation and is not applied to returned response
+    """
+
+    media_type = "application/json"
+
+
 @cbv(router)
 class InspectionsController:
     inspections_service: InspectionService = Depends(InspectionService)
@@ -35,7 +49,9 @@ class InspectionsController:
             worker_id=worker_id,
             from_datetime=from_datetime,
         )
-        return await self.inspections_service.find_inspections_by_worker(dto)
+        return JSONBytesResponse(
+            await self.inspections_service.find_inspections_by_worker(dto),
+        )
 
     @router.get("/workers/{worker_id}", response_model=list[Inspection])
     async def find_inspections_by_worker_for_test(
@@ -50,7 +66,9 @@ class InspectionsController:
             worker_id=worker_id,
             from_datetime=from_datetime,
         )
-        return await self.inspections_service.find_inspections_by_worker(dto)
+        return JSONBytesResponse(
+            await self.inspections_service.find_inspections_by_worker(dto),
+        )
 
     @router.get("/devices/{device_id}", response_model=list[Inspection])
     async def test_find_inspections_by_device_id(
@@ -66,8 +84,10 @@ class InspectionsController:
             limit=100,
         )
 
-        return await self.inspections_service.find_inspections(
-            dto, pagination, "b75de436-e162-43a7-8f1a-ebaa26c74b69"
+        return JSONBytesResponse(
+            await self.inspections_service.find_inspections(
+                dto, pagination, "b75de436-e162-43a7-8f1a-ebaa26c74b69"
+            ),
         )
 
     @router.get("/testing-inspections", response_model=InspectionsPaginatedDto)
@@ -79,8 +99,10 @@ class InspectionsController:
             limit=100,
         )
 
-        return await self.inspections_service.find_inspections(
-            dto, pagination, "b75de436-e162-43a7-8f1a-ebaa26c74b69"
+        return JSONBytesResponse(
+            await self.inspections_service.find_inspections(
+                dto, pagination, "b75de436-e162-43a7-8f1a-ebaa26c74b69"
+            ),
         )
 
     @router.get("/inspections", response_model=InspectionsPaginatedDto)
@@ -101,7 +123,38 @@ class InspectionsController:
             ou_id=ou_id,
             device_id=device_id,
         )
-        return await self.inspections_service.find_inspections(dto, pagination, user_id)
+        return JSONBytesResponse(
+            await self.inspections_service.find_inspections(dto, pagination, user_id),
+        )
+
+    @router.get("/inspections/stats", response_model=InspectionsStats)
+    async def get_inspections_stats(
+        self,
+        from_date: date,
+        to_date: date,
+        ou_id: str | None = None,
+        device_id: str | None = None,
+        user_id: str = Depends(get_user_id),
+    ):
+        dto = InspectionsStatsDto(
+            from_date=from_date,
+            to_date=to_date,
+            ou_id=ou_id,
+            device_id=device_id,
+        )
+        return await self.inspections_service.get_stats(dto, user_id)
+
+    @router.post(
+        "/inspections/ingest",
+        response_model=InspectionsIngestResult,
+        status_code=status.HTTP_202_ACCEPTED,
+    )
+    async def ingest_inspections(
+        self,
+        dto: InspectionsIngestDto,
+        user_id: str = Depends(get_user_id),
+    ):
+        return await self.inspections_service.ingest_inspections(dto, user_id)
 
     def form_dto(self) -> InspectionsFindDto:
         # TODO: generate random query DTO
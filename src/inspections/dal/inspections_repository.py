@@ -1,26 +1,68 @@
 # flake8: noqa: S311
 import json
 import logging
+import uuid
+from datetime import datetime, timedelta
 
+from clickhouse_sqlalchemy import select as clickhouse_select
 from clickhouse_sqlalchemy.types import UUID
 from fastapi import Depends, HTTPException
-from sqlalchemy import ARRAY, Column, DateTime, String, func, text
+from sqlalchemy import (
+    ARRAY,
+    Column,
+    Date,
+    DateTime,
+    Integer,
+    MetaData,
+    String,
+    Table,
+    func,
+    text,
+)
+from sqlalchemy.engine import Row
 from sqlalchemy.ext.asyncio import AsyncSession
 from sqlalchemy.future import select
 from sqlalchemy.orm import declarative_base
 
 from src.common.clickhouse.middleware import get_session
-from src.common.models import Pagination, PaginationQueryParams
+from src.common.exceptions import InvalidCursorException
+from src.common.models import CountMode, Pagination, PaginationQueryParams
+from src.common.utils import decode_cursor, encode_cursor
+from src.inspections.dal.results_cache import results_cache, results_key
 from src.inspections.domain.inspections.models import (
-    Inspection,
+    InspectionsDayStats,
     InspectionsFindBByWorkerDto,
     InspectionsFindDto,
-    InspectionsPaginatedDto,
+    InspectionsStatsDto,
 )
 
 logger = logging.getLogger(__name__)
 Base = declarative_base()
 
+LATEST_INSPECTIONS = 10
+# TTL of worker_inspections, see migrations/worker_inspections.sql
+WORKER_INSPECTIONS_KEEP = timedelta(days=90)
+# available OU are sent as external table, asynch substitutes parameters into
+# the query on client, so array parameter would make text differ by user and
+# set of thousands of UUID would be parsed by server as literals
+OU_FILTER = text(
+    "hasAny(inspections_distributed.worker_path,"
+    " (SELECT groupArray(id) FROM available_ou))"
+)
+# rollup of inspections by day, see migrations/inspections_stats.sql
+STATS_OU_FILTER = text(
+    "hasAny(inspections_daily_stats_distributed.ou_path,"
+    " (SELECT groupArray(id) FROM available_ou))"
+)
+# keyset pagination in order of the table sorting key, first condition lets
+# primary key skip granules, DateTime parameters lose fractions so end time
+# is passed as string
+AFTER_CURSOR_FILTER = text(
+    "inspections_distributed.end_time >= toDateTime64(:after_end_time, 6)"
+    " AND (inspections_distributed.end_time, inspections_distributed.inspection_id)"
+    " > (toDateTime64(:after_end_time, 6), toUUID(:after_inspection_id))"
+)
+
 
 class InspectionModel(Base):
     __tablename__ = "inspections_distributed"
@@ -42,6 +84,64 @@ class InspectionModel(Base):
     # result_data = Column(String)
 
 
+class InspectionsDailyStatsModel(Base):
+    __tablename__ = "inspections_daily_stats_distributed"
+
+    ou_id = Column(UUID, primary_key=True)
+    day = Column(Date, primary_key=True)
+    device_id = Column(UUID, primary_key=True)
+    ou_path = Column(ARRAY(UUID))
+    # counters of inserted rows, summed on read as rows of a key could be
+    # not merged yet
+    inspections = Column(Integer)
+    passed = Column(Integer)
+    failed = Column(Integer)
+
+
+# columns of Inspection, rows are serialized without ORM models
+INSPECTION_COLUMNS = (
+    InspectionModel.inspection_id.label("id"),
+    InspectionModel.worker_id,
+    InspectionModel.device_id,
+    InspectionModel.start_time.label("inspection_start"),
+    InspectionModel.end_time.label("inspection_end"),
+    InspectionModel.data.label("inspection_data"),
+)
+
+
+class WorkerInspectionModel(Base):
+    # copy of inspections sorted by worker, see migrations/worker_inspections.sql
+    __tablename__ = "worker_inspections_distributed"
+
+    inspection_id = Column(UUID, primary_key=True)
+    worker_id = Column(UUID)
+    device_id = Column(UUID)
+    start_time = Column(DateTime)
+    end_time = Column(DateTime)
+    data = Column(String)
+
+
+def _by_worker(table: Table, worker_id: str):
+    """
+    Inspections of the worker with INSPECTION_COLUMNS labels, latest first.
+    Table columns are used, ORM select drops LIMIT BY of ClickHouse select
+    """
+    return (
+        clickhouse_select(
+            table.c.inspection_id.label("id"),
+            table.c.worker_id,
+            table.c.device_id,
+            table.c.start_time.label("inspection_start"),
+            table.c.end_time.label("inspection_end"),
+            table.c.data.label("inspection_data"),
+        )
+        .where(table.c.worker_id == worker_id)
+        .order_by(table.c.end_time.desc(), table.c.inspection_id.desc())
+        # copies of inserted again inspection are removed only by merges
+        .limit_by([table.c.inspection_id], 1)
+    )
+
+
 class InspectionsRepository:
     def __init__(self, session: AsyncSession = Depends(get_session)):
         self._session = session
@@ -51,8 +151,17 @@ class InspectionsRepository:
         dto: InspectionsFindDto,
         available_ou: list[str],
         pagination: PaginationQueryParams,
-    ) -> InspectionsPaginatedDto:
-        data_select = select(InspectionModel)
+    ) -> tuple[list[Row], Pagination]:
+        """
+        Page of rows with INSPECTION_COLUMNS, pages of closed time windows
+        are cached for a few seconds
+        """
+        key = results_key(dto, available_ou, pagination)
+        cached = results_cache.get(key)
+        if cached is not None:
+            return cached
+
+        data_select = select(*INSPECTION_COLUMNS)
 
         if dto.worker_id:
             data_select = data_select.where(InspectionModel.worker_id == dto.worker_id)
@@ -68,84 +177,239 @@ class InspectionsRepository:
         if dto.device_id:
             data_select = data_select.where(InspectionModel.device_id == dto.device_id)
 
-        available_ou_uuids = [f"toUUID('{s}')" for s in available_ou]
-        available_ou_query = ",".join(available_ou_uuids)
-        data_select = data_select.where(
-            text(
-                f"hasAny(inspections_distributed.worker_path, [{available_ou_query}])"
+        data_select = self._filter_by_available_ou(data_select, available_ou)
+
+        count = None
+        if pagination.count_mode == CountMode.estimate and not dto.worker_id:
+            count = await self._estimate_count(dto, available_ou)
+        elif pagination.count_mode != CountMode.none:
+            # inspections of one worker are counted exactly, stats have no workers
+            count_select = data_select.with_only_columns(
+                [func.count()], maintain_column_froms=True
             )
+            count = (await self._session.execute(count_select)).scalars().first()
+
+            logger.info(f"Count of rows: {count}")
+
+        data_select = data_select.order_by(
+            InspectionModel.end_time,
+            InspectionModel.inspection_id,
         )
+        # one extra row tells if there is next page
+        data_select = data_select.limit(pagination.limit + 1)
+
+        if pagination.cursor is None:
+            data_select = data_select.offset((pagination.page - 1) * pagination.limit)
+        elif pagination.cursor:
+            data_select = data_select.where(self._after_cursor(pagination.cursor))
 
-        count_select = data_select.with_only_columns(
-            [func.count()], maintain_column_froms=True
+        rows = (await self._session.execute(data_select)).all()
+
+        has_more = len(rows) > pagination.limit
+        rows = rows[: pagination.limit]
+
+        next_cursor = None
+        if pagination.cursor is not None and has_more:
+            next_cursor = encode_cursor(
+                [rows[-1].inspection_end.isoformat(sep=" "), str(rows[-1].id)]
+            )
+
+        result = rows, Pagination(
+            page=pagination.page,
+            limit=pagination.limit,
+            count=count,
+            has_more=has_more,
+            next_cursor=next_cursor,
         )
-        # count_select.filter(and_(*where_clause))
-        count = (await self._session.execute(count_select)).scalars()
+        results_cache.set(key, result)
+
+        return result
+
+    async def _estimate_count(
+        self,
+        dto: InspectionsFindDto,
+        available_ou: list[str],
+    ) -> int:
+        """
+        Count of inspections from daily stats, window is widened to whole days,
+        so the estimate is not less than the exact count
+        """
+        stats = InspectionsDailyStatsModel
+        stats_select = select(func.sum(stats.inspections))
 
-        logger.info(f"Count of rows: {count}")
+        if dto.from_datetime:
+            stats_select = stats_select.where(stats.day >= dto.from_datetime.date())
 
-        data_select = data_select.limit(pagination.limit)
-        data_select = data_select.offset((pagination.page - 1) * pagination.limit)
+        if dto.to_datetime:
+            stats_select = stats_select.where(stats.day <= dto.to_datetime.date())
 
-        models = (await self._session.execute(data_select)).scalars().all()
+        if dto.device_id:
+            stats_select = stats_select.where(stats.device_id == dto.device_id)
 
-        inspections = []
+        stats_select = self._filter_by_available_ou(
+            stats_select,
+            available_ou,
+            STATS_OU_FILTER,
+        )
 
-        for model in models:
-            inspections.append(self.model_to_inspection(model))
+        return (await self._session.execute(stats_select)).scalars().first()
 
-        return InspectionsPaginatedDto(
-            data=inspections,
-            pagination=Pagination(
-                page=pagination.page,
-                limit=pagination.limit,
-                count=count.first(),
-            ),
+    @staticmethod
+    def _after_cursor(cursor: str):
+        values = decode_cursor(cursor)
+        if len(values) != 2 or not all(isinstance(value, str) for value in values):
+            raise InvalidCursorException(cursor)
+
+        # values are converted by ClickHouse, malformed ones would fail the query
+        try:
+            end_time = datetime.fromisoformat(values[0])
+            inspection_id = uuid.UUID(values[1])
+        except ValueError:
+            raise InvalidCursorException(cursor)
+
+        return AFTER_CURSOR_FILTER.bindparams(
+            after_end_time=end_time.isoformat(sep=" "),
+            after_inspection_id=str(inspection_id),
         )
 
     async def find_inspections_by_worker(
         self,
         dto: InspectionsFindBByWorkerDto,
-    ) -> list[Inspection]:
+    ) -> list[Row]:
+        """
+        Rows with INSPECTION_COLUMNS, latest first
+        """
         if dto.worker_id is None:
             raise HTTPException(400)
 
-        limit = None
         if dto.from_datetime is None:
-            limit = 10
+            return await self.find_latest_inspections_by_worker(
+                dto.worker_id,
+                LATEST_INSPECTIONS,
+            )
+
+        table = WorkerInspectionModel.__table__
+        keep_from = datetime.now(dto.from_datetime.tzinfo) - WORKER_INSPECTIONS_KEEP
+        if dto.from_datetime < keep_from:
+            table = InspectionModel.__table__
+
+        data_select = _by_worker(table, dto.worker_id).where(
+            table.c.end_time >= dto.from_datetime,
+        )
+
+        return (await self._session.execute(data_select)).all()
+
+    async def find_latest_inspections_by_worker(
+        self,
+        worker_id: str,
+        limit: int,
+    ) -> list[Row]:
+        """
+        Last limit inspections of the worker, read from the end of its range
+        in worker_inspections. Worker with fewer inspections there is read
+        from inspections, older ones are removed by TTL
+        """
+        data_select = _by_worker(WorkerInspectionModel.__table__, worker_id)
+        rows = (await self._session.execute(data_select.limit(limit))).all()
+
+        if len(rows) < limit:
+            data_select = _by_worker(InspectionModel.__table__, worker_id)
+            rows = (await self._session.execute(data_select.limit(limit))).all()
+
+        return rows
+
+    async def find_inspections_for_export(
+        self,
+        dto: InspectionsFindDto,
+        available_ou: list[str],
+        start: datetime,
+        end: datetime,
+        after: tuple[str, str] | None,
+        limit: int,
+    ) -> list[Row]:
+        """
+        Batch of inspections with end time in [start, end) after keyset
+        (end_time, inspection_id), rows have only exported columns
+        """
+        data_select = select(
+            InspectionModel.inspection_id,
+            InspectionModel.worker_id,
+            InspectionModel.device_id,
+            InspectionModel.start_time,
+            InspectionModel.end_time,
+            InspectionModel.data,
+        ).where(
+            InspectionModel.end_time >= start,
+            InspectionModel.end_time < end,
+        )
+
+        if dto.worker_id:
+            data_select = data_select.where(InspectionModel.worker_id == dto.worker_id)
 
-        data_select = select(InspectionModel)
+        if dto.device_id:
+            data_select = data_select.where(InspectionModel.device_id == dto.device_id)
 
-        data_select = data_select.where(InspectionModel.worker_id == dto.worker_id)
+        data_select = self._filter_by_available_ou(data_select, available_ou)
 
-        if limit is None:
+        if after is not None:
             data_select = data_select.where(
-                InspectionModel.end_time >= dto.from_datetime
+                AFTER_CURSOR_FILTER.bindparams(
+                    after_end_time=after[0],
+                    after_inspection_id=after[1],
+                ),
             )
 
-        if limit is not None:
-            logger.info("Using limit instead of time")
-            data_select = data_select.limit(limit)
+        data_select = data_select.order_by(
+            InspectionModel.end_time,
+            InspectionModel.inspection_id,
+        ).limit(limit)
+
+        return (await self._session.execute(data_select)).all()
 
-        result = await self._session.execute(data_select)
-        models = result.scalars().all()
+    async def get_daily_stats(
+        self,
+        dto: InspectionsStatsDto,
+        available_ou: list[str],
+    ) -> list[InspectionsDayStats]:
+        stats = InspectionsDailyStatsModel
+        stats_select = select(
+            stats.day,
+            func.sum(stats.inspections).label("inspections"),
+            func.sum(stats.passed).label("passed"),
+            func.sum(stats.failed).label("failed"),
+        ).where(
+            stats.day >= dto.from_date,
+            stats.day <= dto.to_date,
+        )
+
+        if dto.device_id:
+            stats_select = stats_select.where(stats.device_id == dto.device_id)
 
-        resulting_inspections = []
+        stats_select = self._filter_by_available_ou(
+            stats_select,
+            available_ou,
+            STATS_OU_FILTER,
+        )
+        stats_select = stats_select.group_by(stats.day).order_by(stats.day)
 
-        for model in models:
-            resulting_inspections.append(self.model_to_inspection(model))
+        rows = (await self._session.execute(stats_select)).all()
 
-        return resulting_inspections
+        return [InspectionsDayStats(**row._asdict()) for row in rows]
 
     @staticmethod
-    def model_to_inspection(model: InspectionModel) -> Inspection:
-        return Inspection(
-            id=str(model.inspection_id),
-            worker_id=str(model.worker_id),
-            device_id=str(model.device_id),
-            inspection_start=model.start_time,
-            inspection_end=model.end_time,
-            inspection_data=model.data,
-            # result=model.result,
-            # result_data=json.loads(model.result_data),
+    def _filter_by_available_ou(
+        data_select,
+        available_ou: list[str],
+        table_filter=OU_FILTER,
+    ):
+        # execution option is passed by clickhouse+asynch dialect to asynch
+        # cursor with execution context and sent with the query
+        table = Table(
+            "available_ou",
+            MetaData(),
+            Column("id", UUID),
+            clickhouse_data=[{"id": ou} for ou in available_ou],
+        )
+        return data_select.where(table_filter).execution_options(
+            external_tables=[table],
         )
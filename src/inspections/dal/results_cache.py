@@ -0,0 +1,103 @@
+import time
+from collections import OrderedDict
+from datetime import datetime
+from typing import Hashable
+
+from src.common.metrics import register_metrics_source
+from src.common.models import PaginationQueryParams
+from src.inspections.domain.inspections.models import InspectionsFindDto
+
+RESULTS_TTL = 5.0  # seconds
+RESULTS_SIZE = 1_000
+
+
+def _second(value: datetime | None) -> datetime | None:
+    # datetime parameters are sent to ClickHouse with whole seconds
+    return value.replace(microsecond=0) if value is not None else None
+
+
+def results_key(
+    dto: InspectionsFindDto,
+    available_ou: list[str],
+    pagination: PaginationQueryParams,
+) -> Hashable | None:
+    """
+    Key of the query, None if it should not be cached: its time window is
+    open or reaches now, so new inspections could be in it
+    """
+    if dto.to_datetime is None:
+        return None
+
+    if dto.to_datetime >= datetime.now(dto.to_datetime.tzinfo):
+        return None
+
+    return (
+        dto.worker_id,
+        dto.device_id,
+        dto.ou_id,
+        _second(dto.from_datetime),
+        _second(dto.to_datetime),
+        tuple(sorted(set(available_ou))),
+        # page is ignored with cursor
+        pagination.page if pagination.cursor is None else None,
+        pagination.limit,
+        pagination.cursor,
+        pagination.count_mode,
+    )
+
+
+class InspectionsResultsCache:
+    """
+    Pages of inspections search with short TTL and LRU eviction, dashboards
+    repeat the same queries every few seconds
+    """
+
+    def __init__(self, ttl: float, size: int) -> None:
+        self._ttl = ttl
+        self._size = size
+        self._results: OrderedDict[Hashable, tuple[float, object]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._bypassed = 0
+        self._evictions = 0
+
+    def get(self, key: Hashable | None) -> object | None:
+        if key is None:
+            self._bypassed += 1
+            return None
+
+        entry = self._results.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        self._results.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable | None, result: object) -> None:
+        if key is None:
+            return
+
+        self._results[key] = (time.monotonic() + self._ttl, result)
+        self._results.move_to_end(key)
+
+        while len(self._results) > self._size:
+            self._evictions += 1
+            self._results.popitem(last=False)
+
+    def snapshot(self) -> dict:
+        total = self._hits + self._misses
+        return {
+            "results": len(self._results),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / total if total else None,
+            "bypassed": self._bypassed,
+            "evictions": self._evictions,
+        }
+
+
+results_cache = InspectionsResultsCache(RESULTS_TTL, RESULTS_SIZE)
+register_metrics_source("inspections_results", results_cache.snapshot)
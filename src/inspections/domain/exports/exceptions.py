@@ -0,0 +1,33 @@
+from fastapi import HTTPException, status
+
+
+class ExportNotFound(HTTPException):
+    def __init__(self, export_id: str) -> None:
+        super().__init__(
+            status.HTTP_404_NOT_FOUND,
+            f"Export with ID: {export_id} not found",
+        )
+
+
+class ExportNotReady(HTTPException):
+    def __init__(self, export_id: str) -> None:
+        super().__init__(
+            status.HTTP_409_CONFLICT,
+            f"Export with ID: {export_id} is not finished",
+        )
+
+
+class ExportFormatNotAvailable(HTTPException):
+    def __init__(self, export_format: str) -> None:
+        super().__init__(
+            status.HTTP_400_BAD_REQUEST,
+            f"Export format {export_format} is not available",
+        )
+
+
+class InvalidExportPeriod(HTTPException):
+    def __init__(self) -> None:
+        super().__init__(
+            status.HTTP_400_BAD_REQUEST,
+            "Export period should end after it starts",
+        )
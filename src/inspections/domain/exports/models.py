@@ -0,0 +1,40 @@
+from datetime import datetime
+from enum import Enum
+
+from pydantic import BaseModel
+
+
+class ExportFormat(str, Enum):
+    csv = "csv"
+    ndjson = "ndjson"
+    # columnar, needs pyarrow installed
+    parquet = "parquet"
+
+
+class ExportStatus(str, Enum):
+    pending = "pending"
+    running = "running"
+    done = "done"
+    failed = "failed"
+
+
+class ExportCreateDto(BaseModel):
+    from_datetime: datetime
+    to_datetime: datetime
+    ou_id: str | None
+    worker_id: str | None
+    device_id: str | None
+    format: ExportFormat = ExportFormat.csv
+
+
+class ExportJob(BaseModel):
+    id: str
+    status: ExportStatus
+    format: ExportFormat
+    created_at: datetime
+    finished_at: datetime | None
+    # parts are months of the requested period, they are exported in parallel
+    parts_total: int
+    parts_done: int = 0
+    rows: int = 0
+    error: str | None
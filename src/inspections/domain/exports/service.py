@@ -0,0 +1,57 @@
+from fastapi import Depends
+
+from src.inspections.domain.exports.exceptions import (
+    ExportFormatNotAvailable,
+    ExportNotFound,
+    ExportNotReady,
+    InvalidExportPeriod,
+)
+from src.inspections.domain.exports.models import (
+    ExportCreateDto,
+    ExportJob,
+    ExportStatus,
+)
+from src.inspections.infra.export_files import is_format_available
+from src.inspections.infra.exports import ExportJobs, get_export_jobs
+from src.inspections.infra.structures_service import StructuresService
+
+
+class ExportService:
+    def __init__(
+        self,
+        structures: StructuresService = Depends(StructuresService),
+        jobs: ExportJobs = Depends(get_export_jobs),
+    ):
+        self._structures = structures
+        self._jobs = jobs
+
+    async def create_export(self, dto: ExportCreateDto, user_id: str) -> ExportJob:
+        if dto.to_datetime <= dto.from_datetime:
+            raise InvalidExportPeriod()
+
+        if not is_format_available(dto.format):
+            raise ExportFormatNotAvailable(dto.format.value)
+
+        available_ou = await self._structures.get_available_ou_for_user(user_id)
+
+        if dto.ou_id:
+            await self._structures.check_read_access(user_id, dto.ou_id, available_ou)
+            available_ou = [dto.ou_id]
+
+        return await self._jobs.create(dto, available_ou, user_id)
+
+    async def get_export(self, export_id: str, user_id: str) -> ExportJob:
+        job = await self._jobs.get(export_id, user_id)
+        if job is None:
+            raise ExportNotFound(export_id)
+
+        return job
+
+    async def get_export_file(
+        self, export_id: str, user_id: str
+    ) -> tuple[ExportJob, str]:
+        job = await self.get_export(export_id, user_id)
+        if job.status != ExportStatus.done:
+            raise ExportNotReady(export_id)
+
+        return job, self._jobs.path(job)
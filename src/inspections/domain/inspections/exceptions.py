@@ -0,0 +1,26 @@
+from fastapi import HTTPException, status
+
+
+class IngestionBufferFull(HTTPException):
+    def __init__(self, retry_after: int) -> None:
+        super().__init__(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            "Inspections ingestion buffer is full",
+            headers={"Retry-After": str(retry_after)},
+        )
+
+
+class InspectionsNotAvailable(HTTPException):
+    def __init__(self, count: int) -> None:
+        super().__init__(
+            status.HTTP_403_FORBIDDEN,
+            f"{count} inspections are of workers not available to user",
+        )
+
+
+class EventsQueueFull(HTTPException):
+    def __init__(self) -> None:
+        super().__init__(
+            status.HTTP_503_SERVICE_UNAVAILABLE,
+            "Inspection events queue is full",
+        )
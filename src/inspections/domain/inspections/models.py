@@ -1,5 +1,6 @@
-from datetime import datetime
+from datetime import date, datetime
 from enum import Enum
+from uuid import UUID
 
 from pydantic import BaseModel
 
@@ -106,3 +107,46 @@ class Inspection(BaseModel):
 class InspectionsPaginatedDto(BaseModel):
     pagination: Pagination
     data: list[Inspection]
+
+
+class InspectionsStatsDto(BaseModel):
+    from_date: date
+    to_date: date
+    ou_id: str | None
+    device_id: str | None
+
+
+class InspectionsDayStats(BaseModel):
+    day: date
+    inspections: int
+    passed: int
+    failed: int
+
+
+class InspectionsStats(BaseModel):
+    inspections: int
+    passed: int
+    failed: int
+    pass_rate: float | None
+    days: list[InspectionsDayStats]
+
+
+class InspectionRecord(BaseModel):
+    # same as row of inspections table, ids are checked before buffering,
+    # one bad row would fail the whole insert
+    inspection_id: UUID
+    worker_id: UUID
+    worker_path: list[UUID]
+    device_id: UUID
+    device_path: list[UUID]
+    start_time: datetime
+    end_time: datetime
+    data: str
+
+
+class InspectionsIngestDto(BaseModel):
+    inspections: list[InspectionRecord]
+
+
+class InspectionsIngestResult(BaseModel):
+    accepted: int
@@ -0,0 +1,44 @@
+"""
+Rows of inspections straight to JSON, output is the same as of Inspection
+and InspectionsPaginatedDto as response_model, without pydantic models
+"""
+import json
+
+from sqlalchemy.engine import Row
+
+from src.common.models import Pagination
+
+
+def _inspection(row: Row) -> dict:
+    return {
+        "id": str(row.id),
+        "worker_id": str(row.worker_id),
+        "device_id": str(row.device_id),
+        "inspection_start": row.inspection_start.isoformat(),
+        "inspection_end": row.inspection_end.isoformat(),
+        "inspection_data": row.inspection_data,
+    }
+
+
+def _dumps(content: dict | list) -> bytes:
+    # same options as JSONResponse
+    return json.dumps(
+        content,
+        ensure_ascii=False,
+        allow_nan=False,
+        indent=None,
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+def inspections_json(rows: list[Row]) -> bytes:
+    return _dumps([_inspection(row) for row in rows])
+
+
+def inspections_page_json(rows: list[Row], pagination: Pagination) -> bytes:
+    return _dumps(
+        {
+            "pagination": pagination.dict(),
+            "data": [_inspection(row) for row in rows],
+        },
+    )
@@ -0,0 +1,121 @@
+import asyncio
+import logging
+import time
+from collections import OrderedDict
+from functools import partial
+from typing import Awaitable, Callable
+
+from src.common.metrics import register_metrics_source
+
+logger = logging.getLogger(__name__)
+
+AVAILABLE_OU_TTL = 30.0  # seconds
+# after TTL cached set is still returned while it is refreshed in background
+AVAILABLE_OU_STALE = 300.0
+AVAILABLE_OU_SIZE = 10_000
+
+
+class AvailableOuCache:
+    """
+    Organization units available to users with TTL and stale-while-revalidate.
+    Only one load per user runs at a time, concurrent requests of the user
+    wait for it
+    """
+
+    def __init__(self, ttl: float, stale: float, size: int) -> None:
+        self._ttl = ttl
+        self._stale = stale
+        self._size = size
+        self._entries: OrderedDict[str, tuple[float, tuple[str, ...]]] = OrderedDict()
+        self._loading: dict[str, asyncio.Task] = {}
+        self._hits = 0
+        self._stale_hits = 0
+        self._misses = 0
+        self._loads = 0
+        self._coalesced = 0
+        self._failures = 0
+
+    async def get(
+        self,
+        user_id: str,
+        load: Callable[[], Awaitable[list[str]]],
+    ) -> list[str]:
+        entry = self._entries.get(user_id)
+        now = time.monotonic()
+
+        if entry is not None and now < entry[0]:
+            self._hits += 1
+            self._entries.move_to_end(user_id)
+            return list(entry[1])
+
+        if entry is not None and now < entry[0] + self._stale:
+            self._stale_hits += 1
+            self._refresh(user_id, load)
+            return list(entry[1])
+
+        self._misses += 1
+        # cancelled request should not cancel load shared with other requests
+        return list(await asyncio.shield(self._refresh(user_id, load)))
+
+    def _refresh(
+        self,
+        user_id: str,
+        load: Callable[[], Awaitable[list[str]]],
+    ) -> asyncio.Task:
+        task = self._loading.get(user_id)
+
+        if task is not None:
+            self._coalesced += 1
+            return task
+
+        self._loads += 1
+        task = asyncio.create_task(self._load(user_id, load))
+        task.add_done_callback(partial(self._done, user_id))
+        self._loading[user_id] = task
+
+        return task
+
+    async def _load(
+        self,
+        user_id: str,
+        load: Callable[[], Awaitable[list[str]]],
+    ) -> tuple[str, ...]:
+        value = tuple(await load())
+
+        self._entries[user_id] = (time.monotonic() + self._ttl, value)
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self._size:
+            self._entries.popitem(last=False)
+
+        return value
+
+    def _done(self, user_id: str, task: asyncio.Task) -> None:
+        self._loading.pop(user_id, None)
+
+        # exception is read here, background refresh could have no waiters
+        if not task.cancelled() and task.exception() is not None:
+            self._failures += 1
+            logger.warning(
+                f"Available OU of {user_id} not loaded: {task.exception()!r}",
+            )
+
+    def snapshot(self) -> dict:
+        total = self._hits + self._stale_hits + self._misses
+        return {
+            "users": len(self._entries),
+            "hits": self._hits,
+            "stale_hits": self._stale_hits,
+            "misses": self._misses,
+            "hit_rate": (self._hits + self._stale_hits) / total if total else None,
+            "loads": self._loads,
+            "coalesced": self._coalesced,
+            "failures": self._failures,
+        }
+
+
+available_ou_cache = AvailableOuCache(
+    AVAILABLE_OU_TTL,
+    AVAILABLE_OU_STALE,
+    AVAILABLE_OU_SIZE,
+)
+register_metrics_source("available_ou", available_ou_cache.snapshot)
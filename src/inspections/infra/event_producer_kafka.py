@@ -1,46 +1,166 @@
-# flake8: noqa: S311
+import asyncio
+import json
 import logging
-import random
+import time
+from collections import deque
+from functools import partial
 
 from aiokafka import AIOKafkaProducer
-from fastapi import Depends
+from fastapi import Depends, FastAPI
 from starlette.requests import Request
 
 from src.common.context.context import get_request
-from src.common.kafka.middleware import get_kafka_producer
+from src.common.kafka import KafkaConfiguration
+from src.common.metrics import register_metrics_source
+from src.inspections.domain.inspections.exceptions import EventsQueueFull
 from src.inspections.domain.inspections.models import Event
 
 logger = logging.getLogger(__name__)
 
+# delivery latency percentiles are computed over the last events
+LATENCY_WINDOW = 10_000
 
-class EventProducerKafka:
-    def __init__(
-        self,
-        producer: AIOKafkaProducer = Depends(get_kafka_producer),
-        request: Request = Depends(get_request),
-    ):
+
+def serialize_event(event: Event) -> bytes:
+    # same JSON as Event.json(), without pydantic encoders
+    return json.dumps(
+        {
+            "inspection_id": event.inspection_id,
+            "worker_id": event.worker_id,
+            "device_id": event.device_id,
+            "event_type": str(event.event_type),
+            "event_data": event.event_data,
+            "datetime": event.datetime.isoformat(),
+        },
+        separators=(",", ":"),
+    ).encode("utf-8")
+
+
+class EventsSender:
+    """
+    Events are put into bounded queue and sent to Kafka by background task,
+    request does not wait for Kafka. Messages are keyed by inspection_id, so
+    all events of an inspection go to one partition and keep their order.
+    Producer batches them by linger_ms, max_batch_size and compression_type
+    """
+
+    def __init__(self, topic: str, config: KafkaConfiguration) -> None:
+        self._topic = topic
+        self._config = config
+        self._producer: AIOKafkaProducer | None = None
+        self._queue: asyncio.Queue | None = None
+        self._task: asyncio.Task | None = None
+        self._latencies: deque[float] = deque(maxlen=LATENCY_WINDOW)
+        self._enqueued = 0
+        self._rejected = 0
+        self._delivered = 0
+        self._failures = 0
+        self._latency_sum = 0.0
+
+    async def start(self, producer: AIOKafkaProducer) -> None:
         self._producer = producer
-        self._request = request
+        self._queue = asyncio.Queue(self._config.queue_size)
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        # queued events are handed to producer, it sends them when stopped
+        try:
+            await asyncio.wait_for(self._queue.join(), self._config.drain_timeout)
+        except asyncio.TimeoutError:
+            logger.error(f"{self._queue.qsize()} events are not sent on shutdown")
+
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+    async def enqueue(self, events: list[Event]) -> None:
+        for event in events:
+            try:
+                await asyncio.wait_for(
+                    self._queue.put((time.monotonic(), event)),
+                    self._config.enqueue_timeout,
+                )
+            except asyncio.TimeoutError:
+                self._rejected += 1
+                raise EventsQueueFull()
+
+            self._enqueued += 1
+
+    async def _run(self) -> None:
+        while True:
+            enqueued_at, event = await self._queue.get()
+
+            try:
+                # waits only while producer buffer is full
+                delivery = await self._producer.send(
+                    self._topic,
+                    value=serialize_event(event),
+                    key=event.inspection_id.encode("utf-8"),
+                )
+                delivery.add_done_callback(partial(self._on_delivery, enqueued_at))
+            except Exception:
+                self._failures += 1
+                logger.exception(f"Event of inspection {event.inspection_id} not sent")
+            finally:
+                self._queue.task_done()
+
+    def _on_delivery(self, enqueued_at: float, delivery: asyncio.Future) -> None:
+        if delivery.cancelled() or delivery.exception() is not None:
+            self._failures += 1
+            return
+
+        latency = time.monotonic() - enqueued_at
+        self._delivered += 1
+        self._latency_sum += latency
+        self._latencies.append(latency)
+
+    def snapshot(self) -> dict:
+        latencies = sorted(self._latencies)
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "enqueued": self._enqueued,
+            "rejected": self._rejected,
+            "delivered": self._delivered,
+            "failures": self._failures,
+            "latency_mean": (
+                self._latency_sum / self._delivered if self._delivered else None
+            ),
+            "latency_p50": latencies[len(latencies) // 2] if latencies else None,
+            "latency_p99": (
+                latencies[int(len(latencies) * 0.99)] if latencies else None
+            ),
+        }
+
+
+def get_events_sender(
+    request: Request = Depends(get_request),
+) -> EventsSender | None:
+    # None when events are disabled, producer is not used then
+    return getattr(request.app.state, "EVENTS_SENDER", None)
+
+
+class EventProducerKafka:
+    def __init__(self, sender: EventsSender | None = Depends(get_events_sender)):
+        self._sender = sender
 
     async def produce(self, events: list[Event]):
-        topic = self._request.app.state.KAFKA_TOPIC
-        logger.debug(f"Sending {len(events)} to kafka topic: {topic}")
+        logger.debug(f"Enqueueing {len(events)} events")
+        await self._sender.enqueue(events)
 
-        partitions = await self._producer.partitions_for(topic)
 
-        batch = self._producer.create_batch()
+def initialize_events_sender(application: FastAPI, config: KafkaConfiguration) -> None:
+    """
+    Should be called before initialize_kafka_middleware, so on shutdown
+    queue is handed to producer before the producer is stopped
+    """
+    sender = EventsSender(config.topic, config)
+    application.state.EVENTS_SENDER = sender
 
-        for event in events:
-            metadata = batch.append(
-                key=None, timestamp=None, value=event.json().encode("utf-8")
-            )
-            if metadata is None:
-                partition = random.choice(tuple(partitions))
-                await self._producer.send_batch(batch, topic, partition=partition)
-                batch = self._producer.create_batch()
-                continue
-
-        partition = random.choice(tuple(partitions))
-        await self._producer.send_batch(batch, topic, partition=partition)
-
-        logger.debug("All events are sent")
+    async def start() -> None:
+        await sender.start(application.state.KAFKA_PRODUCER)
+
+    register_metrics_source("kafka_events", sender.snapshot)
+    application.add_event_handler(event_type="startup", func=start)
+    application.add_event_handler(event_type="shutdown", func=sender.close)
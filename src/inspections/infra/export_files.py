@@ -0,0 +1,141 @@
+"""
+Writers of export files. Every month of export is written to its own part
+file batch by batch, finished parts are merged into one file in month order
+"""
+
+import csv
+import json
+import shutil
+from typing import IO, Iterable
+
+from sqlalchemy.engine import Row
+
+from src.inspections.domain.exports.models import ExportFormat
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# same names as in Inspection
+COLUMNS = [
+    "id",
+    "worker_id",
+    "device_id",
+    "inspection_start",
+    "inspection_end",
+    "inspection_data",
+]
+MEDIA_TYPES = {
+    ExportFormat.csv: "text/csv",
+    ExportFormat.ndjson: "application/x-ndjson",
+    ExportFormat.parquet: "application/vnd.apache.parquet",
+}
+
+
+def is_format_available(export_format: ExportFormat) -> bool:
+    return export_format != ExportFormat.parquet or pyarrow is not None
+
+
+def _values(row: Row) -> tuple:
+    return (
+        str(row.inspection_id),
+        str(row.worker_id),
+        str(row.device_id),
+        row.start_time.isoformat(),
+        row.end_time.isoformat(),
+        row.data,
+    )
+
+
+class CsvPart:
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "w", newline="")
+        self._writer = csv.writer(self._file)
+
+    def write(self, rows: Iterable[Row]) -> None:
+        self._writer.writerows(_values(row) for row in rows)
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class NdjsonPart:
+    def __init__(self, path: str) -> None:
+        self._file = open(path, "w")
+
+    def write(self, rows: Iterable[Row]) -> None:
+        self._file.writelines(
+            json.dumps(dict(zip(COLUMNS, _values(row), strict=True))) + "\n"
+            for row in rows
+        )
+
+    def close(self) -> None:
+        self._file.close()
+
+
+class ParquetPart:
+    def __init__(self, path: str) -> None:
+        self._schema = pyarrow.schema(
+            [(column, pyarrow.string()) for column in COLUMNS],
+        )
+        self._writer = pyarrow.parquet.ParquetWriter(path, self._schema)
+
+    def write(self, rows: Iterable[Row]) -> None:
+        # every batch is a row group
+        columns = list(zip(*(_values(row) for row in rows), strict=True))
+        if columns:
+            self._writer.write_table(
+                pyarrow.Table.from_arrays(
+                    [pyarrow.array(column) for column in columns],
+                    schema=self._schema,
+                ),
+            )
+
+    def close(self) -> None:
+        self._writer.close()
+
+
+def open_part(
+    export_format: ExportFormat,
+    path: str,
+) -> CsvPart | NdjsonPart | ParquetPart:
+    match export_format:
+        case ExportFormat.csv:
+            return CsvPart(path)
+        case ExportFormat.ndjson:
+            return NdjsonPart(path)
+        case ExportFormat.parquet:
+            return ParquetPart(path)
+
+
+def _copy(parts: list[str], output: IO) -> None:
+    for part in parts:
+        with open(part, "rb") as source:
+            shutil.copyfileobj(source, output)
+
+
+def merge_parts(export_format: ExportFormat, parts: list[str], path: str) -> None:
+    """
+    Joins part files into export file, parts are read by chunks or row groups
+    """
+    match export_format:
+        case ExportFormat.csv:
+            with open(path, "w", newline="") as output:
+                csv.writer(output).writerow(COLUMNS)
+            with open(path, "ab") as output:
+                _copy(parts, output)
+        case ExportFormat.ndjson:
+            with open(path, "wb") as output:
+                _copy(parts, output)
+        case ExportFormat.parquet:
+            writer = None
+            for part in parts:
+                source = pyarrow.parquet.ParquetFile(part)
+                if writer is None:
+                    writer = pyarrow.parquet.ParquetWriter(path, source.schema_arrow)
+                for group in range(source.num_row_groups):
+                    writer.write_table(source.read_row_group(group))
+            if writer is not None:
+                writer.close()
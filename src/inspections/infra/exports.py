@@ -0,0 +1,331 @@
+import asyncio
+import json
+import logging
+import os
+from datetime import datetime, timedelta
+from uuid import UUID, uuid4
+
+from fastapi import Depends, FastAPI, Request
+from sqlalchemy import orm
+from sqlalchemy.ext.asyncio import AsyncEngine, AsyncSession, create_async_engine
+
+from src.common.clickhouse.configuration import ClickhouseConfiguration
+from src.common.context.context import get_request
+from src.common.metrics import register_metrics_source
+from src.inspections.configuration import ExportsConfiguration
+from src.inspections.dal.inspections_repository import InspectionsRepository
+from src.inspections.domain.exports.models import (
+    ExportCreateDto,
+    ExportJob,
+    ExportStatus,
+)
+from src.inspections.domain.inspections.models import InspectionsFindDto
+from src.inspections.infra.export_files import merge_parts, open_part
+
+logger = logging.getLogger(__name__)
+
+
+def month_parts(start: datetime, end: datetime) -> list[tuple[datetime, datetime]]:
+    """
+    [start, end) split by months, same as partitions of inspections table
+    """
+    retval = []
+
+    while start < end:
+        next_month = (start.replace(day=1) + timedelta(days=32)).replace(
+            day=1,
+            hour=0,
+            minute=0,
+            second=0,
+            microsecond=0,
+        )
+        retval.append((start, min(next_month, end)))
+        start = next_month
+
+    return retval
+
+
+class ExportJobs:
+    """
+    Export jobs. Job is split by months, months of all jobs of the process
+    are exported in parallel up to parallel_parts, every month is read by
+    keyset batches and written to its own file, so memory does not depend on
+    size of export. Job runs in the process which created it, its state is
+    saved as {id}.json next to the file, so any process sharing directory
+    answers status and download
+    """
+
+    def __init__(
+        self,
+        config: ExportsConfiguration,
+        clickhouse: ClickhouseConfiguration,
+    ) -> None:
+        self._config = config
+        self._clickhouse = clickhouse
+        self._engine: AsyncEngine | None = None
+        self._session_factory = None
+        self._parts: asyncio.Semaphore | None = None
+        self._jobs: dict[str, tuple[str | None, ExportJob]] = {}
+        self._tasks: dict[str, asyncio.Task] = {}
+        self._running_parts = 0
+        self._rows = 0
+        self._failures = 0
+
+    async def start(self) -> None:
+        os.makedirs(self._config.directory, exist_ok=True)
+        self._engine = create_async_engine(
+            self._clickhouse.url,
+            echo=self._clickhouse.echo,
+            future=True,
+            pool_size=self._config.parallel_parts,
+        )
+        self._session_factory = orm.sessionmaker(
+            autocommit=False,
+            autoflush=False,
+            bind=self._engine,
+            expire_on_commit=False,
+            class_=AsyncSession,
+        )
+        self._parts = asyncio.Semaphore(self._config.parallel_parts)
+
+    async def close(self) -> None:
+        for task in self._tasks.values():
+            task.cancel()
+        await asyncio.gather(*self._tasks.values(), return_exceptions=True)
+
+        await self._engine.dispose()
+
+    async def create(
+        self,
+        dto: ExportCreateDto,
+        available_ou: list[str],
+        user_id: str | None,
+    ) -> ExportJob:
+        await asyncio.to_thread(self._remove_expired)
+
+        # to_datetime is inclusive, parameters are passed with whole seconds
+        parts = month_parts(dto.from_datetime, dto.to_datetime + timedelta(seconds=1))
+        job = ExportJob(
+            id=str(uuid4()),
+            status=ExportStatus.pending,
+            format=dto.format,
+            created_at=datetime.now(),
+            parts_total=len(parts),
+        )
+        self._jobs[job.id] = (user_id, job)
+        await self._save(job)
+        find_dto = InspectionsFindDto(worker_id=dto.worker_id, device_id=dto.device_id)
+        self._tasks[job.id] = asyncio.create_task(
+            self._run(job, find_dto, available_ou, parts),
+        )
+
+        return job
+
+    async def get(self, export_id: str, user_id: str | None) -> ExportJob | None:
+        try:
+            UUID(export_id)
+        except ValueError:
+            return None
+
+        stored = await asyncio.to_thread(_read_job, self._job_path(export_id))
+        if stored is None or stored[0] != user_id:
+            return None
+
+        return stored[1]
+
+    def path(self, job: ExportJob) -> str:
+        return os.path.join(self._config.directory, f"{job.id}.{job.format.value}")
+
+    def _job_path(self, export_id: str) -> str:
+        return os.path.join(self._config.directory, f"{export_id}.json")
+
+    async def _save(self, job: ExportJob) -> None:
+        owner, _ = self._jobs[job.id]
+        content = json.dumps({"owner": owner, "job": json.loads(job.json())})
+        await asyncio.to_thread(_write_atomic, self._job_path(job.id), content)
+
+    async def _run(
+        self,
+        job: ExportJob,
+        dto: InspectionsFindDto,
+        available_ou: list[str],
+        parts: list[tuple[datetime, datetime]],
+    ) -> None:
+        paths = [
+            os.path.join(self._config.directory, f"{job.id}.{i}.part")
+            for i in range(len(parts))
+        ]
+        job.status = ExportStatus.running
+        await self._save(job)
+
+        try:
+            # failed month cancels the others
+            async with asyncio.TaskGroup() as group:
+                for (start, end), path in zip(parts, paths, strict=True):
+                    group.create_task(
+                        self._part(job, dto, available_ou, start, end, path),
+                    )
+            await asyncio.to_thread(merge_parts, job.format, paths, self.path(job))
+            job.status = ExportStatus.done
+        except Exception as exc:
+            if isinstance(exc, ExceptionGroup):
+                exc = exc.exceptions[0]
+            self._failures += 1
+            job.status = ExportStatus.failed
+            job.error = repr(exc)
+            logger.exception(f"Export {job.id} failed")
+        finally:
+            job.finished_at = datetime.now()
+            self._tasks.pop(job.id, None)
+            for path in paths:
+                await asyncio.to_thread(_remove, path)
+            await self._save(job)
+
+    async def _part(
+        self,
+        job: ExportJob,
+        dto: InspectionsFindDto,
+        available_ou: list[str],
+        start: datetime,
+        end: datetime,
+        path: str,
+    ) -> None:
+        async with self._parts:
+            self._running_parts += 1
+            writer = await asyncio.to_thread(open_part, job.format, path)
+            try:
+                await self._read_part(job, writer, dto, available_ou, start, end)
+            finally:
+                self._running_parts -= 1
+                await asyncio.to_thread(writer.close)
+
+        job.parts_done += 1
+        await self._save(job)
+
+    async def _read_part(
+        self,
+        job: ExportJob,
+        writer,
+        dto: InspectionsFindDto,
+        available_ou: list[str],
+        start: datetime,
+        end: datetime,
+    ) -> None:
+        batch_size = self._config.batch_size
+        after = None
+
+        async with self._session_factory() as session:
+            repository = InspectionsRepository(session)
+            while True:
+                rows = await repository.find_inspections_for_export(
+                    dto,
+                    available_ou,
+                    start,
+                    end,
+                    after,
+                    batch_size,
+                )
+                await asyncio.to_thread(writer.write, rows)
+
+                job.rows += len(rows)
+                self._rows += len(rows)
+                if len(rows) < batch_size:
+                    return
+
+                last = rows[-1]
+                after = (last.end_time.isoformat(sep=" "), str(last.inspection_id))
+
+    def _remove_expired(self) -> None:
+        """
+        Removes jobs finished before keep_for in all processes, job which is
+        not saved for keep_for was left by stopped process and is removed too
+        """
+        expire_before = datetime.now() - timedelta(seconds=self._config.keep_for)
+
+        for export_id, (_, job) in list(self._jobs.items()):
+            if job.finished_at is not None and job.finished_at < expire_before:
+                del self._jobs[export_id]
+
+        for name in os.listdir(self._config.directory):
+            if name.endswith(".json"):
+                self._remove_if_expired(
+                    os.path.join(self._config.directory, name),
+                    expire_before,
+                )
+
+    def _remove_if_expired(self, path: str, expire_before: datetime) -> None:
+        stored = _read_job(path)
+        if stored is None:
+            return
+
+        _, job = stored
+        if job.finished_at is not None:
+            expired = job.finished_at < expire_before
+        else:
+            expired = _modified_at(path) < expire_before.timestamp()
+
+        if expired and job.id not in self._tasks:
+            _remove(self.path(job))
+            _remove(path)
+
+    def snapshot(self) -> dict:
+        # jobs created by this process
+        statuses = {status.value: 0 for status in ExportStatus}
+        for _, job in self._jobs.values():
+            statuses[job.status.value] += 1
+
+        return {
+            "jobs": statuses,
+            "running_parts": self._running_parts,
+            "rows": self._rows,
+            "failures": self._failures,
+        }
+
+
+def _remove(path: str) -> None:
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _modified_at(path: str) -> float:
+    try:
+        return os.path.getmtime(path)
+    except FileNotFoundError:
+        return float("inf")
+
+
+def _read_job(path: str) -> tuple[str | None, ExportJob] | None:
+    try:
+        with open(path, encoding="utf-8") as file:
+            stored = json.load(file)
+    except FileNotFoundError:
+        return None
+
+    return stored["owner"], ExportJob(**stored["job"])
+
+
+def _write_atomic(path: str, content: str) -> None:
+    # readers in other processes see old or new state, never a part of it
+    temporary = f"{path}.{uuid4().hex}.tmp"
+    with open(temporary, "w", encoding="utf-8") as file:
+        file.write(content)
+    os.replace(temporary, path)
+
+
+def get_export_jobs(request: Request = Depends(get_request)) -> ExportJobs:
+    return request.app.state.EXPORT_JOBS
+
+
+def initialize_exports(
+    application: FastAPI,
+    config: ExportsConfiguration,
+    clickhouse: ClickhouseConfiguration,
+) -> None:
+    jobs = ExportJobs(config, clickhouse)
+    application.state.EXPORT_JOBS = jobs
+
+    register_metrics_source("exports", jobs.snapshot)
+    application.add_event_handler(event_type="startup", func=jobs.start)
+    application.add_event_handler(event_type="shutdown", func=jobs.close)
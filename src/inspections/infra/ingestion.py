@@ -0,0 +1,191 @@
+import asyncio
+import logging
+import math
+import time
+from uuid import uuid4
+
+from fastapi import Depends, FastAPI, Request
+from sqlalchemy.ext.asyncio import AsyncEngine, create_async_engine
+
+from src.common.clickhouse.configuration import ClickhouseConfiguration
+from src.common.context.context import get_request
+from src.common.metrics import register_metrics_source
+from src.inspections.configuration import IngestionConfiguration
+from src.inspections.dal.inspections_repository import InspectionModel
+from src.inspections.domain.inspections.exceptions import IngestionBufferFull
+
+logger = logging.getLogger(__name__)
+
+
+class InspectionsIngestionBuffer:
+    """
+    Inspections received by HTTP are kept in memory and inserted into
+    inspections_distributed by one background task, when flush_rows are
+    buffered or every flush_interval, so ClickHouse gets a few large inserts.
+    When buffered and inserting rows reach max_rows requests wait for space
+    and get 503 after wait_timeout. Rows are not durable until inserted,
+    buffer is flushed on shutdown.
+    Failed insert is retried with the same rows and the same
+    insert_deduplication_token, so blocks written before the failure are
+    skipped by ClickHouse and by materialized views, rows buffered meanwhile
+    go to the next insert
+    """
+
+    def __init__(
+        self,
+        config: IngestionConfiguration,
+        clickhouse: ClickhouseConfiguration,
+    ) -> None:
+        self._config = config
+        self._clickhouse = clickhouse
+        self._engine: AsyncEngine | None = None
+        self._rows: list[dict] = []
+        # rows of the current insert, kept until inserted
+        self._batch: list[dict] | None = None
+        self._token: str | None = None
+        self._space: asyncio.Condition | None = None
+        self._wake: asyncio.Event | None = None
+        self._task: asyncio.Task | None = None
+        self._closing = False
+        self._accepted = 0
+        self._rejected = 0
+        self._inserts = 0
+        self._inserted = 0
+        self._failures = 0
+        self._lost = 0
+        self._insert_seconds = 0.0
+
+    async def start(self) -> None:
+        self._engine = create_async_engine(
+            self._clickhouse.url,
+            echo=self._clickhouse.echo,
+            future=True,
+            pool_size=1,
+        )
+        self._space = asyncio.Condition()
+        self._wake = asyncio.Event()
+        self._task = asyncio.create_task(self._run())
+
+    async def close(self) -> None:
+        self._closing = True
+        self._wake.set()
+        await self._task
+
+        # last attempt, rows which are not inserted now are lost
+        while self._pending() and await self._flush():
+            pass
+        if self._pending():
+            lost = len(self._batch or []) + len(self._rows)
+            self._lost += lost
+            logger.error(f"{lost} inspections are not inserted on shutdown")
+
+        await self._engine.dispose()
+
+    def _pending(self) -> bool:
+        return self._batch is not None or bool(self._rows)
+
+    def _fits(self, size: int) -> bool:
+        used = len(self._rows) + len(self._batch or [])
+        # request bigger than the buffer is accepted into empty buffer
+        return used == 0 or used + size <= self._config.max_rows
+
+    async def add(self, rows: list[dict]) -> None:
+        if not self._fits(len(rows)):
+            try:
+                async with self._space:
+                    await asyncio.wait_for(
+                        self._space.wait_for(lambda: self._fits(len(rows))),
+                        self._config.wait_timeout,
+                    )
+            except asyncio.TimeoutError:
+                self._rejected += len(rows)
+                raise IngestionBufferFull(math.ceil(self._config.flush_interval))
+
+        self._rows.extend(rows)
+        self._accepted += len(rows)
+
+        if len(self._rows) >= self._config.flush_rows:
+            self._wake.set()
+
+    async def _run(self) -> None:
+        while not self._closing:
+            try:
+                await asyncio.wait_for(self._wake.wait(), self._config.flush_interval)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+            if self._pending() and not self._closing:
+                if not await self._flush():
+                    await asyncio.sleep(self._config.retry_backoff)
+
+    async def _flush(self) -> bool:
+        if self._batch is None:
+            self._batch, self._rows = self._rows, []
+            self._token = str(uuid4())
+
+        rows = self._batch
+        insert = InspectionModel.__table__.insert().execution_options(
+            settings={
+                "insert_deduplication_token": self._token,
+                # daily stats are counted by materialized view on every insert
+                "deduplicate_blocks_in_dependent_materialized_views": 1,
+            },
+        )
+        started = time.monotonic()
+
+        try:
+            async with self._engine.connect() as connection:
+                await connection.execute(insert, rows)
+        except Exception:
+            self._failures += 1
+            logger.exception(f"Insert of {len(rows)} inspections failed")
+            return False
+
+        self._batch = None
+        async with self._space:
+            self._space.notify_all()
+        if len(self._rows) >= self._config.flush_rows:
+            self._wake.set()
+
+        self._inserts += 1
+        self._inserted += len(rows)
+        self._insert_seconds += time.monotonic() - started
+        return True
+
+    def snapshot(self) -> dict:
+        return {
+            "buffered": len(self._rows),
+            "inserting": len(self._batch or []),
+            "accepted": self._accepted,
+            "rejected": self._rejected,
+            "inserts": self._inserts,
+            "inserted": self._inserted,
+            "rows_per_insert": (
+                self._inserted / self._inserts if self._inserts else None
+            ),
+            "insert_seconds": (
+                self._insert_seconds / self._inserts if self._inserts else None
+            ),
+            "failures": self._failures,
+            "lost": self._lost,
+        }
+
+
+def get_ingestion_buffer(
+    request: Request = Depends(get_request),
+) -> InspectionsIngestionBuffer:
+    return request.app.state.INGESTION_BUFFER
+
+
+def initialize_ingestion(
+    application: FastAPI,
+    config: IngestionConfiguration,
+    clickhouse: ClickhouseConfiguration,
+) -> None:
+    buffer = InspectionsIngestionBuffer(config, clickhouse)
+    application.state.INGESTION_BUFFER = buffer
+
+    register_metrics_source("ingestion", buffer.snapshot)
+    application.add_event_handler(event_type="startup", func=buffer.start)
+    application.add_event_handler(event_type="shutdown", func=buffer.close)
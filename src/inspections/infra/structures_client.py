@@ -0,0 +1,117 @@
+import asyncio
+import logging
+
+import httpx
+from fastapi import Depends, FastAPI, Request
+
+from src.common.context.context import get_request
+from src.common.metrics import register_metrics_source
+from src.inspections.configuration import StructuresClientConfiguration
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {502, 503, 504}
+# pool timeout means all connections are busy, retry would only add load
+RETRY_ERRORS = (
+    httpx.ConnectError,
+    httpx.ConnectTimeout,
+    httpx.ReadTimeout,
+    httpx.RemoteProtocolError,
+)
+
+
+class StructuresClient:
+    """
+    Application scoped client for structures service, connections are kept
+    alive in pool and reused by all requests of the process
+    """
+
+    def __init__(self, url: str, config: StructuresClientConfiguration) -> None:
+        self._url = url
+        self._config = config
+        self._client: httpx.AsyncClient | None = None
+        self._requests = 0
+        self._connections = 0
+        self._retries = 0
+        self._failures = 0
+
+    async def _trace(self, event: str, info: dict) -> None:
+        # called by httpcore, TCP connect happens only for new connections
+        if event == "connection.connect_tcp.started":
+            self._connections += 1
+
+    async def _on_request(self, request: httpx.Request) -> None:
+        self._requests += 1
+        request.extensions["trace"] = self._trace
+
+    async def start(self) -> None:
+        config = self._config
+        self._client = httpx.AsyncClient(
+            base_url=f"http://{self._url}",
+            limits=httpx.Limits(
+                max_connections=config.max_connections,
+                max_keepalive_connections=config.max_keepalive_connections,
+                keepalive_expiry=config.keepalive_expiry,
+            ),
+            timeout=httpx.Timeout(
+                config.read_timeout,
+                connect=config.connect_timeout,
+                pool=config.pool_timeout,
+            ),
+            event_hooks={"request": [self._on_request]},
+        )
+
+    async def close(self) -> None:
+        await self._client.aclose()
+        self._client = None
+
+    async def get(self, path: str, headers: dict | None = None) -> httpx.Response:
+        """
+        GET with retries on connection errors and unavailable responses
+        """
+        attempt = 0
+
+        while True:
+            try:
+                response = await self._client.get(path, headers=headers)
+                if response.status_code not in RETRY_STATUSES:
+                    return response
+                if attempt >= self._config.retries:
+                    return response
+            except RETRY_ERRORS as exc:
+                if attempt >= self._config.retries:
+                    self._failures += 1
+                    raise exc
+                logger.warning(f"Structures request {path} failed: {exc!r}")
+
+            self._retries += 1
+            await asyncio.sleep(self._config.retry_backoff * 2**attempt)
+            attempt += 1
+
+    def snapshot(self) -> dict:
+        return {
+            "requests": self._requests,
+            "connections": self._connections,
+            "reused": (
+                1 - self._connections / self._requests if self._requests else None
+            ),
+            "retries": self._retries,
+            "failures": self._failures,
+        }
+
+
+def get_structures_client(request: Request = Depends(get_request)) -> StructuresClient:
+    return request.app.state.STRUCTURES_CLIENT
+
+
+def initialize_structures_client(
+    application: FastAPI,
+    url: str,
+    config: StructuresClientConfiguration,
+) -> None:
+    client = StructuresClient(url, config)
+    application.state.STRUCTURES_CLIENT = client
+
+    register_metrics_source("structures_client", client.snapshot)
+    application.add_event_handler(event_type="startup", func=client.start)
+    application.add_event_handler(event_type="shutdown", func=client.close)
@@ -1,9 +1,13 @@
 import logging
+from functools import partial
 
-import httpx
-from fastapi import Depends, HTTPException, Request
+from fastapi import Depends, HTTPException
 
-from src.common.context.context import get_request
+from src.inspections.infra.available_ou import available_ou_cache
+from src.inspections.infra.structures_client import (
+    StructuresClient,
+    get_structures_client,
+)
 from src.structures.domain.devices.models import DeviceExamForWorker
 
 logger = logging.getLogger(__name__)
@@ -12,31 +16,48 @@ logger = logging.getLogger(__name__)
 class StructuresService:
     def __init__(
         self,
-        request: Request = Depends(get_request),
+        client: StructuresClient = Depends(get_structures_client),
     ):
-        self._request = request
+        self._client = client
 
     async def worker_can_take_exam(
         self, device_id: str, worker_id: str
     ) -> DeviceExamForWorker:
-        async with httpx.AsyncClient() as client:
-            result = await client.get(
-                f"http://{self._request.app.state.STRUCTURES_URL}/devices/{device_id}/exam/{worker_id}",
-            )
-            # json -> DeviceExamForWorker
-            if result.status_code == 200:
-                return DeviceExamForWorker(**result.json())
-            else:
-                raise HTTPException(status_code=403)
+        result = await self._client.get(f"/devices/{device_id}/exam/{worker_id}")
+        # json -> DeviceExamForWorker
+        if result.status_code == 200:
+            return DeviceExamForWorker(**result.json())
+        else:
+            raise HTTPException(status_code=403)
 
     async def get_available_ou_for_user(self, user_id: str) -> list[str]:
-        async with httpx.AsyncClient() as client:
-            result = await client.get(
-                f"http://{self._request.app.state.STRUCTURES_URL}/users/{user_id}",
-            )
-
-            if result.status_code == 200:
-                logger.debug(result.json())
-                return result.json()["read"]
-            else:
-                raise HTTPException(status_code=404)
+        return await available_ou_cache.get(
+            user_id,
+            partial(self._load_available_ou, user_id),
+        )
+
+    async def check_read_access(
+        self, user_id: str, ou_id: str, available_ou: list[str]
+    ) -> None:
+        """
+        Raises 403 when organization unit is not available to user, units
+        below available ones are checked by structures
+        """
+        if ou_id in available_ou:
+            return
+
+        result = await self._client.get(
+            f"/organization-units/{ou_id}",
+            headers={"X-User-Id": user_id},
+        )
+        if result.status_code != 200:
+            raise HTTPException(status_code=403)
+
+    async def _load_available_ou(self, user_id: str) -> list[str]:
+        result = await self._client.get(f"/users/{user_id}")
+
+        if result.status_code == 200:
+            logger.debug(result.json())
+            return result.json()["read"]
+        else:
+            raise HTTPException(status_code=404)
@@ -0,0 +1,68 @@
+/*
+ * Дневная статистика осмотров по подразделению работника и устройству.
+ * ou_id это подразделение работника (первый элемент worker_path), весь путь
+ * хранится в ou_path, поэтому фильтр по доступным подразделениям такой же,
+ * как у осмотров, и каждый осмотр считается один раз.
+ * Осмотры считаются суммой count() по вставкам, счетчики читаются без
+ * -Merge функций. Повтор вставки после ошибки идет с тем же
+ * insert_deduplication_token и deduplicate_blocks_in_dependent_materialized_views,
+ * поэтому в materialized view не попадает. Осмотр, повторно отправленный
+ * клиентом, считается дважды, как и в таблице осмотров до слияния
+ * ReplacingMergeTree.
+ */
+CREATE TABLE inspections.inspections_daily_stats ON CLUSTER 'data-shards'
+(
+    `ou_id` UUID,
+    `day` Date,
+    `device_id` UUID,
+    `ou_path` SimpleAggregateFunction(anyLast, Array(UUID)),
+    `inspections` SimpleAggregateFunction(sum, UInt64),
+    `passed` SimpleAggregateFunction(sum, UInt64),
+    `failed` SimpleAggregateFunction(sum, UInt64)
+)
+ENGINE=ReplicatedAggregatingMergeTree('/tables/{shard}/inspections_daily_stats', '{replica}')
+ORDER BY (`ou_id`, `day`, `device_id`)
+PARTITION BY toYYYYMM(`day`);
+
+/* Заполняется при каждой вставке в таблицу осмотров на шарде */
+CREATE MATERIALIZED VIEW inspections.materialize_inspections_daily_stats ON CLUSTER 'data-shards'
+TO inspections.inspections_daily_stats
+AS SELECT
+    `worker_path`[1] as `ou_id`,
+    toDate(`end_time`) as `day`,
+    `device_id`,
+    anyLast(`worker_path`) as `ou_path`,
+    count() as `inspections`,
+    countIf(JSONExtractString(replaceAll(`data`, '\'', '"'), 'result') = 'PASS') as `passed`,
+    countIf(JSONExtractString(replaceAll(`data`, '\'', '"'), 'result') = 'FAILED') as `failed`
+FROM inspections.inspections
+GROUP BY `ou_id`, `day`, `device_id`;
+
+CREATE TABLE inspections.inspections_daily_stats_distributed ON CLUSTER coordinators
+(
+    `ou_id` UUID,
+    `day` Date,
+    `device_id` UUID,
+    `ou_path` SimpleAggregateFunction(anyLast, Array(UUID)),
+    `inspections` SimpleAggregateFunction(sum, UInt64),
+    `passed` SimpleAggregateFunction(sum, UInt64),
+    `failed` SimpleAggregateFunction(sum, UInt64)
+)
+ENGINE = Distributed('data-shards', inspections, inspections_daily_stats);
+
+/*
+ * Заполнение статистики по осмотрам, вставленным до создания materialized view.
+ * Выполняется на каждой шарде, время создания view подставить вместо {created}.
+ */
+INSERT INTO inspections.inspections_daily_stats
+SELECT
+    `worker_path`[1] as `ou_id`,
+    toDate(`end_time`) as `day`,
+    `device_id`,
+    anyLast(`worker_path`) as `ou_path`,
+    count() as `inspections`,
+    countIf(JSONExtractString(replaceAll(`data`, '\'', '"'), 'result') = 'PASS') as `passed`,
+    countIf(JSONExtractString(replaceAll(`data`, '\'', '"'), 'result') = 'FAILED') as `failed`
+FROM inspections.inspections
+WHERE `end_time` < '{created}'
+GROUP BY `ou_id`, `day`, `device_id`;
@@ -0,0 +1,64 @@
+/*
+ * Осмотры, отсортированные по работнику и времени окончания, для последних
+ * осмотров работника. Запрос с worker_id и ORDER BY end_time DESC LIMIT N
+ * читает с конца диапазона работника несколько гранул на каждой шарде.
+ * В отличие от проекции таблица используется всегда.
+ * Хранятся только осмотры за 90 дней (WORKER_INSPECTIONS_KEEP в
+ * inspections_repository.py), более старые читаются из inspections через
+ * проекцию. Партиции по месяцам удаляются по TTL целиком.
+ * Повторно вставленный осмотр удаляется только при слиянии, поэтому запросы
+ * читают с LIMIT 1 BY inspection_id.
+ */
+CREATE TABLE inspections.worker_inspections ON CLUSTER 'data-shards'
+(
+    `inspection_id` UUID,
+    `worker_id` UUID,
+    `device_id` UUID,
+    `start_time` DateTime64,
+    `end_time` DateTime64,
+    `data` String
+)
+ENGINE=ReplicatedReplacingMergeTree('/tables/{shard}/worker_inspections', '{replica}')
+PRIMARY KEY (`worker_id`, `end_time`)
+ORDER BY (`worker_id`, `end_time`, `inspection_id`)
+PARTITION BY toYYYYMM(`end_time`)
+TTL toDateTime(`end_time`) + INTERVAL 90 DAY
+SETTINGS ttl_only_drop_parts = 1;
+
+CREATE MATERIALIZED VIEW inspections.materialize_worker_inspections ON CLUSTER 'data-shards'
+TO inspections.worker_inspections
+AS SELECT
+    `inspection_id`,
+    `worker_id`,
+    `device_id`,
+    `start_time`,
+    `end_time`,
+    `data`
+FROM inspections.inspections;
+
+CREATE TABLE inspections.worker_inspections_distributed ON CLUSTER coordinators
+(
+    `inspection_id` UUID,
+    `worker_id` UUID,
+    `device_id` UUID,
+    `start_time` DateTime64,
+    `end_time` DateTime64,
+    `data` String
+)
+ENGINE = Distributed('data-shards', inspections, worker_inspections);
+
+/*
+ * Заполнение по осмотрам за последние 90 дней, вставленным до создания
+ * materialized view. Выполняется на каждой шарде, время создания view
+ * подставить вместо {created}.
+ */
+INSERT INTO inspections.worker_inspections
+SELECT
+    `inspection_id`,
+    `worker_id`,
+    `device_id`,
+    `start_time`,
+    `end_time`,
+    `data`
+FROM inspections.inspections
+WHERE `end_time` >= now() - INTERVAL 90 DAY AND `end_time` < '{created}';
@@ -4,7 +4,12 @@ from fastapi import FastAPI
 from src.common.context import initialize_context_middleware
 from src.common.health_checks import register_health_checks
 from src.common.logger import initialize_logger
-from src.common.neo4j import initialize_database_middleware
+from src.common.metrics import register_metrics
+from src.common.neo4j import (
+    initialize_database_middleware,
+    register_periodic_read,
+    register_startup_transaction,
+)
 from src.structures.configuration import Configuration
 from src.structures.controllers.devices import register_devices_router
 from src.structures.controllers.organization_units import (
@@ -13,6 +18,16 @@ from src.structures.controllers.organization_units import (
 from src.structures.controllers.outlets import register_outlets_router
 from src.structures.controllers.users import register_users_router
 from src.structures.controllers.workers import register_workers_router
+from src.structures.dal.ou_repository import (
+    backfill_ancestors,
+    backfill_intervals,
+    create_intervals_index,
+    load_hierarchy,
+)
+from src.structures.dal.propagation import (
+    backfill_effective_active,
+    register_propagation,
+)
 
 # from opentelemetry.instrumentation.fastapi import FastAPIInstrumentor
 
@@ -44,6 +59,22 @@ def initialize_application(config: Configuration) -> FastAPI:
     # Middleware part
     initialize_database_middleware(application, config.neo4j, health_checks)
     initialize_context_middleware(application)
+    register_startup_transaction(application, config.neo4j, backfill_ancestors)
+    register_startup_transaction(application, config.neo4j, backfill_effective_active)
+    register_startup_transaction(application, config.neo4j, create_intervals_index)
+    register_startup_transaction(application, config.neo4j, backfill_intervals)
+    register_propagation(
+        application,
+        config.neo4j,
+        config.effective_active_reconcile_interval,
+    )
+    if config.hierarchy_snapshot:
+        register_periodic_read(
+            application,
+            config.neo4j,
+            load_hierarchy,
+            config.hierarchy_reconcile_interval,
+        )
 
     # Router part
     register_organization_units_router(application, "")
@@ -53,5 +84,6 @@ def initialize_application(config: Configuration) -> FastAPI:
     register_users_router(application, "")
 
     register_health_checks(application, health_checks)
+    register_metrics(application)
 
     return application
@@ -8,4 +8,9 @@ class Configuration(BaseSettings):
     logging: LoggerConfiguration = LoggerConfiguration()
     neo4j: Neo4JConfiguration = Neo4JConfiguration()
     root_ou: str
+    # in-process snapshot of organization units tree, reloaded every interval
+    hierarchy_snapshot: bool = False
+    hierarchy_reconcile_interval: float = 300.0  # seconds
+    # stored effective_active is checked against ancestors by one of processes
+    effective_active_reconcile_interval: float = 600.0  # seconds
     uptrace_dsn: str
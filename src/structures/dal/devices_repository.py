@@ -1,18 +1,25 @@
 import logging
+from functools import partial
 
 from fastapi import Depends
-from neo4j import AsyncSession, AsyncTransaction
+from neo4j import AsyncManagedTransaction, AsyncSession
 
-from src.common.models import Pagination, PaginationQueryParams
+from src.common.models import PaginationQueryParams
 from src.common.neo4j import get_session, get_transaction
 from src.common.utils.cypher_utils import (
+    own_active,
     prepare_create_query,
     prepare_delete_query,
     prepare_get_by_id_query,
+    prepare_hydrate_query,
     prepare_save_query,
+    query_template,
+    subtree_match,
 )
+from src.structures.dal.pagination import fetch_page
 from src.structures.dal.utils import transform_to_dict
 from src.structures.domain.devices.models import (
+    Device,
     DeviceBase,
     DeviceCreateDto,
     DeviceFindDto,
@@ -21,6 +28,41 @@ from src.structures.domain.devices.models import (
 
 logger = logging.getLogger(__name__)
 
+DEVICE_RETURN = " RETURN o { .*, outlet_id: p.id } as device"
+DEVICE_FULL_RETURN = (
+    " RETURN o { .*, outlet_id: p.id, materialized_path: materialized_path,"
+    " is_active_tree: o.active = true AND in_active_tree } as device"
+)
+
+
+@query_template
+def prepare_find_devices_query(
+    node_labels: list[str],
+    relation: str,
+    by_outlets: bool,
+    filters: dict,
+    returns: str,
+    after: bool = False,
+) -> str:
+    if by_outlets:
+        query = "MATCH (p:Outlet) WHERE p.id IN $available_outlets "
+        query += f"MATCH (o:{'|'.join(node_labels)})-[:{relation}]->(p:Outlet)"
+    else:
+        query = "MATCH (p:OrganizationUnit|RootOrganizationUnit) WHERE p.id IN $available_ou "
+        query += subtree_match("ou")
+        query += f"MATCH (o:{'|'.join(node_labels)})-[:{relation}]->(:Outlet)-[:BELONG_TO]->(ou)"
+
+    lines = ["p.deleted IS NULL", "o.deleted IS NULL"]
+    for key in sorted(filters):
+        lines.append(f"o.{key} = ${key}")
+    if after:
+        lines.append("o.id > $after")
+
+    query += " WHERE " + " AND ".join(lines)
+    query += returns
+
+    return query
+
 
 class DevicesRepository:
     node_labels: list[str] = ["Device"]
@@ -29,7 +71,7 @@ class DevicesRepository:
     def __init__(
         self,
         session: AsyncSession = Depends(get_session),
-        transaction: AsyncTransaction | None = Depends(get_transaction),
+        transaction: AsyncManagedTransaction | None = Depends(get_transaction),
     ):
         # TODO: move all this code to separate class
         self.session = session
@@ -51,8 +93,8 @@ class DevicesRepository:
             self.node_labels,
             params,
             self.relation,
+            returns=DEVICE_RETURN,
         )
-        query += " RETURN o { .*, outlet_id: p.id } as device"
 
         result = await (await self.tx.run(query, **params)).single()
         return DeviceBase(**result["device"])
@@ -70,19 +112,39 @@ class DevicesRepository:
         params = transform_to_dict(device)
         del params["id"]
 
-        query = prepare_save_query(self.node_labels, self.relation, params)
-        query += " RETURN o { .*, outlet_id: p.id } as device\n"
+        query = prepare_save_query(
+            self.node_labels,
+            self.relation,
+            params,
+            returns=DEVICE_RETURN,
+        )
 
         result = await (await self.tx.run(query, **params, id=device.id)).single()
         return DeviceBase(**result["device"])
 
     async def get_by_id(self, device_id: str) -> DeviceBase:
-        query = prepare_get_by_id_query(self.node_labels, self.relation)
-        query += " RETURN o { .*, outlet_id: p.id } as device\n"
+        query = prepare_get_by_id_query(
+            self.node_labels,
+            self.relation,
+            returns=DEVICE_RETURN,
+        )
 
         result = await (await self.tx.run(query, id=device_id)).single()
         return DeviceBase(**result["device"]) if result is not None else None
 
+    async def get_full_by_id(self, device_id: str, root_ou: str) -> Device:
+        query = prepare_hydrate_query(
+            self.node_labels,
+            self.relation,
+            " MATCH (p)-[:BELONG_TO]->(ou:OrganizationUnit)",
+            returns=DEVICE_FULL_RETURN,
+        )
+
+        result = await (
+            await self.tx.run(query, id=device_id, root_ou=root_ou)
+        ).single()
+        return Device(**result["device"]) if result is not None else None
+
     async def find(
         self,
         dto: DeviceFindDto,
@@ -98,54 +160,25 @@ class DevicesRepository:
         if "child_of_organization_unit" in params:
             del params["child_of_organization_unit"]
 
-        lines = []
-        if params:
-            for key in params:
-                lines.append(f"o.{key} = ${key}")
-
-        query = ""
-
-        if available_ou:
-            query = f"MATCH (p:{'|'.join(['OrganizationUnit', 'RootOrganizationUnit'])}) WHERE p.id IN $available_ou "
-            query += (
-                f"MATCH (o:{'|'.join(self.node_labels)})-[:{self.relation}]"
-                f"->(:Outlet)-[:BELONG_TO]->()-[:CHILD_OF*0..10]->(p)"
-            )
-            params["available_ou"] = available_ou
-
-        if available_outlets:
-            query = (
-                f"MATCH (p:{'|'.join(['Outlet'])}) WHERE p.id IN $available_outlets "
-            )
-            query += (
-                f"MATCH (o:{'|'.join(self.node_labels)})-[:{self.relation}]"
-                f"->(p:Outlet)"
-            )
-            params["available_outlets"] = available_outlets
-
-        query += " WHERE p.deleted IS NULL AND o.deleted IS NULL "
-        if lines:
-            query += " AND ".join(lines)
-
-        count_query = str(query)
-        count_query += " RETURN count(o) as count"
-
-        count_result = await (await self.tx.run(count_query, **params)).single()  # noqa
-
-        query += " RETURN o"
-        query += (
-            f" SKIP {(pagination.page - 1) * pagination.limit} LIMIT {pagination.limit}"
-        )
-
-        result = await self.tx.run(query, **params)
-        result_pagination = Pagination(
-            page=pagination.page,
-            limit=pagination.limit,
-            count=count_result["count"],
+        by_outlets = bool(available_outlets)
+
+        result_pagination, records = await fetch_page(
+            self.transaction,
+            partial(
+                prepare_find_devices_query,
+                self.node_labels,
+                self.relation,
+                by_outlets,
+                params,
+            ),
+            params,
+            "available_outlets" if by_outlets else "available_ou",
+            available_outlets if by_outlets else available_ou,
+            pagination,
         )
 
         retval = []
-        async for record in result:
+        for record in records:
             retval.append(DeviceBase(**record["o"]))
 
         return DevicePaginatedDto(pagination=result_pagination, data=retval)
@@ -158,7 +191,9 @@ class DevicesRepository:
         query = "MATCH (n_parent:Outlet { id: $new_parent_id }) "
         query += prepare_get_by_id_query(self.node_labels, self.relation)
         query += " DELETE r "
-        query += f"CREATE (o)-[:{self.relation}]->(n_parent)"
+        query += f"CREATE (o)-[:{self.relation}]->(n_parent) "
+        query += "SET o.effective_active = coalesce(toBoolean(o.active), false) "
+        query += "AND o.deleted IS NULL AND coalesce(n_parent.effective_active, false)"
 
         await (
             await self.tx.run(query, id=device.id, new_parent_id=new_parent_id)
@@ -170,9 +205,15 @@ class DevicesRepository:
         # TODO: Refactor
         query = f"MATCH (d:{'|'.join(self.node_labels)} {{id: $device_id}})-[:{self.relation}]->(o:Outlet)"
         query += "-[:BELONG_TO]->(ou:OrganizationUnit)<-[:WORK_IN]-(w:Worker {id: $worker_id}) "
-        query += "WHERE d.deleted IS NULL and o.deleted IS NULL and ou.deleted IS NULL and w.deleted IS NULL "
-        query += "and toBoolean(d.active) = true and toBoolean(o.active) = true "
-        query += "and toBoolean(ou.active) = true and toBoolean(w.active) = true "
+        # effective_active of outlet and organization unit are checked too, they
+        # are changed at once while propagation to device and worker goes later
+        query += "WHERE d.effective_active = true AND o.effective_active = true "
+        query += "AND ou.effective_active = true AND w.effective_active = true "
+        # ancestors are checked by their own flags, so exam does not depend on
+        # propagation from deactivated unit above
+        query += "AND ou.ancestors IS NOT NULL AND NOT EXISTS { "
+        query += "MATCH (a:OrganizationUnit) WHERE a.id IN ou.ancestors "
+        query += f"AND NOT ({own_active('a')}) }} "
         query += "RETURN ou"
 
         result = await (
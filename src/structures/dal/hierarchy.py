@@ -0,0 +1,209 @@
+import asyncio
+import logging
+from array import array
+
+from src.common.metrics import register_metrics_source
+
+logger = logging.getLogger(__name__)
+
+ROOT = -1  # parent is root organization unit
+UNKNOWN = -2  # parent is not in snapshot
+
+
+class OrganizationUnitsHierarchy:
+    """
+    In-process snapshot of organization units tree. Units are numbered and
+    parent, active and deleted flags are kept in arrays by this number, so
+    questions about ancestors take a few array lookups per level.
+    Snapshot is loaded and reconciled in background, write paths update it
+    after commit. Until loaded callers should ask the database.
+    Writes of other workers are seen only after reconcile, so access checks
+    do not use it
+    """
+
+    def __init__(self) -> None:
+        self.ready = False
+        self._root_id: str | None = None
+        self._ids: list[str] = []
+        self._index: dict[str, int] = {}
+        self._parent = array("i")
+        self._active = bytearray()
+        self._deleted = bytearray()
+        # updates committed while snapshot is reloading, replayed after load
+        self._pending: list[tuple] | None = None
+        self._loads = 0
+        self._updates = 0
+
+    def _parent_index(self, parent_id: str | None) -> int:
+        if parent_id is None or parent_id == self._root_id:
+            return ROOT
+
+        return self._index.get(parent_id, UNKNOWN)
+
+    def begin_reload(self) -> None:
+        # updates of failed reload are kept for the next one
+        if self._pending is None:
+            self._pending = []
+
+    async def load(
+        self,
+        root_id: str,
+        rows: list[tuple[str, str, bool, bool]],
+    ) -> None:
+        """
+        Replaces snapshot, rows are (id, parent_id, active, deleted)
+        """
+        # arrays for 300k units are built for about a second, not in event loop
+        ids, index, parent, active, deleted = await asyncio.to_thread(
+            _build,
+            root_id,
+            rows,
+        )
+
+        self._root_id = root_id
+        self._ids = ids
+        self._index = index
+        self._parent = parent
+        self._active = active
+        self._deleted = deleted
+
+        self._loads += 1
+        self.ready = True
+
+        pending, self._pending = self._pending or [], None
+        for update in pending:
+            self.update(*update)
+
+        logger.info(f"Organization units snapshot loaded, {len(ids)} units")
+
+    def update(
+        self,
+        ou_id: str,
+        parent_id: str | None = None,
+        active: bool | None = None,
+        deleted: bool | None = None,
+    ) -> None:
+        """
+        Applies committed change of one unit, None fields are not changed
+        """
+        if self._pending is not None:
+            self._pending.append((ou_id, parent_id, active, deleted))
+
+        if not self.ready:
+            return
+
+        self._updates += 1
+        i = self._index.get(ou_id)
+
+        if i is None:
+            i = len(self._ids)
+            self._ids.append(ou_id)
+            self._index[ou_id] = i
+            self._parent.append(UNKNOWN)
+            self._active.append(False)
+            self._deleted.append(False)
+
+        if parent_id is not None:
+            self._parent[i] = self._parent_index(parent_id)
+        if active is not None:
+            self._active[i] = active
+        if deleted is not None:
+            self._deleted[i] = deleted
+
+    def knows(self, ou_id: str) -> bool:
+        """
+        Unit and all its ancestors are in snapshot, otherwise unit was added
+        under parent which is not loaded yet and callers should ask the database
+        """
+        if not self.ready:
+            return False
+
+        i = self._index.get(ou_id)
+        if i is None:
+            return False
+
+        _, connected = self._ancestors(i)
+        return connected
+
+    def _ancestors(self, i: int) -> tuple[list[int], bool]:
+        # indexes from parent up to the top unit and is root reached,
+        # walk is limited by number of units in case of broken tree
+        retval = []
+        parent = self._parent[i]
+
+        while parent >= 0 and len(retval) < len(self._ids):
+            retval.append(parent)
+            parent = self._parent[parent]
+
+        return retval, parent == ROOT
+
+    def path(self, ou_id: str) -> list[str]:
+        """
+        Unit, its ancestors and root, same as materialized_path
+        """
+        i = self._index[ou_id]
+        ancestors, _ = self._ancestors(i)
+
+        return [ou_id] + [self._ids[a] for a in ancestors] + [self._root_id]
+
+    def is_in_active_tree(self, ou_id: str) -> bool:
+        """
+        Same as effective_active, unit and all its ancestors are active
+        """
+        i = self._index[ou_id]
+        ancestors, connected = self._ancestors(i)
+
+        return connected and all(
+            self._active[a] and not self._deleted[a] for a in [i, *ancestors]
+        )
+
+    def is_descendant(self, ou_id: str, ancestor_id: str) -> bool:
+        """
+        Is ou_id the same unit as ancestor_id or below it
+        """
+        if ou_id == ancestor_id:
+            return True
+
+        i = self._index[ou_id]
+        ancestors, connected = self._ancestors(i)
+
+        if ancestor_id == self._root_id:
+            return connected
+
+        ancestor = self._index.get(ancestor_id)
+        return ancestor is not None and ancestor in ancestors
+
+    def snapshot(self) -> dict:
+        return {
+            "ready": self.ready,
+            "units": len(self._ids),
+            "loads": self._loads,
+            "updates": self._updates,
+        }
+
+
+def _build(root_id: str, rows: list[tuple[str, str, bool, bool]]) -> tuple:
+    ids = [row[0] for row in rows]
+    index = {ou_id: i for i, ou_id in enumerate(ids)}
+
+    find = index.get
+    parent = array(
+        "i",
+        [
+            (
+                ROOT
+                if parent_id is None or parent_id == root_id
+                # UNKNOWN is returned for missing parent
+                else find(parent_id, UNKNOWN)
+            )
+            for _, parent_id, _, _ in rows
+        ],
+    )
+    active = bytearray([bool(active) for _, _, active, _ in rows])
+    deleted = bytearray([bool(deleted) for _, _, _, deleted in rows])
+
+    return ids, index, parent, active, deleted
+
+
+hierarchy = OrganizationUnitsHierarchy()
+register_metrics_source("ou_hierarchy", hierarchy.snapshot)
@@ -0,0 +1,117 @@
+"""
+Nested intervals of organization units. Every unit has [lft, rgt) and all
+units of its subtree have lft inside it, so subtree is a range predicate on
+indexed lft instead of CHILD_OF path expansion. Root organization unit has
+no interval and covers [0, INTERVAL_MAX).
+
+Numbers are sparse: new child takes a slot of fixed size after the last
+child of its parent, slot is the parent interval divided by HEADROOM times
+the number of its children, so siblings get equal space. When there is no
+space left, the smallest ancestor subtree which has enough space is
+renumbered evenly (rebalanced) with space for as many new children as the
+parent has, so a busy parent is rebalanced after it doubles.
+"""
+
+MIN_SPACING = 4
+HEADROOM = 4
+
+
+def take_interval(
+    lft: int,
+    rgt: int,
+    free: int | None,
+    size: int,
+    children: int,
+) -> tuple[int, int] | None:
+    """
+    Interval for subtree of size units under parent [lft, rgt) with children,
+    free is the end of the last interval given to its children. None if
+    parent should be rebalanced
+    """
+    start = (lft if free is None else free) + MIN_SPACING
+    space = rgt - start
+    # number_subtree places the moved subtree into the interval
+    needed = (2 * size + 4) * MIN_SPACING
+
+    if space < needed:
+        return None
+
+    slot = (rgt - lft) // (HEADROOM * (children + 1))
+    return start, start + min(max(slot * size, needed), space)
+
+
+def number_subtree(
+    top_id: str,
+    lft: int,
+    rgt: int,
+    rows: list[tuple[str, str]],
+    reserve_under: str | None = None,
+    reserve: int = 0,
+) -> dict[str, tuple[int, int, int]] | None:
+    """
+    Evenly spaced (lft, rgt, free) inside [lft, rgt) of top_id for the top and
+    units below it, rows are (id, parent_id). Space for reserve more units
+    is left at the end of reserve_under. None if interval is too small
+    """
+    units = 2 * len(rows) + 2
+    if reserve_under is not None:
+        # reserved space fits the reserve units, as take_interval expects
+        units += HEADROOM * (reserve + 2)
+    spacing = (rgt - lft) // units
+    if spacing < MIN_SPACING:
+        return None
+
+    numbering = _Numbering(top_id, lft, rgt, spacing)
+    if reserve_under is not None:
+        numbering.reserved = {reserve_under: HEADROOM * (reserve + 2) * spacing}
+
+    return numbering.run(_children(rows))
+
+
+def _children(rows: list[tuple[str, str]]) -> dict[str, list[str]]:
+    retval: dict[str, list[str]] = {}
+    for ou_id, parent_id in rows:
+        retval.setdefault(parent_id, []).append(ou_id)
+
+    return retval
+
+
+class _Numbering:
+    def __init__(self, top_id: str, lft: int, rgt: int, spacing: int) -> None:
+        self.top_id = top_id
+        self.rgt = rgt
+        self.spacing = spacing
+        self.reserved: dict[str, int] = {}
+        self.counter = lft
+        self.starts = {top_id: lft}
+
+    def run(self, children: dict[str, list[str]]) -> dict[str, tuple[int, int, int]]:
+        retval = {}
+        # iterative DFS, trees could be deeper than recursion limit
+        stack = [(self.top_id, False)]
+        while stack:
+            ou_id, closing = stack.pop()
+
+            if closing:
+                retval[ou_id] = self._close(ou_id)
+                continue
+
+            if ou_id != self.top_id:
+                self.counter += self.spacing
+                self.starts[ou_id] = self.counter
+
+            stack.append((ou_id, True))
+            stack.extend((child, False) for child in reversed(children.get(ou_id, [])))
+
+        return retval
+
+    def _close(self, ou_id: str) -> tuple[int, int, int]:
+        # counter is at the end of the last child here
+        free = self.counter
+        self.counter += self.reserved.get(ou_id, 0)
+
+        if ou_id == self.top_id:
+            return self.starts[ou_id], self.rgt, free
+
+        self.counter += self.spacing
+        return self.starts[ou_id], self.counter, free
@@ -1,12 +1,28 @@
+import asyncio
 import logging
+from functools import partial
 
 from fastapi import Depends
-from neo4j import AsyncSession, AsyncTransaction
-
-from src.common.models import Pagination, PaginationQueryParams
-from src.common.neo4j import get_session, get_transaction
+from neo4j import AsyncManagedTransaction, AsyncSession
+
+from src.common.models import PaginationQueryParams
+from src.common.neo4j import after_commit, get_session, get_transaction
+from src.common.utils.cypher_utils import (
+    INTERVAL_MAX,
+    prepare_create_query,
+    prepare_delete_query,
+    prepare_find_query,
+    prepare_get_by_id_query,
+    prepare_hydrate_query,
+    prepare_save_query,
+)
+from src.structures.dal.hierarchy import hierarchy
+from src.structures.dal.intervals import number_subtree, take_interval
+from src.structures.dal.pagination import fetch_page
+from src.structures.dal.propagation import propagation
 from src.structures.dal.utils import transform_to_dict
 from src.structures.domain.organization_units.models import (
+    OrganizationUnit,
     OrganizationUnitBase,
     OrganizationUnitCreateDto,
     OrganizationUnitFindDto,
@@ -16,12 +32,38 @@ from src.structures.domain.organization_units.models import (
 
 logger = logging.getLogger(__name__)
 
+INTERVALS_BATCH = 10_000
+ANCESTORS_BATCH = 10_000
+# write lock on root held until commit, startup backfills of all workers run
+# one after another and next ones find nothing to do
+LOCK_ROOT = "MATCH (r:RootOrganizationUnit) SET r._LOCK_ = true REMOVE r._LOCK_"
+
+OU_RETURN = " RETURN o { .*, parent_organization_unit: p.id } as organization_unit"
+# ancestors are ids from the top organization unit down to the parent, root is
+# not stored, depth of top organization unit is 1
+OU_SET_ANCESTORS = (
+    " WITH o, p, CASE WHEN p:RootOrganizationUnit THEN []"
+    " ELSE coalesce(p.ancestors, []) + p.id END as ancestors"
+    " SET o.ancestors = ancestors, o.depth = size(ancestors) + 1"
+)
+# free is the end of the last interval given to children, see intervals.py
+OU_SET_INTERVAL = " SET o.lft = $lft, o.rgt = $rgt, o.free = $lft"
+OU_FULL_RETURN = (
+    " RETURN o { .*, parent_organization_unit: p.id,"
+    " materialized_path: materialized_path,"
+    " is_active_tree: o.active = true AND in_active_tree } as organization_unit"
+)
+
 
 class OrganizationUnitsRepository:
+    node_labels: list[str] = ["OrganizationUnit"]
+    parent_labels: list[str] = ["OrganizationUnit", "RootOrganizationUnit"]
+    relation: str = "CHILD_OF"
+
     def __init__(
         self,
         session: AsyncSession = Depends(get_session),
-        transaction: AsyncTransaction | None = Depends(get_transaction),
+        transaction: AsyncManagedTransaction | None = Depends(get_transaction),
     ) -> None:
         self.session = session
         self.transaction = transaction
@@ -41,57 +83,61 @@ class OrganizationUnitsRepository:
 
         params = transform_to_dict(dto)
 
-        query = "MATCH (p:OrganizationUnit|RootOrganizationUnit {id: $parent_id}) \n"
-        query += "CREATE (ou:OrganizationUnit { "
-
-        lines = ["id: randomUUID()"]
-        for key in params:
-            lines.append(f"{key}: ${key}")
-
-        query += ", ".join(lines)
-        query += "})-[r:CHILD_OF]->(p)"
-        query += (
-            " RETURN ou { .*, parent_organization_unit: p.id } as organization_unit"
+        query = prepare_create_query(
+            self.parent_labels,
+            "parent_id",
+            self.node_labels,
+            params,
+            self.relation,
+            returns=OU_SET_ANCESTORS + OU_SET_INTERVAL + OU_RETURN,
         )
 
         params["parent_id"] = parent_id
+        await self._lock_intervals()
+        params["lft"], params["rgt"] = await self._allocate_interval(parent_id, 1)
 
         result = await (await self.tx.run(query, **params)).single()
+        ou = OrganizationUnitBase(**result["organization_unit"])
 
-        return OrganizationUnitBase(**result["organization_unit"])
+        after_commit(
+            partial(hierarchy.update, ou.id, parent_id, ou.active, deleted=False),
+        )
+
+        return ou
 
     async def delete(self, ou: OrganizationUnitBase) -> None:
         self._check_transaction()
 
-        query = "MATCH (ou:OrganizationUnit { id: $id }) SET ou.deleted = true"
+        query = prepare_delete_query(self.node_labels)
 
         await (await self.tx.run(query, id=ou.id)).single()
+        after_commit(partial(hierarchy.update, ou.id, deleted=True))
+        after_commit(partial(propagation.schedule, "OrganizationUnit", ou.id))
 
     async def save(self, ou: OrganizationUnitBase) -> OrganizationUnitBase:
         self._check_transaction()
 
         params = transform_to_dict(ou)
-        query = "MATCH (ou:OrganizationUnit { id: $id })-[r:CHILD_OF]->(p) SET "
-
         del params["id"]
 
-        lines = []
-        for key in params:
-            lines.append(f"ou.{key} = ${key}")
-
-        query += ", ".join(lines)
-        query += (
-            " RETURN ou { .*, parent_organization_unit: p.id } as organization_unit\n"
+        query = prepare_save_query(
+            self.node_labels,
+            self.relation,
+            params,
+            returns=OU_RETURN,
         )
 
         result = await (await self.tx.run(query, **params, id=ou.id)).single()
+        after_commit(partial(hierarchy.update, ou.id, active=ou.active))
+        after_commit(partial(propagation.schedule, "OrganizationUnit", ou.id))
 
         return OrganizationUnitBase(**result["organization_unit"])
 
     async def get_by_id(self, organization_unit_id: str) -> OrganizationUnitBase:
-        query = (
-            "MATCH (ou:OrganizationUnit {id: $id})-[r:CHILD_OF]->(p)"
-            + " WHERE ou.deleted IS NULL RETURN ou { .*, parent_organization_unit: p.id } as organization_unit"
+        query = prepare_get_by_id_query(
+            self.node_labels,
+            self.relation,
+            returns=OU_RETURN,
         )
 
         result = await (await self.tx.run(query, id=organization_unit_id)).single()
@@ -101,6 +147,27 @@ class OrganizationUnitsRepository:
             else None
         )
 
+    async def get_full_by_id(
+        self,
+        organization_unit_id: str,
+        root_ou: str,
+    ) -> OrganizationUnit:
+        query = prepare_hydrate_query(
+            self.node_labels,
+            self.relation,
+            " WITH o, p, o as ou",
+            returns=OU_FULL_RETURN,
+        )
+
+        result = await (
+            await self.tx.run(query, id=organization_unit_id, root_ou=root_ou)
+        ).single()
+        return (
+            OrganizationUnit(**result["organization_unit"])
+            if result is not None
+            else None
+        )
+
     async def find(
         self,
         dto: OrganizationUnitFindDto,
@@ -116,48 +183,25 @@ class OrganizationUnitsRepository:
             del params["child_of"]
 
         # searching across available OU
-        query = "MATCH (p:OrganizationUnit|RootOrganizationUnit) WHERE p.id IN $available_ou "
-        query += "MATCH (ou:OrganizationUnit)-[:CHILD_OF*0..10]->(p)"  # 1 to 10 hops
-
-        lines = []
-        if params:
-            # query += " WHERE "
-            for key in params:
-                lines.append(f"ou.{key} = ${key}")
-
-        if lines:
-            query += " WHERE ou.deleted is NULL " + " AND ".join(lines)
-        else:
-            query += " WHERE ou.deleted is NULL "
-
-        count_query = str(query)
-        count_query += " RETURN count(ou) as count"
-
-        logger.debug(count_query)
-
-        # TODO: we can run count and query concurrently to decrease latency
-        count_result = await (
-            await self.tx.run(count_query, available_ou=available_ou, **params)  # noqa
-        ).single()
-
-        query += " RETURN ou"
-        query += (
-            f" SKIP {(pagination.page - 1) * pagination.limit} LIMIT {pagination.limit}"
-        )
-
-        logger.debug(query)
-
-        result = await self.tx.run(query, available_ou=available_ou, **params)
-        result_pagination = Pagination(
-            page=pagination.page,
-            limit=pagination.limit,
-            count=count_result["count"],
+        result_pagination, records = await fetch_page(
+            self.transaction,
+            partial(
+                prepare_find_query,
+                self.parent_labels,
+                self.node_labels,
+                None,
+                params,
+            ),
+            params,
+            "available_ou",
+            available_ou,
+            pagination,
         )
 
         # TODO: check that all read at once
         retval = []
-        async for record in result:
-            retval.append(OrganizationUnitShort(**record["ou"]))
+        for record in records:
+            retval.append(OrganizationUnitShort(**record["o"]))
 
         return OrganizationUnitPaginated(pagination=result_pagination, data=retval)
 
@@ -166,27 +210,158 @@ class OrganizationUnitsRepository:
         ou: OrganizationUnitBase,
         new_parent_id: str,
     ) -> OrganizationUnitBase:
+        # moved subtree gets new interval under new parent, structure of
+        # the subtree is read before relinking
+        self._check_transaction()
+        await self._lock_intervals()
+        lft, rgt = await self._interval(ou.id)
+        rows = await self._subtree_rows(lft, rgt)
+        interval = await self._allocate_interval(new_parent_id, len(rows) + 1)
+        numbers = number_subtree(ou.id, *interval, rows)
+
         query = "MATCH (ou:OrganizationUnit { id: $id })-[r:CHILD_OF]->(p) "
         query += "MATCH (n_parent:OrganizationUnit { id: $new_parent_id }) "
         query += "WHERE ou.deleted IS NULL AND n_parent.deleted IS NULL "
         query += "DELETE r "
         query += "CREATE (ou)-[:CHILD_OF]->(n_parent) "
+        query += "SET ou.effective_active = coalesce(toBoolean(ou.active), false) "
+        query += "AND coalesce(n_parent.effective_active, false) "
+        # moved subtree keeps its part of ancestors below ou, prefix is replaced
+        query += "WITH ou, n_parent, size(coalesce(ou.ancestors, [])) as old_prefix, "
+        query += "coalesce(n_parent.ancestors, []) + n_parent.id as new_prefix "
+        query += "MATCH (d:OrganizationUnit) "
+        query += "WHERE d.lft >= ou.lft AND d.lft < ou.rgt "
+        query += "WITH ou, n_parent, d, "
+        query += "new_prefix + coalesce(d.ancestors, [])[old_prefix..] as ancestors "
+        query += "SET d.ancestors = ancestors, d.depth = size(ancestors) + 1 "
+        query += "WITH DISTINCT ou, n_parent "
         query += "RETURN ou { .*, parent_organization_unit: n_parent.id } as organization_unit"
 
         result = await (
             await self.tx.run(query, id=ou.id, new_parent_id=new_parent_id)
         ).single()
+        await self._write_intervals(numbers)
+        after_commit(partial(hierarchy.update, ou.id, parent_id=new_parent_id))
+        after_commit(partial(propagation.schedule, "OrganizationUnit", ou.id))
 
         return OrganizationUnitBase(**result["organization_unit"])
 
+    async def _interval(self, organization_unit_id: str) -> tuple[int, int]:
+        query = "MATCH (o:OrganizationUnit { id: $id })"
+        query += " RETURN o.lft as lft, o.rgt as rgt"
+
+        result = await (await self.tx.run(query, id=organization_unit_id)).single()
+        return result["lft"], result["rgt"]
+
+    async def _subtree_rows(self, lft: int, rgt: int) -> list[tuple[str, str]]:
+        """
+        (id, parent_id) of units inside the interval, the top is not included
+        """
+        query = "MATCH (o:OrganizationUnit) WHERE o.lft > $lft AND o.lft < $rgt"
+        query += " MATCH (o)-[:CHILD_OF]->(p)"
+        query += " RETURN o.id as id, p.id as parent_id"
+
+        result = await self.tx.run(query, lft=lft, rgt=rgt)
+        return [tuple(record.values()) async for record in result]
+
+    async def _lock_intervals(self) -> None:
+        # rebalance renumbers any subtree up to root, so allocations and moves
+        # are serialized by the root lock taken before intervals are read
+        await (await self.tx.run(LOCK_ROOT)).consume()
+
+    async def _allocate_interval(self, parent_id: str, size: int) -> tuple[int, int]:
+        """
+        Interval for subtree of size units under parent, parent is rebalanced
+        when it has no free space. Caller holds intervals lock
+        """
+        self._check_transaction()
+
+        query = "MATCH (p:OrganizationUnit|RootOrganizationUnit { id: $id })"
+        query += f" RETURN coalesce(p.lft, 0) as lft, coalesce(p.rgt, {INTERVAL_MAX})"
+        query += " as rgt, p.free as free,"
+        query += " size([(p)<-[:CHILD_OF]-() | 1]) as children"
+
+        parent = await (await self.tx.run(query, id=parent_id)).single()
+        interval = take_interval(**parent, size=size)
+        if interval is None:
+            # space for as many new children as there are, rebalance of a busy
+            # parent is not repeated until it doubles
+            await self._rebalance(parent_id, size + parent["children"])
+            parent = await (await self.tx.run(query, id=parent_id)).single()
+            interval = take_interval(**parent, size=size)
+
+        query = "MATCH (p:OrganizationUnit|RootOrganizationUnit { id: $id })"
+        query += " SET p.free = $free"
+
+        await self.tx.run(query, id=parent_id, free=interval[1])
+        return interval
+
+    async def _rebalance(self, parent_id: str, size: int) -> None:
+        """
+        Renumbers the smallest subtree around parent which has enough space
+        for size more units under parent
+        """
+        query = "MATCH (o:OrganizationUnit|RootOrganizationUnit { id: $id })"
+        query += " OPTIONAL MATCH (o)-[:CHILD_OF]->(p)"
+        query += f" RETURN coalesce(o.lft, 0) as lft, coalesce(o.rgt, {INTERVAL_MAX})"
+        query += " as rgt, p.id as parent_id"
+
+        top_id = parent_id
+        while top_id is not None:
+            top = await (await self.tx.run(query, id=top_id)).single()
+            rows = await self._subtree_rows(top["lft"], top["rgt"])
+            numbers = number_subtree(
+                top_id,
+                top["lft"],
+                top["rgt"],
+                rows,
+                reserve_under=parent_id,
+                reserve=size,
+            )
+
+            if numbers is not None:
+                await self._write_intervals(numbers, top_id)
+                logger.info(f"Rebalanced {len(numbers)} organization units intervals")
+                return
+
+            top_id = top["parent_id"]
+
+        raise Exception("Organization units intervals are exhausted")
+
+    async def _write_intervals(
+        self,
+        numbers: dict[str, tuple[int, int, int]],
+        top_id: str | None = None,
+    ) -> None:
+        rows = [
+            {"id": ou_id, "lft": lft, "rgt": rgt, "free": free}
+            for ou_id, (lft, rgt, free) in numbers.items()
+        ]
+
+        query = "UNWIND $rows as row"
+        query += " MATCH (o:OrganizationUnit { id: row.id })"
+        query += " SET o.lft = row.lft, o.rgt = row.rgt, o.free = row.free"
+
+        for start in range(0, len(rows), INTERVALS_BATCH):
+            await self.tx.run(query, rows=rows[start : start + INTERVALS_BATCH])
+
+        if top_id is not None:
+            # root has no interval, only free is kept on it
+            query = "MATCH (o:RootOrganizationUnit { id: $id }) SET o.free = $free"
+            await self.tx.run(query, id=top_id, free=numbers[top_id][2])
+
     async def path_to_organization_unit(
         self,
         organization_unit: str,
         root_ou: str,
     ) -> list[str]:
-        query = "MATCH (o:OrganizationUnit {id: $organization_unit})"
-        query += "-[:CHILD_OF*0..10]->(p:OrganizationUnit)-[:CHILD_OF*0..10]->(root:RootOrganizationUnit)"
-        query += " RETURN collect(p.id) + [$root_ou] as path_ids"
+        if hierarchy.knows(organization_unit):
+            return hierarchy.path(organization_unit)
+
+        query = "OPTIONAL MATCH (o:OrganizationUnit {id: $organization_unit})"
+        query += " RETURN CASE WHEN o IS NULL THEN []"
+        query += " ELSE [o.id] + reverse(coalesce(o.ancestors, [])) END"
+        query += " + [$root_ou] as path_ids"
 
         result = await (
             await self.tx.run(
@@ -198,10 +373,12 @@ class OrganizationUnitsRepository:
         return result["path_ids"]
 
     async def is_in_active_tree(self, organization_unit: str, root_ou: str) -> bool:
-        query = "MATCH (o:OrganizationUnit {id: $organization_unit, active: true})"
-        query += "-[:CHILD_OF*0..10]->(p:OrganizationUnit {active: true})"
-        query += "-[:CHILD_OF*0..10]->(root:RootOrganizationUnit)"
-        query += " RETURN collect(p.id) as path_ids"
+        if hierarchy.knows(organization_unit):
+            return hierarchy.is_in_active_tree(organization_unit)
+
+        query = "MATCH (o:OrganizationUnit {id: $organization_unit})"
+        query += " WHERE o.effective_active = true"
+        query += " RETURN o.id"
 
         result = await (
             await self.tx.run(
@@ -210,4 +387,93 @@ class OrganizationUnitsRepository:
                 root_ou=root_ou,
             )  # noqa
         ).single()
-        return True if len(result["path_ids"]) > 0 else False
+        return True if result is not None else False
+
+    async def backfill_ancestors(self, batch: int) -> int:
+        """
+        Sets ancestors and depth on up to batch organization units created
+        before they were stored, returns number of updated units
+        """
+        await (await self.tx.run(LOCK_ROOT)).consume()
+
+        query = "MATCH (o:OrganizationUnit) WHERE o.ancestors IS NULL"
+        query += " MATCH path = (o)-[:CHILD_OF*]->(:RootOrganizationUnit)"
+        query += " WITH o, path LIMIT $batch"
+        query += " WITH o, reverse([n IN nodes(path)[1..-1] | n.id]) as ancestors"
+        query += " SET o.ancestors = ancestors, o.depth = size(ancestors) + 1"
+        query += " RETURN count(o) as updated"
+
+        result = await (await self.tx.run(query, batch=batch)).single()
+        return result["updated"]
+
+    async def number_intervals(self) -> int:
+        """
+        Numbers organization units by intervals when some of them were created
+        before intervals were stored, returns number of updated units
+        """
+        await self._lock_intervals()
+
+        query = "MATCH (o:OrganizationUnit)-[:CHILD_OF]->()"
+        query += " WHERE o.lft IS NULL RETURN count(o) as missing"
+
+        result = await (await self.tx.run(query)).single()
+        if result["missing"] == 0:
+            return 0
+
+        root = await (
+            await self.tx.run("MATCH (r:RootOrganizationUnit) RETURN r.id as id")
+        ).single()
+        query = "MATCH (o:OrganizationUnit)-[:CHILD_OF]->(p)"
+        query += " RETURN o.id as id, p.id as parent_id"
+        result = await self.tx.run(query)
+        rows = [tuple(record.values()) async for record in result]
+
+        numbers = await asyncio.to_thread(
+            number_subtree,
+            root["id"],
+            0,
+            INTERVAL_MAX,
+            rows,
+        )
+        await self._write_intervals(numbers, root["id"])
+
+        return len(numbers) - 1
+
+
+async def backfill_ancestors(transaction: AsyncManagedTransaction) -> bool:
+    repository = OrganizationUnitsRepository(transaction, transaction)
+    updated = await repository.backfill_ancestors(ANCESTORS_BATCH)
+    if updated:
+        logger.info(f"Ancestors set on {updated} organization units")
+
+    return updated == ANCESTORS_BATCH
+
+
+async def create_intervals_index(transaction: AsyncManagedTransaction) -> None:
+    # schema changes can not be mixed with writes in one transaction
+    query = "CREATE INDEX ou_lft IF NOT EXISTS"
+    query += " FOR (o:OrganizationUnit) ON (o.lft)"
+
+    await transaction.run(query)
+
+
+async def backfill_intervals(transaction: AsyncManagedTransaction) -> None:
+    repository = OrganizationUnitsRepository(transaction, transaction)
+    updated = await repository.number_intervals()
+    logger.info(f"Intervals set on {updated} organization units")
+
+
+async def load_hierarchy(transaction: AsyncManagedTransaction) -> None:
+    hierarchy.begin_reload()
+
+    root = await (
+        await transaction.run("MATCH (r:RootOrganizationUnit) RETURN r.id as id")
+    ).single()
+
+    query = "MATCH (o:OrganizationUnit)-[:CHILD_OF]->(p)"
+    query += " RETURN o.id as id, p.id as parent_id,"
+    query += " o.active = true as active, o.deleted IS NOT NULL as deleted"
+    result = await transaction.run(query)
+    rows = [tuple(record.values()) async for record in result]
+
+    await hierarchy.load(root["id"], rows)
@@ -1,19 +1,24 @@
 import logging
+from functools import partial
 
 from fastapi import Depends
-from neo4j import AsyncSession, AsyncTransaction
+from neo4j import AsyncManagedTransaction, AsyncSession
 
-from src.common.models import Pagination, PaginationQueryParams
-from src.common.neo4j import get_session, get_transaction
+from src.common.models import PaginationQueryParams
+from src.common.neo4j import after_commit, get_session, get_transaction
 from src.common.utils.cypher_utils import (
     prepare_create_query,
     prepare_delete_query,
     prepare_find_query,
     prepare_get_by_id_query,
+    prepare_hydrate_query,
     prepare_save_query,
 )
+from src.structures.dal.pagination import fetch_page
+from src.structures.dal.propagation import propagation
 from src.structures.dal.utils import transform_to_dict
 from src.structures.domain.outlets.models import (
+    Outlet,
     OutletBase,
     OutletCreateDto,
     OutletFindDto,
@@ -22,6 +27,12 @@ from src.structures.domain.outlets.models import (
 
 logger = logging.getLogger(__name__)
 
+OUTLET_RETURN = " RETURN o { .*, organization_unit_id: p.id } as outlet"
+OUTLET_FULL_RETURN = (
+    " RETURN o { .*, organization_unit_id: p.id,"
+    " materialized_path: materialized_path } as outlet"
+)
+
 
 class OutletsRepository:
     node_labels: list[str] = ["Outlet"]
@@ -30,7 +41,7 @@ class OutletsRepository:
     def __init__(
         self,
         session: AsyncSession = Depends(get_session),
-        transaction: AsyncTransaction | None = Depends(get_transaction),
+        transaction: AsyncManagedTransaction | None = Depends(get_transaction),
     ):
         # TODO: move all this code to separate class
         self.session = session
@@ -52,8 +63,8 @@ class OutletsRepository:
             self.node_labels,
             params,
             self.relation,
+            returns=OUTLET_RETURN,
         )
-        query += " RETURN o { .*, organization_unit_id: p.id } as outlet"
 
         result = await (await self.tx.run(query, **params)).single()
         return OutletBase(**result["outlet"])
@@ -64,6 +75,7 @@ class OutletsRepository:
         query = prepare_delete_query(self.node_labels)
 
         await (await self.tx.run(query, id=outlet.id)).single()
+        after_commit(partial(propagation.schedule, "Outlet", outlet.id))
 
     async def save(self, outlet: OutletBase) -> OutletBase:
         self._check_transaction()
@@ -71,19 +83,41 @@ class OutletsRepository:
         params = transform_to_dict(outlet)
         del params["id"]
 
-        query = prepare_save_query(self.node_labels, self.relation, params)
-        query += " RETURN o { .*, organization_unit_id: p.id } as outlet\n"
+        query = prepare_save_query(
+            self.node_labels,
+            self.relation,
+            params,
+            returns=OUTLET_RETURN,
+        )
 
         result = await (await self.tx.run(query, **params, id=outlet.id)).single()
+        after_commit(partial(propagation.schedule, "Outlet", outlet.id))
+
         return OutletBase(**result["outlet"])
 
     async def get_by_id(self, outlet_id: str) -> OutletBase:
-        query = prepare_get_by_id_query(self.node_labels, self.relation)
-        query += " RETURN o { .*, organization_unit_id: p.id } as outlet\n"
+        query = prepare_get_by_id_query(
+            self.node_labels,
+            self.relation,
+            returns=OUTLET_RETURN,
+        )
 
         result = await (await self.tx.run(query, id=outlet_id)).single()
         return OutletBase(**result["outlet"]) if result is not None else None
 
+    async def get_full_by_id(self, outlet_id: str, root_ou: str) -> Outlet:
+        query = prepare_hydrate_query(
+            self.node_labels,
+            self.relation,
+            " WITH o, p, p as ou",
+            returns=OUTLET_FULL_RETURN,
+        )
+
+        result = await (
+            await self.tx.run(query, id=outlet_id, root_ou=root_ou)
+        ).single()
+        return Outlet(**result["outlet"]) if result is not None else None
+
     async def find(
         self,
         dto: OutletFindDto,
@@ -95,37 +129,23 @@ class OutletsRepository:
         if "child_of" in params:
             del params["child_of"]
 
-        lines = []
-        if params:
-            for key in params:
-                lines.append(f"o.{key} = ${key}")
-
-        query = prepare_find_query(
-            ["OrganizationUnit", "RootOrganizationUnit"],
-            self.node_labels,
-            self.relation,
-            lines,
-        )
-
-        count_query = str(query)
-        count_query += " RETURN count(o) as count"
-
-        count_result = await (
-            await self.tx.run(count_query, available_ou=available_ou, **params)  # noqa
-        ).single()
-
-        query += " RETURN o"
-        query += f" SKIP {(pagination.page - 1) * pagination.limit} LIMIT {pagination.limit}"  # noqa
-
-        result = await self.tx.run(query, available_ou=available_ou, **params)
-        result_pagination = Pagination(
-            page=pagination.page,
-            limit=pagination.limit,
-            count=count_result["count"],
+        result_pagination, records = await fetch_page(
+            self.transaction,
+            partial(
+                prepare_find_query,
+                ["OrganizationUnit", "RootOrganizationUnit"],
+                self.node_labels,
+                self.relation,
+                params,
+            ),
+            params,
+            "available_ou",
+            available_ou,
+            pagination,
         )
 
         retval = []
-        async for record in result:
+        for record in records:
             retval.append(OutletBase(**record["o"]))
 
         return OutletPaginated(pagination=result_pagination, data=retval)
@@ -139,9 +159,12 @@ class OutletsRepository:
         query += prepare_get_by_id_query(self.node_labels, self.relation)
         query += " DELETE r "
         query += f"CREATE (o)-[:{self.relation}]->(n_parent) "
+        query += "SET o.effective_active = coalesce(toBoolean(o.active), false) "
+        query += "AND o.deleted IS NULL AND coalesce(n_parent.effective_active, false)"
 
         await (
             await self.tx.run(query, id=outlet.id, new_parent_id=new_parent_id)
         ).single()
+        after_commit(partial(propagation.schedule, "Outlet", outlet.id))
 
         return await self.get_by_id(outlet.id)
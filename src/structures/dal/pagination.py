@@ -0,0 +1,178 @@
+import time
+from typing import Callable
+
+from neo4j import AsyncManagedTransaction, Record
+
+from src.common.metrics import register_metrics_source
+from src.common.models import CountMode, Pagination, PaginationQueryParams
+from src.common.neo4j import run_concurrently
+from src.common.utils.cypher_utils import (
+    COUNT_BY_PARENT_RETURN,
+    COUNT_RETURN,
+    next_cursor,
+    page_return,
+    pagination_params,
+)
+
+COUNTERS_TTL = 60.0  # seconds
+COUNTERS_SIZE = 10_000
+# available organization units which are not below other available ones, root
+# covers all, ancestors of units without them yet are taken as empty
+TOPMOST_OU = (
+    "MATCH (p:OrganizationUnit|RootOrganizationUnit) WHERE p.id IN $parents"
+    " AND (p:RootOrganizationUnit OR NOT EXISTS {"
+    " MATCH (r:RootOrganizationUnit) WHERE r.id IN $parents })"
+    " AND none(a IN coalesce(p.ancestors, []) WHERE a IN $parents)"
+    " RETURN p.id as id"
+)
+
+
+class SubtreeCounters:
+    """
+    Cached number of nodes under each parent (OU or outlet) by query and
+    filters. Estimated total is a sum of counters of available parents
+    """
+
+    def __init__(self, ttl: float, size: int) -> None:
+        self._ttl = ttl
+        self._size = size
+        self._counters: dict[tuple, tuple[float, int]] = {}
+        self._hits = 0
+        self._misses = 0
+
+    def get(self, key: tuple) -> int | None:
+        entry = self._counters.get(key)
+
+        if entry is None or entry[0] < time.monotonic():
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        return entry[1]
+
+    def set(self, key: tuple, count: int) -> None:
+        self._counters.pop(key, None)
+        if len(self._counters) >= self._size:
+            # dict keeps insertion order, first one is the oldest
+            del self._counters[next(iter(self._counters))]
+
+        self._counters[key] = (time.monotonic() + self._ttl, count)
+
+    def snapshot(self) -> dict:
+        return {
+            "counters": len(self._counters),
+            "hits": self._hits,
+            "misses": self._misses,
+        }
+
+
+counters = SubtreeCounters(COUNTERS_TTL, COUNTERS_SIZE)
+register_metrics_source("subtree_counters", counters.snapshot)
+
+
+async def _topmost_ou(
+    transaction: AsyncManagedTransaction | None,
+    available_ou: list[str],
+) -> list[str]:
+    # subtree of unit below another available one is in that one's subtree,
+    # otherwise its nodes are found and counted twice
+    if len(available_ou) < 2:
+        return available_ou
+
+    (records,) = await run_concurrently(
+        transaction,
+        (TOPMOST_OU, {"parents": available_ou}),
+    )
+    return [record["id"] for record in records]
+
+
+async def _estimate(
+    transaction: AsyncManagedTransaction | None,
+    count_query: str,
+    filters: dict,
+    parents_key: str,
+    parents: list[str],
+    page_query: tuple[str, dict],
+) -> tuple[int, list[Record]]:
+    filters_key = tuple(sorted(filters.items()))
+    keys = {parent: (count_query, parent, filters_key) for parent in parents}
+    counts = {parent: counters.get(key) for parent, key in keys.items()}
+    missing = [parent for parent, count in counts.items() if count is None]
+
+    if not missing:
+        (records,) = await run_concurrently(transaction, page_query)
+        return sum(counts.values()), records
+
+    count_records, records = await run_concurrently(
+        transaction,
+        (count_query, {**filters, parents_key: missing}),
+        page_query,
+    )
+
+    for parent in missing:
+        counts[parent] = 0
+    for record in count_records:
+        counts[record["parent_id"]] = record["count"]
+    for parent in missing:
+        counters.set(keys[parent], counts[parent])
+
+    return sum(counts.values()), records
+
+
+async def fetch_page(
+    transaction: AsyncManagedTransaction | None,
+    build_query: Callable[..., str],
+    filters: dict,
+    parents_key: str,
+    parents: list[str],
+    pagination: PaginationQueryParams,
+) -> tuple[Pagination, list[Record]]:
+    """
+    Runs page query and count query selected by count mode concurrently.
+    build_query is a find query template waiting for returns and after
+    """
+    if parents_key == "available_ou":
+        parents = await _topmost_ou(transaction, parents)
+
+    params = {**filters, parents_key: parents}
+    page_query = (
+        build_query(
+            returns=page_return(pagination),
+            after=pagination.cursor is not None,
+        ),
+        {**params, **pagination_params(pagination)},
+    )
+
+    if pagination.count_mode == CountMode.exact:
+        count_records, records = await run_concurrently(
+            transaction,
+            (build_query(returns=COUNT_RETURN), params),
+            page_query,
+        )
+        count = count_records[0]["count"]
+    elif pagination.count_mode == CountMode.estimate:
+        count, records = await _estimate(
+            transaction,
+            build_query(returns=COUNT_BY_PARENT_RETURN),
+            filters,
+            parents_key,
+            parents,
+            page_query,
+        )
+    else:
+        (records,) = await run_concurrently(transaction, page_query)
+        count = None
+
+    has_more = len(records) > pagination.limit
+    records = records[: pagination.limit]
+
+    return (
+        Pagination(
+            page=pagination.page,
+            limit=pagination.limit,
+            count=count,
+            has_more=has_more,
+            next_cursor=next_cursor(pagination, records, has_more),
+        ),
+        records,
+    )
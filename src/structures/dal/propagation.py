@@ -0,0 +1,404 @@
+import asyncio
+import logging
+
+from fastapi import FastAPI
+from neo4j import AsyncDriver, AsyncGraphDatabase, AsyncManagedTransaction
+
+from src.common.metrics import register_metrics_source
+from src.common.neo4j.configuration import Neo4JConfiguration
+from src.common.utils.cypher_utils import own_active, subtree_condition
+
+logger = logging.getLogger(__name__)
+
+PROPAGATION_BATCH = 1_000
+RECONCILE_LEASE = "effective_active_reconcile"
+
+
+def _drifted(node: str, effective: str) -> str:
+    return (
+        f"({node}.effective_active IS NULL"
+        f" OR {node}.effective_active <> ({effective}))"
+    )
+
+
+# organization units of the subtree in lft order, every unit is checked against
+# its stored ancestors, so batches do not depend on each other
+PROPAGATE_OU = (
+    "MATCH (p:OrganizationUnit|RootOrganizationUnit { id: $id })"
+    f" MATCH (d:OrganizationUnit) WHERE {subtree_condition('d')} AND d.lft > $after"
+    " WITH d ORDER BY d.lft LIMIT $batch"
+    " OPTIONAL MATCH (a:OrganizationUnit) WHERE a.id IN d.ancestors"
+    f" AND NOT ({own_active('a')})"
+    " WITH d, count(a) as inactive"
+    " WITH d, inactive = 0 AND d.ancestors IS NOT NULL"
+    f" AND {own_active('d')} as effective"
+    " SET d.effective_active = effective"
+    " WITH d, effective"
+    " CALL {"
+    " WITH d, effective"
+    " MATCH (w:Worker)-[:WORK_IN]->(d)"
+    f" SET w.effective_active = effective AND {own_active('w')}"
+    " }"
+    " CALL {"
+    " WITH d, effective"
+    " MATCH (o:Outlet)-[:BELONG_TO]->(d)"
+    f" WITH o, effective AND {own_active('o')} as outlet_effective"
+    " SET o.effective_active = outlet_effective"
+    " WITH o, outlet_effective"
+    " MATCH (v:Device)-[:LOCATED_AT]->(o)"
+    f" SET v.effective_active = outlet_effective AND {own_active('v')}"
+    " }"
+    " RETURN max(d.lft) as last, count(d) as updated"
+)
+PROPAGATE_OUTLET = (
+    "MATCH (v:Device)-[:LOCATED_AT]->(o:Outlet { id: $id })"
+    " SET v.effective_active = coalesce(o.effective_active, false)"
+    f" AND {own_active('v')}"
+    " RETURN count(v) as updated"
+)
+# stored flags are compared with flags computed from own flags of the unit
+# and its ancestors, units with wrong flag on them, their workers or outlets
+# are returned as [id, lft, rgt]
+DRIFTED_OU = (
+    "MATCH (d:OrganizationUnit) WHERE d.lft > $after"
+    " WITH d ORDER BY d.lft LIMIT $batch"
+    " OPTIONAL MATCH (a:OrganizationUnit) WHERE a.id IN d.ancestors"
+    f" AND NOT ({own_active('a')})"
+    " WITH d, count(a) as inactive"
+    " WITH d, inactive = 0 AND d.ancestors IS NOT NULL"
+    f" AND {own_active('d')} as effective"
+    " OPTIONAL MATCH (w:Worker)-[:WORK_IN]->(d)"
+    f" WHERE {_drifted('w', 'effective AND ' + own_active('w'))}"
+    " WITH d, effective, count(w) as workers"
+    " OPTIONAL MATCH (o:Outlet)-[:BELONG_TO]->(d)"
+    f" WHERE {_drifted('o', 'effective AND ' + own_active('o'))}"
+    " WITH d, effective, workers, count(o) as outlets"
+    " RETURN max(d.lft) as last, count(d) as checked,"
+    f" collect(CASE WHEN {_drifted('d', 'effective')}"
+    " OR workers > 0 OR outlets > 0 THEN [d.id, d.lft, d.rgt] END) as drifted"
+)
+_DEVICE_EFFECTIVE = "coalesce(o.effective_active, false) AND " + own_active("v")
+# outlets in id order, outlets with devices having wrong flag are returned
+DRIFTED_DEVICES = (
+    "MATCH (o:Outlet) WHERE o.id > $after"
+    " WITH o ORDER BY o.id LIMIT $batch"
+    " OPTIONAL MATCH (v:Device)-[:LOCATED_AT]->(o)"
+    f" WHERE {_drifted('v', _DEVICE_EFFECTIVE)}"
+    " WITH o, count(v) as devices"
+    " RETURN max(o.id) as last, count(o) as checked,"
+    " collect(CASE WHEN devices > 0 THEN o.id END) as drifted"
+)
+# nodes created before effective_active was stored, units are computed from
+# own flags of ancestors, nodes below them from their already set parents
+BACKFILL_EFFECTIVE_ACTIVE = (
+    (
+        "MATCH (d:OrganizationUnit) WHERE d.effective_active IS NULL"
+        " WITH d LIMIT $batch"
+        " OPTIONAL MATCH (a:OrganizationUnit) WHERE a.id IN d.ancestors"
+        f" AND NOT ({own_active('a')})"
+        " WITH d, count(a) as inactive"
+        " SET d.effective_active = inactive = 0 AND d.ancestors IS NOT NULL"
+        f" AND {own_active('d')}"
+        " RETURN count(d) as updated"
+    ),
+    (
+        "MATCH (w:Worker)-[:WORK_IN]->(d:OrganizationUnit)"
+        " WHERE w.effective_active IS NULL AND d.effective_active IS NOT NULL"
+        " WITH w, d LIMIT $batch"
+        f" SET w.effective_active = d.effective_active AND {own_active('w')}"
+        " RETURN count(w) as updated"
+    ),
+    (
+        "MATCH (o:Outlet)-[:BELONG_TO]->(d:OrganizationUnit)"
+        " WHERE o.effective_active IS NULL AND d.effective_active IS NOT NULL"
+        " WITH o, d LIMIT $batch"
+        f" SET o.effective_active = d.effective_active AND {own_active('o')}"
+        " RETURN count(o) as updated"
+    ),
+    (
+        "MATCH (v:Device)-[:LOCATED_AT]->(o:Outlet)"
+        " WHERE v.effective_active IS NULL AND o.effective_active IS NOT NULL"
+        " WITH v, o LIMIT $batch"
+        f" SET v.effective_active = {_DEVICE_EFFECTIVE}"
+        " RETURN count(v) as updated"
+    ),
+)
+# lease node is read after write lock on root is taken, so workers asking at
+# the same time are serialized and only one of them gets it
+LEASE = (
+    "MATCH (r:RootOrganizationUnit) SET r._LOCK_ = true"
+    " MERGE (l:Lease { name: $name })"
+    " WITH r, l, coalesce(l.until, 0) < timestamp() as acquired"
+    " SET l.until = CASE WHEN acquired THEN timestamp() + $ttl ELSE l.until END"
+    " REMOVE r._LOCK_"
+    " RETURN acquired"
+)
+
+
+async def acquire_lease(
+    transaction: AsyncManagedTransaction,
+    name: str,
+    seconds: float,
+) -> bool:
+    """
+    True for one caller of all processes until seconds pass
+    """
+    result = await transaction.run(LEASE, name=name, ttl=int(seconds * 1000))
+    record = await result.single()
+    return record is not None and record["acquired"]
+
+
+class EffectiveActivePropagation:
+    """
+    Background propagation of effective_active down from changed organization
+    units and outlets. Changed node itself is updated by its write query,
+    nodes below it are updated here in batches, every batch in own
+    transaction. Node scheduled several times before it is processed is
+    propagated once.
+    Queue is in memory and is lost when process stops, so stored flags are
+    periodically compared with own flags of ancestors by one of processes
+    and nodes with wrong flags are propagated again.
+    """
+
+    def __init__(self, batch: int) -> None:
+        self._batch = batch
+        self._queue: asyncio.Queue | None = None
+        self._pending: set[tuple[str, str]] = set()
+        self._scheduled = 0
+        self._propagated = 0
+        self._updated = 0
+        self._batches = 0
+        self._failures = 0
+        self._reconciles = 0
+        self._drifted = 0
+
+    def schedule(self, label: str, node_id: str) -> None:
+        """
+        Queues propagation from node, should be called after commit
+        """
+        if self._queue is None:
+            logger.warning(f"Propagation is not running, {label} {node_id} skipped")
+            return
+
+        if (label, node_id) in self._pending:
+            return
+
+        self._scheduled += 1
+        self._pending.add((label, node_id))
+        self._queue.put_nowait((label, node_id))
+
+    async def _ou_batch(
+        self,
+        transaction: AsyncManagedTransaction,
+        ou_id: str,
+        after: int,
+    ) -> dict:
+        result = await transaction.run(
+            PROPAGATE_OU,
+            id=ou_id,
+            after=after,
+            batch=self._batch,
+        )
+        return await result.single()
+
+    async def _organization_unit(self, driver: AsyncDriver, ou_id: str) -> None:
+        after = -1
+
+        while True:
+            async with driver.session() as session:
+                record = await session.execute_write(self._ou_batch, ou_id, after)
+
+            self._batches += 1
+            self._updated += record["updated"]
+            if record["updated"] < self._batch:
+                return
+
+            after = record["last"]
+
+    async def _outlet(self, driver: AsyncDriver, outlet_id: str) -> None:
+        async def devices(transaction: AsyncManagedTransaction) -> dict:
+            result = await transaction.run(PROPAGATE_OUTLET, id=outlet_id)
+            return await result.single()
+
+        async with driver.session() as session:
+            record = await session.execute_write(devices)
+
+        self._batches += 1
+        self._updated += record["updated"]
+
+    async def _drifted_batch(
+        self,
+        transaction: AsyncManagedTransaction,
+        after: int,
+    ) -> dict:
+        result = await transaction.run(DRIFTED_OU, after=after, batch=self._batch)
+        return await result.single()
+
+    async def _drifted_devices(
+        self,
+        transaction: AsyncManagedTransaction,
+        after: str,
+    ) -> dict:
+        result = await transaction.run(DRIFTED_DEVICES, after=after, batch=self._batch)
+        return await result.single()
+
+    async def reconcile(self, driver: AsyncDriver) -> None:
+        """
+        Schedules propagation from units and outlets with wrong flags below
+        them, nodes created before effective_active was stored are found too
+        """
+        await self._reconcile_organization_units(driver)
+        await self._reconcile_outlets(driver)
+
+        self._reconciles += 1
+
+    async def _reconcile_organization_units(self, driver: AsyncDriver) -> None:
+        after = -1
+        # subtree of scheduled unit is propagated with it
+        covered = -1
+
+        while True:
+            async with driver.session() as session:
+                record = await session.execute_read(self._drifted_batch, after)
+
+            for ou_id, lft, rgt in sorted(record["drifted"], key=lambda d: d[1]):
+                if lft < covered:
+                    continue
+
+                self._drifted += 1
+                self.schedule("OrganizationUnit", ou_id)
+                covered = rgt
+
+            if record["checked"] < self._batch:
+                return
+
+            after = record["last"]
+
+    async def _reconcile_outlets(self, driver: AsyncDriver) -> None:
+        after = ""
+
+        while True:
+            async with driver.session() as session:
+                record = await session.execute_read(self._drifted_devices, after)
+
+            for outlet_id in record["drifted"]:
+                self._drifted += 1
+                self.schedule("Outlet", outlet_id)
+
+            if record["checked"] < self._batch:
+                return
+
+            after = record["last"]
+
+    async def reconcile_periodically(
+        self,
+        driver: AsyncDriver,
+        interval: float,
+    ) -> None:
+        while True:
+            try:
+                async with driver.session() as session:
+                    acquired = await session.execute_write(
+                        acquire_lease,
+                        RECONCILE_LEASE,
+                        interval,
+                    )
+
+                if acquired:
+                    await self.reconcile(driver)
+            except Exception:
+                logger.exception("Reconciliation of effective_active failed")
+
+            await asyncio.sleep(interval)
+
+    async def run(self, driver: AsyncDriver) -> None:
+        while True:
+            label, node_id = await self._queue.get()
+            self._pending.discard((label, node_id))
+
+            try:
+                if label == "Outlet":
+                    await self._outlet(driver, node_id)
+                else:
+                    await self._organization_unit(driver, node_id)
+
+                self._propagated += 1
+            except Exception:
+                self._failures += 1
+                logger.exception(f"Propagation from {label} {node_id} failed")
+
+    def start(self) -> None:
+        self._queue = asyncio.Queue()
+        self._pending.clear()
+
+    def stop(self) -> None:
+        self._queue = None
+
+    def snapshot(self) -> dict:
+        return {
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "scheduled": self._scheduled,
+            "propagated": self._propagated,
+            "updated": self._updated,
+            "batches": self._batches,
+            "failures": self._failures,
+            "reconciles": self._reconciles,
+            "drifted": self._drifted,
+        }
+
+
+async def backfill_effective_active(transaction: AsyncManagedTransaction) -> bool:
+    """
+    Sets effective_active on up to batch nodes of every label which do not
+    have it yet, so checks requiring it work before first reconciliation
+    """
+    updated = []
+    for query in BACKFILL_EFFECTIVE_ACTIVE:
+        result = await (await transaction.run(query, batch=PROPAGATION_BATCH)).single()
+        updated.append(result["updated"])
+
+    if any(updated):
+        logger.info(f"Effective active set on {sum(updated)} nodes")
+
+    return max(updated) == PROPAGATION_BATCH
+
+
+propagation = EffectiveActivePropagation(PROPAGATION_BATCH)
+register_metrics_source("effective_active", propagation.snapshot)
+
+
+def register_propagation(
+    application: FastAPI,
+    config: Neo4JConfiguration,
+    reconcile_interval: float,
+) -> None:
+    """
+    Runs effective_active propagation and its reconciliation every
+    reconcile_interval in background while application works, it uses its
+    own driver as there is no request
+    """
+    state = {}
+
+    async def start() -> None:
+        state["driver"] = AsyncGraphDatabase.driver(
+            config.uri,
+            auth=(config.user, config.password),
+        )
+        propagation.start()
+        state["tasks"] = [
+            asyncio.create_task(propagation.run(state["driver"])),
+            asyncio.create_task(
+                propagation.reconcile_periodically(state["driver"], reconcile_interval),
+            ),
+        ]
+
+    async def stop() -> None:
+        propagation.stop()
+        for task in state["tasks"]:
+            task.cancel()
+        await asyncio.gather(*state["tasks"], return_exceptions=True)
+
+        await state["driver"].close()
+
+    application.add_event_handler(event_type="startup", func=start)
+    application.add_event_handler(event_type="shutdown", func=stop)
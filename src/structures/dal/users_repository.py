@@ -1,7 +1,7 @@
 import logging
 
 from fastapi import Depends
-from neo4j import AsyncSession, AsyncTransaction
+from neo4j import AsyncManagedTransaction, AsyncSession
 
 from src.common.neo4j import get_session, get_transaction
 from src.structures.dal.utils import transform_to_dict
@@ -9,12 +9,18 @@ from src.structures.domain.users.models import User, UserCreateDto
 
 logger = logging.getLogger(__name__)
 
+# organization unit "o", its stored ancestors and root
+PATH_IDS = (
+    " WITH CASE WHEN o IS NULL THEN [] ELSE [o.id] + coalesce(o.ancestors, []) END"
+    " + [$root_ou] as path_ids"
+)
+
 
 class UsersRepository:
     def __init__(
         self,
         session: AsyncSession = Depends(get_session),
-        transaction: AsyncTransaction | None = Depends(get_transaction),
+        transaction: AsyncManagedTransaction | None = Depends(get_transaction),
     ) -> None:
         self.session = session
         self.transaction = transaction
@@ -110,52 +116,35 @@ class UsersRepository:
 
         return await self.get_by_id(user.id)
 
-    async def has_access_right(
+    async def path_to_organization_unit(
         self,
-        user_id: str,
         organization_id: str,
         root_ou: str,
-        access_right: str,
-    ) -> bool:
+    ) -> list[str]:
         query = "OPTIONAL MATCH (o:OrganizationUnit {id: $organization_unit})"
-        query += "-[:CHILD_OF*0..10]->(p:OrganizationUnit)-[:CHILD_OF*0..10]->(root:RootOrganizationUnit)"
-        query += " WITH collect(p.id) + [$root_ou] as path_ids"
-        query += " MATCH (u:USER {id: $id})"
-        query += f"-[r:{access_right}]->"
-        query += "(ou:OrganizationUnit|RootOrganizationUnit)"
-        query += " WHERE ou.id IN path_ids AND u.deleted IS NULL RETURN r"
+        query += PATH_IDS
+        query += " RETURN path_ids"
 
         result = await (
             await self.tx.run(
                 query,
-                id=user_id,
                 organization_unit=organization_id,
                 root_ou=root_ou,
             )  # noqa
         ).single()
-        return True if result is not None else False
+        return result["path_ids"]
 
-    async def have_write_access_by_outlet(
-        self,
-        user_id: str,
-        outlet_id: str,
-        root_ou: str,
-        access_right: str,
-    ) -> bool:
-        query = "OPTIONAL MATCH (o:Outlet {id: $outlet_id})-[:BELONG_TO]->(:OrganizationUnit)"
-        query += "-[:CHILD_OF*0..10]->(p:OrganizationUnit)-[:CHILD_OF*0..10]->(root:RootOrganizationUnit)"
-        query += " WITH collect(p.id) + [$root_ou] as path_ids"
-        query += " MATCH (u:USER {id: $id})"
-        query += f"-[r:{access_right}]->"
-        query += "(ou:OrganizationUnit|RootOrganizationUnit)"
-        query += " WHERE ou.id IN path_ids AND u.deleted IS NULL RETURN r"
+    async def path_to_outlet(self, outlet_id: str, root_ou: str) -> list[str]:
+        query = "OPTIONAL MATCH (:Outlet {id: $outlet_id})-[:BELONG_TO]->"
+        query += "(o:OrganizationUnit)"
+        query += PATH_IDS
+        query += " RETURN path_ids"
 
         result = await (
             await self.tx.run(
                 query,
-                id=user_id,
                 outlet_id=outlet_id,
                 root_ou=root_ou,
             )  # noqa
         ).single()
-        return True if result is not None else False
+        return result["path_ids"]
@@ -1,19 +1,23 @@
 import logging
+from functools import partial
 
 from fastapi import Depends
-from neo4j import AsyncSession, AsyncTransaction
+from neo4j import AsyncManagedTransaction, AsyncSession
 
-from src.common.models import Pagination, PaginationQueryParams
+from src.common.models import PaginationQueryParams
 from src.common.neo4j import get_session, get_transaction
 from src.common.utils.cypher_utils import (
     prepare_create_query,
     prepare_delete_query,
     prepare_find_query,
     prepare_get_by_id_query,
+    prepare_hydrate_query,
     prepare_save_query,
 )
+from src.structures.dal.pagination import fetch_page
 from src.structures.dal.utils import transform_to_dict
 from src.structures.domain.workers.models import (
+    Worker,
     WorkerBase,
     WorkerCreateDto,
     WorkerFindDto,
@@ -22,6 +26,12 @@ from src.structures.domain.workers.models import (
 
 logger = logging.getLogger(__name__)
 
+WORKER_RETURN = " RETURN o { .*, organization_unit_id: p.id } as worker"
+WORKER_FULL_RETURN = (
+    " RETURN o { .*, organization_unit_id: p.id, materialized_path: materialized_path,"
+    " is_active_tree: o.active = true AND in_active_tree } as worker"
+)
+
 
 class WorkersRepository:
     node_labels: list[str] = ["Worker"]
@@ -30,7 +40,7 @@ class WorkersRepository:
     def __init__(
         self,
         session: AsyncSession = Depends(get_session),
-        transaction: AsyncTransaction | None = Depends(get_transaction),
+        transaction: AsyncManagedTransaction | None = Depends(get_transaction),
     ) -> None:
         self.session = session
         self.transaction = transaction
@@ -51,8 +61,8 @@ class WorkersRepository:
             self.node_labels,
             params,
             self.relation,
+            returns=WORKER_RETURN,
         )
-        query += " RETURN o { .*, organization_unit_id: p.id } as worker"
 
         result = await (await self.tx.run(query, **params)).single()
         return WorkerBase(**result["worker"])
@@ -70,19 +80,39 @@ class WorkersRepository:
         params = transform_to_dict(worker)
         del params["id"]
 
-        query = prepare_save_query(self.node_labels, self.relation, params)
-        query += " RETURN o { .*, organization_unit_id: p.id } as worker\n"
+        query = prepare_save_query(
+            self.node_labels,
+            self.relation,
+            params,
+            returns=WORKER_RETURN,
+        )
 
         result = await (await self.tx.run(query, **params, id=worker.id)).single()
         return WorkerBase(**result["worker"])
 
     async def get_by_id(self, worker_id: str) -> WorkerBase:
-        query = prepare_get_by_id_query(self.node_labels, self.relation)
-        query += " RETURN o { .*, organization_unit_id: p.id } as worker\n"
+        query = prepare_get_by_id_query(
+            self.node_labels,
+            self.relation,
+            returns=WORKER_RETURN,
+        )
 
         result = await (await self.tx.run(query, id=worker_id)).single()
         return WorkerBase(**result["worker"]) if result is not None else None
 
+    async def get_full_by_id(self, worker_id: str, root_ou: str) -> Worker:
+        query = prepare_hydrate_query(
+            self.node_labels,
+            self.relation,
+            " WITH o, p, p as ou",
+            returns=WORKER_FULL_RETURN,
+        )
+
+        result = await (
+            await self.tx.run(query, id=worker_id, root_ou=root_ou)
+        ).single()
+        return Worker(**result["worker"]) if result is not None else None
+
     async def find(
         self,
         dto: WorkerFindDto,
@@ -94,39 +124,23 @@ class WorkersRepository:
         if "child_of_organization_unit" in params:
             del params["child_of_organization_unit"]
 
-        lines = []
-        if params:
-            for key in params:
-                lines.append(f"o.{key} = ${key}")
-
-        query = prepare_find_query(
-            ["OrganizationUnit", "RootOrganizationUnit"],
-            self.node_labels,
-            self.relation,
-            lines,
-        )
-
-        count_query = str(query)
-        count_query += " RETURN count(o) as count"
-
-        count_result = await (
-            await self.tx.run(count_query, available_ou=available_ou, **params)  # noqa
-        ).single()
-
-        query += " RETURN o"
-        query += (
-            f" SKIP {(pagination.page - 1) * pagination.limit} LIMIT {pagination.limit}"
-        )
-
-        result = await self.tx.run(query, available_ou=available_ou, **params)
-        result_pagination = Pagination(
-            page=pagination.page,
-            limit=pagination.limit,
-            count=count_result["count"],
+        result_pagination, records = await fetch_page(
+            self.transaction,
+            partial(
+                prepare_find_query,
+                ["OrganizationUnit", "RootOrganizationUnit"],
+                self.node_labels,
+                self.relation,
+                params,
+            ),
+            params,
+            "available_ou",
+            available_ou,
+            pagination,
         )
 
         retval = []
-        async for record in result:
+        for record in records:
             retval.append(WorkerBase(**record["o"]))
 
         return WorkerPaginatedDto(pagination=result_pagination, data=retval)
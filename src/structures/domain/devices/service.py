@@ -6,8 +6,6 @@ from src.common.context.context import get_request
 from src.common.models import PaginationQueryParams
 from src.common.utils import update_model_by_dto
 from src.structures.dal.devices_repository import DevicesRepository
-from src.structures.dal.ou_repository import OrganizationUnitsRepository
-from src.structures.dal.outlets_repository import OutletsRepository
 from src.structures.dal.workers_repository import WorkersRepository
 from src.structures.domain.devices.exceptions import DeviceNotFound
 from src.structures.domain.devices.models import (
@@ -26,7 +24,7 @@ from src.structures.domain.users.exceptions import (
     OutletWriteAccessException,
     ReadAccessException,
 )
-from src.structures.domain.workers.models import Worker
+from src.structures.domain.workers.exceptions import WorkerNotFound
 
 logger = logging.getLogger(__name__)
 
@@ -36,17 +34,11 @@ class DeviceService:
         self,
         user_service: UserService = Depends(UserService),
         repository: DevicesRepository = Depends(DevicesRepository),
-        organization_unit_repo: OrganizationUnitsRepository = Depends(
-            OrganizationUnitsRepository,
-        ),
-        outlet_repo: OutletsRepository = Depends(OutletsRepository),
         worker_repo: WorkersRepository = Depends(WorkersRepository),
         request: Request = Depends(get_request),
     ):
         self._user_service = user_service
         self._repository = repository
-        self._org_unit_repo = organization_unit_repo
-        self._outlet_repo = outlet_repo
         self._worker_repo = worker_repo
         self._request = request
 
@@ -65,7 +57,11 @@ class DeviceService:
         access: str,
     ) -> DeviceBase:
         device = await self._get_by_id(device_id)
+        await self._check_access(device, user_id, access)
 
+        return device
+
+    async def _check_access(self, device: DeviceBase, user_id: str, access: str):
         if access == "WRITE":
             if not await self._user_service.have_write_access_by_outlet(
                 user_id,
@@ -79,28 +75,19 @@ class DeviceService:
             ):
                 raise OutletReadAccessException(user_id, device.outlet_id)
 
-        return device
-
     async def _base_to_device(self, base: DeviceBase) -> Device:
-        ou = await self._outlet_repo.get_by_id(base.outlet_id)
+        return await self._get_full_by_id(base.id)
 
-        ou_path = await self._org_unit_repo.path_to_organization_unit(
-            ou.organization_unit_id,
+    async def _get_full_by_id(self, device_id: str) -> Device:
+        device = await self._repository.get_full_by_id(
+            device_id,
             self._request.app.state.ROOT_OU,
         )
 
-        is_active_tree = False
-        if base.active is True:
-            is_active_tree = await self._org_unit_repo.is_in_active_tree(
-                ou.organization_unit_id,
-                self._request.app.state.ROOT_OU,
-            )
+        if device is None:
+            raise DeviceNotFound(device_id)
 
-        return Device(
-            is_active_tree=base.active and is_active_tree,
-            materialized_path=ou_path,
-            **base.dict(),
-        )
+        return device
 
     async def create(self, dto: DeviceCreateDto, user_id: str) -> Device:
         if not await self._user_service.have_write_access_by_outlet(
@@ -130,8 +117,10 @@ class DeviceService:
         return await self._repository.delete(device)
 
     async def get_by_id(self, device_id: str, user_id: str) -> Device:
-        base = await self._get_by_id_access_right_checked(device_id, user_id, "READ")
-        return await self._base_to_device(base)
+        device = await self._get_full_by_id(device_id)
+        await self._check_access(device, user_id, "READ")
+
+        return device
 
     async def find(
         self,
@@ -211,28 +200,13 @@ class DeviceService:
         if not can_take_exam:
             raise DeviceExamAccessException(worker_id, device_id)
 
-        base_device = await self._get_by_id(device_id)
-        device = await self._base_to_device(base_device)
+        device = await self._get_full_by_id(device_id)
 
-        base_worker = await self._worker_repo.get_by_id(worker_id)
-        # copypaste from worker service
-        # TODO: can be optimized, second call not needed if same OU
-        ou_path = await self._org_unit_repo.path_to_organization_unit(
-            base_worker.organization_unit_id,
+        worker = await self._worker_repo.get_full_by_id(
+            worker_id,
             self._request.app.state.ROOT_OU,
         )
-
-        is_active_tree = False
-        if base_worker.active is True:
-            is_active_tree = await self._org_unit_repo.is_in_active_tree(
-                base_worker.organization_unit_id,
-                self._request.app.state.ROOT_OU,
-            )
-
-        worker = Worker(
-            is_active_tree=base_worker.active and is_active_tree,
-            materialized_path=ou_path,
-            **base_worker.dict(),
-        )
+        if worker is None:
+            raise WorkerNotFound(worker_id)
 
         return DeviceExamForWorker(worker=worker, device=device)
@@ -37,24 +37,18 @@ class OrganizationUnitService:
         self,
         ou: OrganizationUnitBase,
     ) -> OrganizationUnit:
-        ou_path = await self.repository.path_to_organization_unit(
-            ou.id,
+        return await self._get_full_by_id(ou.id)
+
+    async def _get_full_by_id(self, id: str) -> OrganizationUnit:
+        ou = await self.repository.get_full_by_id(
+            id,
             self.request.app.state.ROOT_OU,
         )
 
-        if ou.active is True:
-            is_active_tree = await self.repository.is_in_active_tree(
-                ou.id, self.request.app.state.ROOT_OU
-            )
-        else:
-            # is OU is not active, we don't check tree
-            is_active_tree = False
+        if ou is None:
+            raise OrganizationUnitNotFound(id)
 
-        return OrganizationUnit(
-            is_active_tree=ou.active and is_active_tree,
-            materialized_path=ou_path,
-            **ou.dict(),
-        )
+        return ou
 
     async def _get_by_id(self, id: str) -> OrganizationUnitBase:
         ou = await self.repository.get_by_id(id)
@@ -71,7 +65,16 @@ class OrganizationUnitService:
         access: str,
     ) -> OrganizationUnitBase:
         ou = await self._get_by_id(ou_id)
+        await self._check_access(ou, user_id, access)
+
+        return ou
 
+    async def _check_access(
+        self,
+        ou: OrganizationUnitBase,
+        user_id: str,
+        access: str,
+    ):
         if access == "WRITE":
             if not await self._user_service.have_write_access(user_id, ou.id):
                 raise WriteAccessException(user_id, ou.id)
@@ -79,8 +82,6 @@ class OrganizationUnitService:
             if not await self._user_service.have_read_access(user_id, ou.id):
                 raise ReadAccessException(user_id, ou.id)
 
-        return ou
-
     async def create(
         self,
         dto: OrganizationUnitCreateDto,
@@ -122,9 +123,10 @@ class OrganizationUnitService:
         return await self.repository.delete(ou)
 
     async def get_by_id(self, id: str, user_id: str) -> OrganizationUnit:
-        ou = await self._get_by_id_access_right_checked(id, user_id, "READ")
+        ou = await self._get_full_by_id(id)
+        await self._check_access(ou, user_id, "READ")
 
-        return await self._base_to_organization_unit(ou)
+        return ou
 
     async def find(
         self,
@@ -5,7 +5,6 @@ from fastapi import Depends, Request
 from src.common.context.context import get_request
 from src.common.models import PaginationQueryParams
 from src.common.utils import update_model_by_dto
-from src.structures.dal.ou_repository import OrganizationUnitsRepository
 from src.structures.dal.outlets_repository import OutletsRepository
 from src.structures.domain.outlets.exceptions import OutletNotFound
 from src.structures.domain.outlets.models import (
@@ -30,14 +29,10 @@ class OutletService:
         self,
         user_service: UserService = Depends(UserService),
         repository: OutletsRepository = Depends(OutletsRepository),
-        organization_unit_repo: OrganizationUnitsRepository = Depends(
-            OrganizationUnitsRepository,
-        ),
         request: Request = Depends(get_request),
     ):
         self._user_service = user_service
         self._repository = repository
-        self._org_unit_repo = organization_unit_repo
         self._request = request
 
     async def _get_by_id(self, outlet_id: str) -> OutletBase:
@@ -55,7 +50,11 @@ class OutletService:
         access: str,
     ) -> OutletBase:
         outlet = await self._get_by_id(outlet_id)
+        await self._check_access(outlet, user_id, access)
 
+        return outlet
+
+    async def _check_access(self, outlet: OutletBase, user_id: str, access: str):
         if access == "WRITE":
             if not await self._user_service.have_write_access(
                 user_id,
@@ -69,14 +68,19 @@ class OutletService:
             ):
                 raise ReadAccessException(user_id, outlet.organization_unit_id)
 
-        return outlet
-
     async def _base_to_outlet(self, base: OutletBase) -> Outlet:
-        ou_path = await self._org_unit_repo.path_to_organization_unit(
-            base.organization_unit_id,
+        return await self._get_full_by_id(base.id)
+
+    async def _get_full_by_id(self, outlet_id: str) -> Outlet:
+        outlet = await self._repository.get_full_by_id(
+            outlet_id,
             self._request.app.state.ROOT_OU,
         )
-        return Outlet(materialized_path=ou_path, **base.dict())
+
+        if outlet is None:
+            raise OutletNotFound(outlet_id)
+
+        return outlet
 
     async def create(self, dto: OutletCreateDto, user_id: str) -> Outlet:
         if not await self._user_service.have_write_access(
@@ -109,9 +113,10 @@ class OutletService:
         return await self._repository.delete(outlet)
 
     async def get_by_id(self, outlet_id: str, user_id: str) -> Outlet:
-        outlet = await self._get_by_id_access_right_checked(outlet_id, user_id, "READ")
+        outlet = await self._get_full_by_id(outlet_id)
+        await self._check_access(outlet, user_id, "READ")
 
-        return await self._base_to_outlet(outlet)
+        return outlet
 
     async def find(
         self,
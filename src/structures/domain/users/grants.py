@@ -0,0 +1,66 @@
+import time
+from collections import OrderedDict
+
+from pydantic import BaseModel
+
+from src.common.metrics import register_metrics_source
+
+GRANTS_TTL = 30.0  # seconds
+GRANTS_SIZE = 10_000
+
+
+class AccessGrants(BaseModel):
+    # organization units with direct READ_ACCESS and WRITE_ACCESS relations
+    read: frozenset[str]
+    write: frozenset[str]
+
+
+class AccessGrantsCache:
+    """
+    Direct grants of users with TTL and LRU eviction. Cache is per process,
+    so TTL limits how long other instances could see revoked grants
+    """
+
+    def __init__(self, ttl: float, size: int) -> None:
+        self._ttl = ttl
+        self._size = size
+        self._grants: OrderedDict[str, tuple[float, AccessGrants]] = OrderedDict()
+        self._hits = 0
+        self._misses = 0
+        self._invalidations = 0
+
+    def get(self, user_id: str) -> AccessGrants | None:
+        entry = self._grants.get(user_id)
+
+        if entry is None or entry[0] < time.monotonic():
+            self._misses += 1
+            return None
+
+        self._hits += 1
+        self._grants.move_to_end(user_id)
+        return entry[1]
+
+    def set(self, user_id: str, grants: AccessGrants) -> None:
+        self._grants[user_id] = (time.monotonic() + self._ttl, grants)
+        self._grants.move_to_end(user_id)
+
+        while len(self._grants) > self._size:
+            self._grants.popitem(last=False)
+
+    def invalidate(self, user_id: str) -> None:
+        self._invalidations += 1
+        self._grants.pop(user_id, None)
+
+    def snapshot(self) -> dict:
+        total = self._hits + self._misses
+        return {
+            "users": len(self._grants),
+            "hits": self._hits,
+            "misses": self._misses,
+            "hit_rate": self._hits / total if total else None,
+            "invalidations": self._invalidations,
+        }
+
+
+grants_cache = AccessGrantsCache(GRANTS_TTL, GRANTS_SIZE)
+register_metrics_source("access_grants", grants_cache.snapshot)
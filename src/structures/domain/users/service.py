@@ -1,8 +1,12 @@
+from typing import Awaitable, Callable
+
 from fastapi import Depends, Request
 
 from src.common.context.context import get_request
+from src.common.neo4j import after_commit
 from src.structures.dal.users_repository import UsersRepository
 from src.structures.domain.users.exceptions import UserNotFound
+from src.structures.domain.users.grants import AccessGrants, grants_cache
 from src.structures.domain.users.models import User, UserCreateDto
 
 
@@ -26,50 +30,101 @@ class UserService:
     async def get_user_by_id(self, user_id: str) -> User:
         return await self._get_by_id(user_id)
 
-    async def have_read_access(self, user_id: str, organization_id: str) -> bool:
-        return await self.repository.has_access_right(
-            user_id,
+    async def _get_grants(self, user_id: str) -> AccessGrants | None:
+        grants = grants_cache.get(user_id)
+
+        if grants is None:
+            user = await self.repository.get_by_id(user_id)
+            if user is None:
+                return None
+
+            grants = AccessGrants(
+                read=frozenset(user.read or []),
+                write=frozenset(user.write or []),
+            )
+            grants_cache.set(user_id, grants)
+
+        return grants
+
+    def _invalidate_grants(self, user_id: str) -> None:
+        # other request could cache old grants before commit, so once more after it
+        grants_cache.invalidate(user_id)
+        after_commit(lambda: grants_cache.invalidate(user_id))
+
+    async def _granted_on_path(
+        self,
+        granted: frozenset[str],
+        organization_id: str | None,
+        load_path: Callable[[], Awaitable[list[str]]],
+    ) -> bool:
+        if not granted:
+            return False
+
+        # grant on root or on organization unit itself does not need path
+        if self.request.app.state.ROOT_OU in granted or organization_id in granted:
+            return True
+
+        return not granted.isdisjoint(await load_path())
+
+    async def _have_access(
+        self,
+        user_id: str,
+        organization_id: str,
+        access_right: str,
+    ) -> bool:
+        grants = await self._get_grants(user_id)
+        if grants is None:
+            return False
+
+        # path is read from the database, snapshot of other worker could miss
+        # a recent change_parent_ou and grant or deny access wrongly
+        return await self._granted_on_path(
+            grants.read if access_right == "READ_ACCESS" else grants.write,
             organization_id,
-            self.request.app.state.ROOT_OU,
-            "READ_ACCESS",
+            lambda: self.repository.path_to_organization_unit(
+                organization_id,
+                self.request.app.state.ROOT_OU,
+            ),
         )
 
-    async def have_write_access(self, user_id: str, organization_id: str) -> bool:
-        return await self.repository.has_access_right(
-            user_id,
-            organization_id,
-            self.request.app.state.ROOT_OU,
-            "WRITE_ACCESS",
+    async def _have_access_by_outlet(
+        self,
+        user_id: str,
+        outlet_id: str,
+        access_right: str,
+    ) -> bool:
+        grants = await self._get_grants(user_id)
+        if grants is None:
+            return False
+
+        return await self._granted_on_path(
+            grants.read if access_right == "READ_ACCESS" else grants.write,
+            None,
+            lambda: self.repository.path_to_outlet(
+                outlet_id,
+                self.request.app.state.ROOT_OU,
+            ),
         )
 
+    async def have_read_access(self, user_id: str, organization_id: str) -> bool:
+        return await self._have_access(user_id, organization_id, "READ_ACCESS")
+
+    async def have_write_access(self, user_id: str, organization_id: str) -> bool:
+        return await self._have_access(user_id, organization_id, "WRITE_ACCESS")
+
     async def have_write_access_by_outlet(self, user_id: str, outlet_id: str) -> bool:
-        return await self.repository.have_write_access_by_outlet(
-            user_id,
-            outlet_id,
-            self.request.app.state.ROOT_OU,
-            "WRITE_ACCESS",
-        )
+        return await self._have_access_by_outlet(user_id, outlet_id, "WRITE_ACCESS")
 
     async def have_read_access_by_outlet(self, user_id, outlet_id: str) -> bool:
-        return await self.repository.have_write_access_by_outlet(
-            user_id,
-            outlet_id,
-            self.request.app.state.ROOT_OU,
-            "READ_ACCESS",
-        )
+        return await self._have_access_by_outlet(user_id, outlet_id, "READ_ACCESS")
 
     async def get_available_organization_units(self, user_id: str) -> list[str]:
-        result = set()
-
-        user = await self._get_by_id(user_id)
-
-        for ou in user.read:
-            result.add(ou)
+        grants = await self._get_grants(user_id)
 
-        for ou in user.write:
-            result.add(ou)
+        if grants is None:
+            raise UserNotFound(user_id)
 
-        return list(result)
+        return list(grants.read | grants.write)
 
     async def create(self, dto: UserCreateDto) -> User:
         return await self.repository.create(dto)
@@ -77,16 +132,19 @@ class UserService:
     async def delete(self, user_id: str) -> None:
         user = await self._get_by_id(user_id)
 
+        self._invalidate_grants(user_id)
         await self.repository.delete(user)
 
     async def add_read_access(self, user_id: str, ou_ids: list[str]) -> User:
         user = await self._get_by_id(user_id)
 
+        self._invalidate_grants(user_id)
         return await self.repository.add_relation(user, "READ_ACCESS", ou_ids)
 
     async def add_write_access(self, user_id: str, ou_ids: list[str]) -> User:
         user = await self._get_by_id(user_id)
 
+        self._invalidate_grants(user_id)
         return await self.repository.add_relation(user, "WRITE_ACCESS", ou_ids)
 
     async def remove_read_access(self, user_id: str, ou_id: str) -> User:
@@ -95,10 +153,12 @@ class UserService:
         if ou_id not in set(user.read):
             return user
 
+        self._invalidate_grants(user_id)
         return await self.repository.remove_relation(user, "READ_ACCESS", [ou_id])
 
     async def remove_write_access(self, user_id: str, ou_id: str) -> User:
         user = await self._get_by_id(user_id)
         # TODO: check that relation is on list
 
+        self._invalidate_grants(user_id)
         return await self.repository.remove_relation(user, "WRITE_ACCESS", [ou_id])
@@ -6,7 +6,6 @@ from neo4j.exceptions import ConstraintError
 from src.common.context.context import get_request
 from src.common.models import PaginationQueryParams
 from src.common.utils import update_model_by_dto
-from src.structures.dal.ou_repository import OrganizationUnitsRepository
 from src.structures.dal.workers_repository import WorkersRepository
 from src.structures.domain.users import UserService
 from src.structures.domain.users.exceptions import (
@@ -34,14 +33,10 @@ class WorkerService:
         self,
         user_service: UserService = Depends(UserService),
         repository: WorkersRepository = Depends(WorkersRepository),
-        organization_unit_repo: OrganizationUnitsRepository = Depends(
-            OrganizationUnitsRepository,
-        ),
         request: Request = Depends(get_request),
     ) -> None:
         self._user_service = user_service
         self._repository = repository
-        self._org_unit_repo = organization_unit_repo
         self._request = request
 
     async def _get_by_id(self, worker_id: str) -> WorkerBase:
@@ -59,7 +54,11 @@ class WorkerService:
         access: str,
     ) -> WorkerBase:
         worker = await self._get_by_id(worker_id)
+        await self._check_access(worker, user_id, access)
 
+        return worker
+
+    async def _check_access(self, worker: WorkerBase, user_id: str, access: str):
         if access == "WRITE":
             if not await self._user_service.have_write_access(
                 user_id,
@@ -73,26 +72,19 @@ class WorkerService:
             ):
                 raise ReadAccessException(user_id, worker.organization_unit_id)
 
-        return worker
-
     async def _base_to_worker(self, base: WorkerBase) -> Worker:
-        ou_path = await self._org_unit_repo.path_to_organization_unit(
-            base.organization_unit_id,
+        return await self._get_full_by_id(base.id)
+
+    async def _get_full_by_id(self, worker_id: str) -> Worker:
+        worker = await self._repository.get_full_by_id(
+            worker_id,
             self._request.app.state.ROOT_OU,
         )
 
-        is_active_tree = False
-        if base.active is True:
-            is_active_tree = await self._org_unit_repo.is_in_active_tree(
-                base.organization_unit_id,
-                self._request.app.state.ROOT_OU,
-            )
+        if worker is None:
+            raise WorkerNotFound(worker_id)
 
-        return Worker(
-            is_active_tree=base.active and is_active_tree,
-            materialized_path=ou_path,
-            **base.dict(),
-        )
+        return worker
 
     async def create(self, dto: WorkerCreateDto, user_id: str) -> Worker:
         if not await self._user_service.have_write_access(
@@ -126,9 +118,10 @@ class WorkerService:
         return await self._repository.delete(worker)
 
     async def get_by_id(self, worker_id: str, user_id: str) -> Worker:
-        worker = await self._get_by_id_access_right_checked(worker_id, user_id, "READ")
+        worker = await self._get_full_by_id(worker_id)
+        await self._check_access(worker, user_id, "READ")
 
-        return await self._base_to_worker(worker)
+        return worker
 
     async def find(
         self,
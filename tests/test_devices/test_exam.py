@@ -1,3 +1,4 @@
+import asyncio
 import logging
 
 import pytest
@@ -189,3 +190,33 @@ class TestDeviceGetExam:
 
         result = await get_device_exam(client, child_ou_device, child_ou_worker)
         assert result.status_code == 403
+
+    @pytest.mark.asyncio
+    async def test_worker_with_parent_ou_deactivated_can_not_take_exam(
+        self,
+        client: TestClient,
+        child_of_child_ou_device: str,
+        child_of_child_ou_worker: str,
+        child_ou: str,
+        user_id_with_root_access: str,
+    ):
+        result = await get_device_exam(
+            client, child_of_child_ou_device, child_of_child_ou_worker
+        )
+        assert result.status_code == 200
+
+        result = await deactivate_organization(
+            client, child_ou, user_id_with_root_access
+        )
+        assert result.status_code == 200
+
+        # subtree is updated in background
+        for _ in range(50):
+            result = await get_device_exam(
+                client, child_of_child_ou_device, child_of_child_ou_worker
+            )
+            if result.status_code == 403:
+                break
+            await asyncio.sleep(0.1)
+
+        assert result.status_code == 403
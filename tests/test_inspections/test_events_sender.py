@@ -0,0 +1,139 @@
+import asyncio
+import os
+from datetime import datetime
+
+import pytest
+
+from src.common.kafka import KafkaConfiguration
+from src.inspections.domain.inspections.exceptions import EventsQueueFull
+from src.inspections.domain.inspections.models import Event, EventType
+from src.inspections.infra.event_producer_kafka import EventsSender
+
+TOPIC = "inspections"
+
+
+def kafka_configuration(**kwargs) -> KafkaConfiguration:
+    return KafkaConfiguration(
+        instance="kafka:9092",
+        topic=TOPIC,
+        username="",
+        # producer is a fake, credentials are only passed on
+        password=os.environ.get("KAFKA_PASSWORD", ""),
+        cafile=None,
+        **kwargs,
+    )
+
+
+def event(inspection_id: str, event_data: str) -> Event:
+    return Event(
+        inspection_id=inspection_id,
+        worker_id="worker",
+        device_id="device",
+        event_type=EventType.DATA,
+        event_data=event_data,
+        datetime=datetime(2023, 1, 1),
+    )
+
+
+class FakeProducer:
+    """
+    Records sent messages, send waits while blocked like producer with full
+    buffer, delivery is completed by deliver()
+    """
+
+    def __init__(self) -> None:
+        self.sent: list[tuple[str, bytes, bytes]] = []
+        self.deliveries: list[asyncio.Future] = []
+        self.unblocked = asyncio.Event()
+        self.unblocked.set()
+
+    async def send(self, topic: str, value: bytes, key: bytes) -> asyncio.Future:
+        await self.unblocked.wait()
+        self.sent.append((topic, key, value))
+
+        delivery = asyncio.get_running_loop().create_future()
+        self.deliveries.append(delivery)
+        return delivery
+
+    def deliver(self) -> None:
+        for delivery in self.deliveries:
+            if not delivery.done():
+                delivery.set_result(None)
+
+
+async def started(producer: FakeProducer, **kwargs) -> EventsSender:
+    sender = EventsSender(TOPIC, kafka_configuration(**kwargs))
+    await sender.start(producer)
+    return sender
+
+
+class TestEventsSender:
+    @pytest.mark.asyncio
+    async def test_events_should_be_keyed_by_inspection_in_order(self):
+        producer = FakeProducer()
+        sender = await started(producer)
+
+        await sender.enqueue([event("a", "1"), event("b", "1"), event("a", "2")])
+        await sender.close()
+
+        assert [topic for topic, _, _ in producer.sent] == [TOPIC] * 3
+        assert [key for _, key, _ in producer.sent] == [b"a", b"b", b"a"]
+        assert b'"event_data":"2"' in producer.sent[2][2]
+
+    @pytest.mark.asyncio
+    async def test_full_queue_should_reject_events(self):
+        producer = FakeProducer()
+        producer.unblocked.clear()
+        sender = await started(
+            producer,
+            queue_size=2,
+            enqueue_timeout=0.01,
+            drain_timeout=0.01,
+        )
+
+        # first event is taken by sender and waits for producer
+        await sender.enqueue([event("a", "1")])
+        await asyncio.sleep(0)
+        await sender.enqueue([event("a", "2"), event("a", "3")])
+
+        with pytest.raises(EventsQueueFull):
+            await sender.enqueue([event("a", "4")])
+
+        snapshot = sender.snapshot()
+        assert snapshot["queued"] == 2
+        assert snapshot["enqueued"] == 3
+        assert snapshot["rejected"] == 1
+
+        await sender.close()
+
+    @pytest.mark.asyncio
+    async def test_delivered_events_should_be_measured(self):
+        producer = FakeProducer()
+        sender = await started(producer)
+
+        await sender.enqueue([event("a", "1"), event("b", "1")])
+        await sender.close()
+
+        assert sender.snapshot()["latency_p50"] is None
+
+        producer.deliver()
+        await asyncio.sleep(0)
+
+        snapshot = sender.snapshot()
+        assert snapshot["delivered"] == 2
+        assert snapshot["failures"] == 0
+        assert snapshot["latency_mean"] >= 0
+        assert snapshot["latency_p50"] <= snapshot["latency_p99"]
+
+    @pytest.mark.asyncio
+    async def test_close_should_wait_for_queued_events(self):
+        producer = FakeProducer()
+        producer.unblocked.clear()
+        sender = await started(producer, drain_timeout=1.0)
+
+        await sender.enqueue([event("a", "1"), event("a", "2")])
+        asyncio.get_running_loop().call_later(0.05, producer.unblocked.set)
+        await sender.close()
+
+        assert len(producer.sent) == 2
+        assert sender.snapshot()["queued"] == 0
@@ -0,0 +1,28 @@
+import pytest
+
+from src.benchmarks.inspections_serialization import database, orm_page, rows_page
+from src.inspections.dal.inspections_repository import (
+    INSPECTION_COLUMNS,
+    WorkerInspectionModel,
+    _by_worker,
+)
+from src.inspections.domain.inspections.models import Inspection
+
+# routes return serialized rows, response_model does not validate them
+FIELDS = list(Inspection.__fields__)
+
+
+class TestInspectionsSerialization:
+    def test_columns_should_be_labelled_as_inspection_fields(self):
+        assert [column.key for column in INSPECTION_COLUMNS] == FIELDS
+
+    def test_worker_columns_should_be_labelled_as_inspection_fields(self):
+        select = _by_worker(WorkerInspectionModel.__table__, "worker")
+
+        assert [column.key for column in select.selected_columns] == FIELDS
+
+    @pytest.mark.asyncio
+    async def test_rows_should_be_serialized_as_response_model(self):
+        session = database()
+
+        assert await rows_page(session) == await orm_page(session)
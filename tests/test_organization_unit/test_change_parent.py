@@ -39,3 +39,31 @@ class TestOrganizationUnitChangeParent:
             child_ou,
             configuration.root_ou,
         }
+
+    @pytest.mark.asyncio
+    async def test_change_parent_should_update_path_of_subtree(
+        self,
+        client: TestClient,
+        user_id_with_root_access: str,
+        child_ou: str,
+        child_of_child_ou: str,
+        other_child_ou: str,
+    ):
+        result = await change_parent_organization(
+            client, child_ou, other_child_ou, user_id_with_root_access
+        )
+
+        assert result.status_code == 200
+
+        result = await client.get(
+            f"/organization-units/{child_of_child_ou}",
+            headers={"X-User-Id": user_id_with_root_access},
+        )
+
+        assert result.status_code == 200
+        assert result.json()["materialized_path"] == [
+            child_of_child_ou,
+            child_ou,
+            other_child_ou,
+            configuration.root_ou,
+        ]
@@ -1,10 +1,13 @@
 import logging
+import uuid
 
 import pytest
 from async_asgi_testclient import TestClient
 
+from src.structures.application import initialize_application
 from src.structures.configuration import Configuration
 from src.structures.domain.organization_units.models import OrganizationUnitFindDto
+from tests.conftest import driver
 from tests.helpers import delete_organization, find_organizations
 
 logger = logging.getLogger(__name__)
@@ -50,5 +53,36 @@ class TestOrganizationUnitFind:
         logger.warning(result.json())
         assert result.json()["pagination"]["count"] == 2
 
+    @pytest.mark.asyncio
+    async def test_units_without_intervals_should_be_found_after_backfill(
+        self,
+        client: TestClient,
+        user_id_with_root_access: str,
+    ):
+        # units created before ancestors and intervals were stored
+        parent_id, child_id = str(uuid.uuid4()), str(uuid.uuid4())
+        with driver.session() as session:
+            session.run(
+                "MATCH (r:RootOrganizationUnit {id: $root_ou})"
+                " CREATE (p:OrganizationUnit {id: $parent_id, name: 'parent',"
+                " inn: 1, kpp: 1, active: true})-[:CHILD_OF]->(r)"
+                " CREATE (c:OrganizationUnit {id: $child_id, name: 'child',"
+                " inn: 2, kpp: 2, active: true})-[:CHILD_OF]->(p)",
+                root_ou=configuration.root_ou,
+                parent_id=parent_id,
+                child_id=child_id,
+            )
+
+        # backfill runs on application startup
+        app = initialize_application(configuration)
+        scope = {"client": ("127.0.0.1", "5555")}
+        async with TestClient(app, scope=scope) as restarted:
+            dto = OrganizationUnitFindDto()
+            result = await find_organizations(restarted, dto, user_id_with_root_access)
+
+        assert result.status_code == 200
+        found = {ou["id"] for ou in result.json()["data"]}
+        assert {parent_id, child_id} <= found
+
 
 # TODO: deleting of "middle" ou
@@ -0,0 +1,88 @@
+import pytest
+import pytest_asyncio
+
+from src.structures.dal.hierarchy import OrganizationUnitsHierarchy
+
+ROOT_OU = "root"
+
+
+@pytest_asyncio.fixture
+async def loaded() -> OrganizationUnitsHierarchy:
+    hierarchy = OrganizationUnitsHierarchy()
+    await hierarchy.load(
+        ROOT_OU,
+        [
+            ("a", ROOT_OU, True, False),
+            ("b", "a", True, False),
+        ],
+    )
+
+    return hierarchy
+
+
+class TestOrganizationUnitsHierarchy:
+    @pytest.mark.asyncio
+    async def test_not_loaded_should_not_know_units(self):
+        hierarchy = OrganizationUnitsHierarchy()
+        hierarchy.update("a", ROOT_OU, True)
+
+        assert not hierarchy.knows("a")
+
+    @pytest.mark.asyncio
+    async def test_loaded_should_answer_like_database(
+        self,
+        loaded: OrganizationUnitsHierarchy,
+    ):
+        assert loaded.knows("b")
+        assert loaded.path("b") == ["b", "a", ROOT_OU]
+        assert loaded.is_in_active_tree("b")
+        assert loaded.is_descendant("b", ROOT_OU)
+        assert loaded.is_descendant("b", "a")
+        assert not loaded.is_descendant("a", "b")
+
+    @pytest.mark.asyncio
+    async def test_unit_under_unknown_parent_should_not_be_known(
+        self,
+        loaded: OrganizationUnitsHierarchy,
+    ):
+        loaded.update("c", "x", True)
+        loaded.update("d", "c", True)
+
+        assert not loaded.knows("c")
+        assert not loaded.knows("d")
+
+    @pytest.mark.asyncio
+    async def test_unit_should_be_known_when_parent_is_added(
+        self,
+        loaded: OrganizationUnitsHierarchy,
+    ):
+        loaded.update("c", "x", True)
+        loaded.update("x", "a", True)
+        loaded.update("c", "x")
+
+        assert loaded.knows("c")
+        assert loaded.path("c") == ["c", "x", "a", ROOT_OU]
+        assert loaded.is_descendant("c", ROOT_OU)
+
+    @pytest.mark.asyncio
+    async def test_updates_during_reload_should_be_replayed(self):
+        hierarchy = OrganizationUnitsHierarchy()
+        hierarchy.begin_reload()
+        hierarchy.update("b", "a", False)
+
+        await hierarchy.load(ROOT_OU, [("a", ROOT_OU, True, False)])
+
+        assert hierarchy.knows("b")
+        assert not hierarchy.is_in_active_tree("b")
+
+    @pytest.mark.asyncio
+    async def test_updates_of_failed_reload_should_be_replayed(self):
+        hierarchy = OrganizationUnitsHierarchy()
+        hierarchy.begin_reload()
+        hierarchy.update("b", "a", False)
+
+        # first reload failed before load, next one is started
+        hierarchy.begin_reload()
+        await hierarchy.load(ROOT_OU, [("a", ROOT_OU, True, False)])
+
+        assert hierarchy.knows("b")
@@ -0,0 +1,52 @@
+from itertools import pairwise
+
+from src.structures.dal.intervals import number_subtree, take_interval
+
+TOP = "top"
+
+
+def add_children(amount: int, rgt: int) -> tuple[dict, int]:
+    """
+    Children added one by one under the top, as repository does it
+    """
+    numbers = {TOP: (0, rgt, None)}
+    rebalances = 0
+
+    for i in range(amount):
+        children = len(numbers) - 1
+        lft, rgt, free = numbers[TOP]
+        interval = take_interval(lft, rgt, free, 1, children)
+
+        if interval is None:
+            rebalances += 1
+            rows = [(ou_id, TOP) for ou_id in numbers if ou_id != TOP]
+            numbers = number_subtree(TOP, lft, rgt, rows, TOP, 1 + children)
+            lft, rgt, free = numbers[TOP]
+            interval = take_interval(lft, rgt, free, 1, children)
+
+        numbers[TOP] = (lft, rgt, interval[1])
+        numbers[str(i)] = (*interval, None)
+
+    return numbers, rebalances
+
+
+class TestIntervals:
+    def test_children_should_not_overlap(self):
+        numbers, _ = add_children(1000, 2**20)
+
+        intervals = sorted(
+            (lft, rgt) for ou_id, (lft, rgt, _) in numbers.items() if ou_id != TOP
+        )
+        assert all(0 < lft < rgt <= 2**20 for lft, rgt in intervals)
+        assert all(a[1] <= b[0] for a, b in pairwise(intervals))
+
+    def test_busy_parent_should_be_rebalanced_rarely(self):
+        _, rebalances = add_children(1000, 2**62)
+
+        assert rebalances <= 5
+
+    def test_interval_should_fit_moved_subtree(self):
+        lft, rgt = take_interval(0, 2**20, None, 100, 0)
+        rows = [(str(i), "moved") for i in range(99)]
+
+        assert number_subtree("moved", lft, rgt, rows) is not None
@@ -4,7 +4,11 @@ import pytest
 from async_asgi_testclient import TestClient
 from async_asgi_testclient.response import Response
 
+from src.structures.domain.users.models import UserCreateDto
 from src.structures.domain.workers.models import WorkerFindDto
+from tests.test_organization_unit.test_change_parent import (
+    change_parent_organization,
+)
 from tests.test_workers.test_delete import delete_worker
 
 logger = logging.getLogger(__name__)
@@ -59,3 +63,127 @@ class TestOutletFind:
         logger.warning(result.json())
         assert result.json()["pagination"]["count"] == 2
         # TODO: check ids
+
+    @pytest.mark.asyncio
+    async def test_after_change_parent_should_show_moved_branch(
+        self,
+        client: TestClient,
+        user_id_with_root_access: str,
+        user_id_with_child_access: str,
+        child_ou: str,
+        other_child_ou: str,
+        child_ou_worker: str,
+        child_of_child_ou_worker: str,
+        other_child_ou_worker: str,
+    ):
+        result = await change_parent_organization(
+            client, other_child_ou, child_ou, user_id_with_root_access
+        )
+
+        assert result.status_code == 200
+
+        dto = WorkerFindDto()
+        result = await find_workers(client, dto, user_id_with_child_access)
+
+        assert result.status_code == 200
+        assert result.json()["pagination"]["count"] == 3
+
+    @pytest.mark.asyncio
+    async def test_with_cursor_should_return_every_worker_once(
+        self,
+        client: TestClient,
+        user_id_with_root_access: str,
+        child_of_child_ou_worker: str,
+        child_ou_worker: str,
+        other_child_ou_worker: str,
+    ):
+        headers = {"X-User-Id": user_id_with_root_access}
+
+        result = await client.get("/workers?limit=2&cursor=", headers=headers)
+
+        assert result.status_code == 200
+        first_page = result.json()
+        assert len(first_page["data"]) == 2
+        assert first_page["pagination"]["next_cursor"] is not None
+
+        result = await client.get(
+            f"/workers?limit=2&cursor={first_page['pagination']['next_cursor']}",
+            headers=headers,
+        )
+
+        assert result.status_code == 200
+        second_page = result.json()
+        assert len(second_page["data"]) == 1
+        assert second_page["pagination"]["next_cursor"] is None
+
+        ids = [worker["id"] for worker in first_page["data"] + second_page["data"]]
+        assert sorted(ids) == sorted(
+            [child_of_child_ou_worker, child_ou_worker, other_child_ou_worker]
+        )
+
+    @pytest.mark.asyncio
+    async def test_with_invalid_cursor_should_fail(
+        self,
+        client: TestClient,
+        user_id_with_root_access: str,
+    ):
+        result = await client.get(
+            "/workers?cursor=invalid",
+            headers={"X-User-Id": user_id_with_root_access},
+        )
+
+        assert result.status_code == 400
+
+    @pytest.mark.asyncio
+    async def test_without_count_should_show_has_more(
+        self,
+        client: TestClient,
+        user_id_with_root_access: str,
+        child_of_child_ou_worker: str,
+        child_ou_worker: str,
+        other_child_ou_worker: str,
+    ):
+        headers = {"X-User-Id": user_id_with_root_access}
+
+        result = await client.get("/workers?limit=2&count_mode=none", headers=headers)
+
+        assert result.status_code == 200
+        assert result.json()["pagination"]["count"] is None
+        assert result.json()["pagination"]["has_more"] is True
+
+        result = await client.get(
+            "/workers?page=2&limit=2&count_mode=estimate",
+            headers=headers,
+        )
+
+        assert result.status_code == 200
+        assert result.json()["pagination"]["count"] == 3
+        assert result.json()["pagination"]["has_more"] is False
+
+    @pytest.mark.asyncio
+    async def test_nested_access_should_be_counted_once(
+        self,
+        client: TestClient,
+        child_ou: str,
+        child_of_child_ou: str,
+        child_of_child_ou_worker: str,
+        child_ou_worker: str,
+        other_child_ou_worker: str,
+    ):
+        user_dto = UserCreateDto(
+            name="nested_user",
+            read=[child_ou, child_of_child_ou],
+            write=[],
+        )
+        result = await client.post("/users", data=user_dto.json())
+        headers = {"X-User-Id": result.json()["id"]}
+
+        for count_mode in ("exact", "estimate"):
+            result = await client.get(
+                f"/workers?count_mode={count_mode}",
+                headers=headers,
+            )
+
+            assert result.status_code == 200
+            assert result.json()["pagination"]["count"] == 2
+            assert len(result.json()["data"]) == 2